@@ -1,2 +1,3 @@
 from .login_model import login_model
-from .user import *
\ No newline at end of file
+from .user import *
+from .gamestate import *
\ No newline at end of file
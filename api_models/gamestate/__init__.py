@@ -0,0 +1 @@
+from .batch_gamestate_model import batch_gamestate_model
\ No newline at end of file
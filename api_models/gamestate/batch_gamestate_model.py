@@ -0,0 +1,31 @@
+from aws_cdk.aws_apigateway import (JsonSchemaType, JsonSchemaVersion)
+
+batch_gamestate_model = {
+    "model_name": "BatchGameStateModel",
+    "content_type": "application/json",
+    "schema": {
+        "schema": JsonSchemaVersion.DRAFT4,
+        "title": "Save game states request",
+        "type": JsonSchemaType.OBJECT,
+        "properties": {
+            "game_states": {
+                "type": JsonSchemaType.ARRAY,
+                "min_items": 1,
+                "max_items": 100,
+                "items": {
+                    "type": JsonSchemaType.OBJECT,
+                    "properties": {
+                        "map_id": {
+                            "type": JsonSchemaType.STRING
+                        },
+                        "state": {
+                            "type": JsonSchemaType.STRING
+                        }
+                    },
+                    "required": ["map_id", "state"]
+                }
+            }
+        },
+        "required": ["game_states"]
+    }
+}
@@ -0,0 +1,165 @@
+"""
+Build the deployment packages of the stack.\n
+Each function gets a zip with only its handler module and the local modules and data files it
+needs, instead of the whole `lambda` folder. The `custom` layer is zipped from `layers/python/custom`.
+The zips are reproducible: entries are sorted and written with a fixed date and mode, so an
+unchanged source gives the same asset hash and `cdk deploy` skips it.\n
+When the build runs on the Python version of the runtime, the modules are also precompiled to
+unchecked hash based `.pyc` files. The Lambda file system is read only, so without them the
+modules are compiled again on every cold start.
+"""
+
+import os
+import io
+import ast
+import sys
+import json
+import zipfile
+import tempfile
+import py_compile
+
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+LAMBDA_PATH = os.path.join(ROOT_PATH, "lambda")
+LAYER_SOURCE_PATH = os.path.join(ROOT_PATH, "layers", "python", "custom")
+BUILD_PATH = os.path.join(ROOT_PATH, "build")
+ROUTES_FILE = "routes.json"
+# Version of `aws_lambda.Runtime.PYTHON_3_8`
+RUNTIME_VERSION = (3, 8)
+# Paths of the packages in the runtime, shown in the tracebacks of the precompiled modules
+FUNCTION_RUNTIME_PATH = "/var/task"
+LAYER_RUNTIME_PATH = "/opt"
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+
+def can_compile() -> bool:
+    return sys.version_info[:2] == RUNTIME_VERSION
+
+
+def get_local_imports(module_name: str) -> list:
+    """
+    Names of the modules of the `lambda` folder imported by `module_name`
+    """
+
+    with open(os.path.join(LAMBDA_PATH, f"{module_name}.py")) as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.extend(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module is not None:
+            names.append(node.module.split(".")[0])
+    return [name for name in names if os.path.isfile(os.path.join(LAMBDA_PATH, f"{name}.py"))]
+
+
+def get_function_files(module_name: str) -> list:
+    """
+    Files of the `lambda` folder needed by the handler `module_name`.\n
+    The router imports the handlers of `routes.json` by name, they are added with the file.
+    """
+
+    modules = []
+    data_files = []
+    pending = [module_name]
+    while pending:
+        name = pending.pop()
+        if name in modules:
+            continue
+        modules.append(name)
+        pending.extend(get_local_imports(name))
+        if name == "router":
+            data_files.append(ROUTES_FILE)
+            with open(os.path.join(LAMBDA_PATH, ROUTES_FILE)) as f:
+                pending.extend(json.load(f).values())
+    return sorted(f"{name}.py" for name in modules) + sorted(set(data_files))
+
+
+def compile_module(source_path: str, runtime_path: str) -> bytes:
+    with tempfile.TemporaryDirectory() as folder:
+        output_path = os.path.join(folder, "module.pyc")
+        py_compile.compile(
+            source_path,
+            cfile=output_path,
+            dfile=runtime_path,
+            doraise=True,
+            invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH
+        )
+        with open(output_path, "rb") as f:
+            return f.read()
+
+
+def get_entries(source_folder: str, file_names: list, archive_folder: str, runtime_folder: str, bytecode: bool) -> dict:
+    """
+    Return the content of the zip entries of `file_names`, with the bytecode of the modules when `bytecode`
+    """
+
+    entries = {}
+    for file_name in file_names:
+        source_path = os.path.join(source_folder, file_name)
+        archive_path = f"{archive_folder}/{file_name}" if archive_folder else file_name
+        with open(source_path, "rb") as f:
+            entries[archive_path] = f.read()
+        if bytecode and file_name.endswith(".py"):
+            module_name = file_name[:-len(".py")]
+            cache_path = f"__pycache__/{module_name}.{sys.implementation.cache_tag}.pyc"
+            if archive_folder:
+                cache_path = f"{archive_folder}/{cache_path}"
+            entries[cache_path] = compile_module(source_path, f"{runtime_folder}/{archive_path}")
+    return entries
+
+
+def write_zip(path: str, entries: dict) -> dict:
+    """
+    Write `entries` to the zip `path` reproducibly and return its `path`, `files`, `size` and `source_size`
+    """
+
+    folders = set()
+    for name in entries:
+        parts = name.split("/")[:-1]
+        folders.update("/".join(parts[:index + 1]) + "/" for index in range(len(parts)))
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name in sorted(folders):
+            info = zipfile.ZipInfo(name, ZIP_DATE)
+            info.external_attr = (0o40755 << 16) | 0x10
+            archive.writestr(info, b"")
+        for name in sorted(entries):
+            info = zipfile.ZipInfo(name, ZIP_DATE)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o100644 << 16
+            archive.writestr(info, entries[name])
+    data = output.getvalue()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # An unchanged zip is not written again, its modification time stays the same
+    if not os.path.isfile(path) or open(path, "rb").read() != data:
+        with open(path, "wb") as f:
+            f.write(data)
+    return {
+        "path": path,
+        "files": len(entries),
+        "size": len(data),
+        "source_size": sum(len(content) for content in entries.values())
+    }
+
+
+def build_function(module_name: str, bytecode: bool = None) -> dict:
+    """
+    Build `build/lambda/<module_name>.zip`, the package of the function whose handler is `module_name`.\n
+    `bytecode` defaults to precompiling when the build runs on the runtime version.
+    """
+
+    if bytecode is None:
+        bytecode = can_compile()
+    entries = get_entries(LAMBDA_PATH, get_function_files(module_name), "", FUNCTION_RUNTIME_PATH, bytecode)
+    return write_zip(os.path.join(BUILD_PATH, "lambda", f"{module_name}.zip"), entries)
+
+
+def build_layer(bytecode: bool = None) -> dict:
+    """
+    Build `build/layers/custom.zip`, the `custom` layer
+    """
+
+    if bytecode is None:
+        bytecode = can_compile()
+    file_names = sorted(name for name in os.listdir(LAYER_SOURCE_PATH) if name.endswith(".py"))
+    entries = get_entries(LAYER_SOURCE_PATH, file_names, "python/custom", LAYER_RUNTIME_PATH, bytecode)
+    return write_zip(os.path.join(BUILD_PATH, "layers", "custom.zip"), entries)
@@ -4,12 +4,17 @@ from aws_cdk import (
     aws_apigateway,
     aws_lambda,
     aws_s3 as s3,
-    aws_iam as iam
+    aws_iam as iam,
+    aws_events as events,
+    aws_events_targets as targets
 )
 import os
+import json
 import api_models as models
+from game_api import bundling
 
 LIBRARY_PATH = os.path.abspath("layers")
+ROUTES_PATH = "./lambda/routes.json"
 
 
 class GameApiStack(core.Stack):
@@ -19,11 +24,16 @@ class GameApiStack(core.Stack):
     models = None
     cors_integration = None
     authorizers = None
+    router_mode = False
+    router_environment = None
+    router_layers = None
     rest_api: aws_apigateway.LambdaRestApi = None
 
     def __init__(self, scope: core.Construct, id: str, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
-        
+
+        # `cdk deploy -c router_mode=true` serves every api route from one function
+        self.router_mode = self.node.try_get_context("router_mode") in [True, "true"]
         self.create_layers()
         self.create_lambdas()
         self.create_tables()
@@ -81,22 +91,54 @@ class GameApiStack(core.Stack):
         user_table.grant(self.lambdas["update_user_account"], "dynamodb:*")
         user_table.grant(self.lambdas["update_user_profile"], "dynamodb:*")
         user_table.grant(self.lambdas["acquire_access_token"], "dynamodb:*")
+        user_table.grant(self.lambdas["authorize_user"], "dynamodb:*")
+        user_table.grant(self.lambdas["build_revocation_snapshot"], "dynamodb:*")
 
 
-        # game map table
-        game_map_table = db.Table(
+        # legacy game map table, kept until tools/migrate_game_map_by_id.py has copied it
+        legacy_game_map_table = db.Table(
             self,
             "minh-intern.game_map",
             partition_key= db.Attribute(name="created_by", type=db.AttributeType.STRING),
             sort_key=db.Attribute(name="last_edited", type=db.AttributeType.STRING),
             table_name="minh-intern.game_map"
         )
-        game_map_table.add_global_secondary_index(
+        legacy_game_map_table.add_global_secondary_index(
             index_name="game-map-unique-map-id",
             partition_key=db.Attribute(name="id", type=db.AttributeType.STRING),
             projection_type=db.ProjectionType.ALL
         )
+
+        # game map table, a map is read with a strongly consistent GetItem by id
+        game_map_table = db.Table(
+            self,
+            "minh-intern.game_map_by_id",
+            partition_key= db.Attribute(name="id", type=db.AttributeType.STRING),
+            table_name="minh-intern.game_map_by_id"
+        )
+        game_map_table.add_global_secondary_index(
+            index_name="game-map-created-by",
+            partition_key=db.Attribute(name="created_by", type=db.AttributeType.STRING),
+            sort_key=db.Attribute(name="last_edited", type=db.AttributeType.STRING),
+            projection_type=db.ProjectionType.ALL
+        )
+        # Newest first listing of every map, partitioned by month of creation
+        game_map_table.add_global_secondary_index(
+            index_name="game-map-feed",
+            partition_key=db.Attribute(name="feed_bucket", type=db.AttributeType.STRING),
+            sort_key=db.Attribute(name="feed_timestamp", type=db.AttributeType.STRING),
+            projection_type=db.ProjectionType.ALL
+        )
         game_map_table.grant(self.lambdas["create_map"], "dynamodb:*")
+        game_map_table.grant(self.lambdas["create_map_trigger"], "dynamodb:*")
+        game_map_table.grant(self.lambdas["update_map"], "dynamodb:*")
+        game_map_table.grant(self.lambdas["get_map_by_id"], "dynamodb:*")
+        game_map_table.grant(self.lambdas["get_map_tiles"], "dynamodb:*")
+        game_map_table.grant(self.lambdas["get_list_map_pagination"], "dynamodb:*")
+        game_map_table.grant(self.lambdas["get_list_gamestate_pagination"], "dynamodb:*")
+        game_map_table.grant(self.lambdas["create_gamestate"], "dynamodb:*")
+        game_map_table.grant(self.lambdas["create_gamestate_batch"], "dynamodb:*")
+        game_map_table.grant(self.lambdas["get_gamestate_by_mapid_userid"], "dynamodb:*")
 
         gamestate_table = db.Table(
             self,
@@ -106,6 +148,8 @@ class GameApiStack(core.Stack):
             table_name="minh-intern.game_state"
         )
         gamestate_table.grant(self.lambdas["get_list_gamestate_pagination"], "dynamodb:*")
+        gamestate_table.grant(self.lambdas["create_gamestate"], "dynamodb:*")
+        gamestate_table.grant(self.lambdas["create_gamestate_batch"], "dynamodb:*")
         
         table_row_count = db.Table(
             self,
@@ -115,6 +159,7 @@ class GameApiStack(core.Stack):
         )
         table_row_count.grant(self.lambdas["create_map"], "dynamodb:*")
         table_row_count.grant(self.lambdas["get_list_map_pagination"], "dynamodb:*")
+        table_row_count.grant(self.lambdas["get_list_gamestate_pagination"], "dynamodb:*")
 
 
     def create_lambdas(self):
@@ -124,10 +169,9 @@ class GameApiStack(core.Stack):
 
         self.lambdas = {}
 
-        self.lambdas["cors_handler"] = aws_lambda.Function(
+        self.lambdas["cors_handler"] = self.create_function(
             self,
             "minh-intern-cors-handler",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="cors.handler",
             function_name="minh-intern-cors-handler",
             runtime=aws_lambda.Runtime.PYTHON_3_8,
@@ -138,10 +182,9 @@ class GameApiStack(core.Stack):
             )
         )
 
-        self.lambdas["user_login"] = aws_lambda.Function(
+        self.lambdas["user_login"] = self.create_function(
             self,
             "minh-intern-user-login",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="login.handler",
             layers=[self.layers["custom_modules"], self.layers["bcrypt"], self.layers['pyjwt']],
             function_name="minh-intern-user-login",
@@ -158,10 +201,9 @@ class GameApiStack(core.Stack):
             }
         )
         
-        self.lambdas["create_user"] = aws_lambda.Function(
+        self.lambdas["create_user"] = self.create_function(
             self,
             "minh-intern-create-user",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="create_user.handler",
             layers=[self.layers["custom_modules"], self.layers["bcrypt"], self.layers["pyjwt"]],
             function_name="minh-intern-create-user",
@@ -175,17 +217,18 @@ class GameApiStack(core.Stack):
                 "TABLE_NAME": "minh-intern.user",
                 "JWT_SECRET_KEY": "gameapi",
                 "S3_BUCKET_NAME": "minh-intern.game-bucket",
-                "S3_USER_FOLDER_NAME": "user"
+                "S3_USER_FOLDER_NAME": "user",
+                "UPLOAD_EXPIRES_IN": "900",
+                "MAX_UPLOAD_SIZE": "10485760"
             },
             timeout=core.Duration.seconds(10)
         )
 
-        self.lambdas["get_user_by_id"] = aws_lambda.Function(
+        self.lambdas["get_user_by_id"] = self.create_function(
             self,
             "minh-intern-get_user_by_id",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="get_user_by_id.handler",
-            layers=[self.layers["bcrypt"], self.layers["pyjwt"]],
+            layers=[self.layers["custom_modules"], self.layers["bcrypt"], self.layers["pyjwt"]],
             function_name="minh-intern-get_user_by_id",
             runtime=aws_lambda.Runtime.PYTHON_3_8,
             role=iam.Role.from_role_arn(
@@ -198,12 +241,11 @@ class GameApiStack(core.Stack):
             }
         )
 
-        self.lambdas["update_user_account"] = aws_lambda.Function(
+        self.lambdas["update_user_account"] = self.create_function(
             self,
             "minh-intern-update_user_account",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="update_user_account.handler",
-            layers=[self.layers["bcrypt"], self.layers["pyjwt"]],
+            layers=[self.layers["custom_modules"], self.layers["bcrypt"], self.layers["pyjwt"]],
             function_name="minh-intern-update_user_account",
             runtime=aws_lambda.Runtime.PYTHON_3_8,
             role=iam.Role.from_role_arn(
@@ -217,12 +259,11 @@ class GameApiStack(core.Stack):
             timeout=core.Duration.seconds(10)
         )
 
-        self.lambdas["update_user_profile"] = aws_lambda.Function(
+        self.lambdas["update_user_profile"] = self.create_function(
             self,
             "minh-intern-update_user_profile",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="update_user_profile.handler",
-            layers=[self.layers["bcrypt"], self.layers["pyjwt"]],
+            layers=[self.layers["custom_modules"], self.layers["bcrypt"], self.layers["pyjwt"]],
             function_name="minh-intern-update_user_profile",
             runtime=aws_lambda.Runtime.PYTHON_3_8,
             role=iam.Role.from_role_arn(
@@ -235,11 +276,11 @@ class GameApiStack(core.Stack):
             }
         )
 
-        self.lambdas["update_user_picture"] = aws_lambda.Function(
+        self.lambdas["update_user_picture"] = self.create_function(
             self,
             "minh-intern-update_user_picture",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="update_user_picture.handler",
+            layers=[self.layers["custom_modules"], self.layers["pillow"]],
             function_name="minh-intern-update_user_picture",
             runtime=aws_lambda.Runtime.PYTHON_3_8,
             role=iam.Role.from_role_arn(
@@ -250,14 +291,15 @@ class GameApiStack(core.Stack):
             environment={
                 "TABLE_NAME": "minh-intern.user",
                 "S3_BUCKET_DOMAIN": "https://s3.amazonaws.com"
-            }
+            },
+            memory_size=512,
+            timeout=core.Duration.seconds(30)
         )
 
         
-        self.lambdas["acquire_access_token"] = aws_lambda.Function(
+        self.lambdas["acquire_access_token"] = self.create_function(
             self,
             "minh-intern-acquire_access_token",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="acquire_access_token.handler",
             layers=[self.layers["custom_modules"], self.layers["pyjwt"]],
             function_name="minh-intern-acquire_access_token",
@@ -270,14 +312,43 @@ class GameApiStack(core.Stack):
             environment={
                 "TABLE_NAME": "minh-intern.user",
                 "JWT_SECRET_KEY": "gameapi",
-                "S3_BUCKET_NAME": "minh-intern.game-bucket"
+                "S3_BUCKET_NAME": "minh-intern.game-bucket",
+                "TOKEN_VALIDATION_MODE": "stateful",
+                "REVOCATION_BUCKET_NAME": "minh-intern.auth-bucket",
+                "REVOCATION_OBJECT_KEY": "revocation/token_epochs.bloom",
+                "REVOCATION_REFRESH_INTERVAL": "60"
+            }
+        )
+
+        self.lambdas["build_revocation_snapshot"] = self.create_function(
+            self,
+            "minh-intern-build_revocation_snapshot",
+            handler="build_revocation_snapshot.handler",
+            layers=[self.layers["custom_modules"]],
+            function_name="minh-intern-build_revocation_snapshot",
+            runtime=aws_lambda.Runtime.PYTHON_3_8,
+            timeout=core.Duration.seconds(60),
+            role=iam.Role.from_role_arn(
+                self,
+                "minh-intern-LambdaBuildRevocationSnapshot",
+                role_arn="arn:aws:iam::573915606947:role/ir.us.intern"
+            ),
+            environment={
+                "TABLE_NAME": "minh-intern.user",
+                "REVOCATION_BUCKET_NAME": "minh-intern.auth-bucket",
+                "REVOCATION_OBJECT_KEY": "revocation/token_epochs.bloom"
             }
         )
+        events.Rule(
+            self,
+            "minh-intern-build_revocation_snapshot_schedule",
+            schedule=events.Schedule.rate(core.Duration.minutes(5)),
+            targets=[targets.LambdaFunction(self.lambdas["build_revocation_snapshot"])]
+        )
 
-        self.lambdas["create_map"] = aws_lambda.Function(
+        self.lambdas["create_map"] = self.create_function(
             self,
             "minh-intern-create_map",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="create_map.handler",
             layers=[self.layers["pyjwt"], self.layers["custom_modules"]],
             function_name="minh-intern-create_map",
@@ -288,18 +359,23 @@ class GameApiStack(core.Stack):
                 role_arn="arn:aws:iam::573915606947:role/ir.us.intern"
             ),
             environment={
-                "TABLE_NAME": "minh-intern.game_map",
+                "TABLE_NAME": "minh-intern.game_map_by_id",
                 "S3_BUCKET_NAME": "minh-intern.game-bucket",
                 "S3_MAP_FOLDER": "gamemap",
-                "ROW_COUNT_TABLE_NAME": "minh-intern.table_row_count"
+                "S3_BUCKET_DOMAIN": "https://s3.amazonaws.com",
+                "ROW_COUNT_TABLE_NAME": "minh-intern.table_row_count",
+                "ROW_COUNT_SHARDS": "10",
+                "MAP_ROW_COUNT_NAME": "minh-intern.game_map",
+                "UPLOAD_EXPIRES_IN": "900",
+                "MAX_UPLOAD_SIZE": "10485760"
             }
         )
 
-        self.lambdas["create_map_trigger"] = aws_lambda.Function(
+        self.lambdas["create_map_trigger"] = self.create_function(
             self,
             "minh-intern-create_map_trigger",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="create_map_trigger.handler",
+            layers=[self.layers["custom_modules"], self.layers["pillow"]],
             function_name="minh-intern-create_map_trigger",
             runtime=aws_lambda.Runtime.PYTHON_3_8,
             role=iam.Role.from_role_arn(
@@ -308,15 +384,16 @@ class GameApiStack(core.Stack):
                 role_arn="arn:aws:iam::573915606947:role/ir.us.intern"
             ),
             environment={
-                "TABLE_NAME": "minh-intern.game_map",
+                "TABLE_NAME": "minh-intern.game_map_by_id",
                 "S3_BUCKET_DOMAIN": "https://s3.amazonaws.com",
-            }
+            },
+            memory_size=512,
+            timeout=core.Duration.seconds(30)
         )
 
-        self.lambdas["update_map"] = aws_lambda.Function(
+        self.lambdas["update_map"] = self.create_function(
             self,
             "minh-intern-update_map",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="update_map.handler",
             layers=[self.layers["pyjwt"], self.layers["custom_modules"]],
             function_name="minh-intern-update_map",
@@ -327,16 +404,18 @@ class GameApiStack(core.Stack):
                 role_arn="arn:aws:iam::573915606947:role/ir.us.intern"
             ),
             environment={
-                "TABLE_NAME": "minh-intern.game_map",
+                "TABLE_NAME": "minh-intern.game_map_by_id",
                 "S3_BUCKET_NAME": "minh-intern.game-bucket",
-                "S3_MAP_FOLDER": "gamemap"
+                "S3_MAP_FOLDER": "gamemap",
+                "S3_BUCKET_DOMAIN": "https://s3.amazonaws.com",
+                "UPLOAD_EXPIRES_IN": "900",
+                "MAX_UPLOAD_SIZE": "10485760"
             }
         )
 
-        self.lambdas["authorize_user"] = aws_lambda.Function(
+        self.lambdas["authorize_user"] = self.create_function(
             self,
             "minh-intern-authorize_user",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="authorize_user.handler",
             layers=[self.layers["pyjwt"], self.layers["custom_modules"]],
             function_name="minh-intern-authorize_user",
@@ -348,14 +427,21 @@ class GameApiStack(core.Stack):
             ),
             environment={
                 "TABLE_NAME": "minh-intern.user",
-                "JWT_SECRET_KEY": "gameapi"
+                "JWT_SECRET_KEY": "gameapi",
+                "AUTH_CACHE_MAX_SIZE": "1024",
+                "AUTH_CACHE_TTL": "300",
+                "AUTH_CACHE_NEGATIVE_TTL": "30",
+                "AUTH_CACHE_STATS_INTERVAL": "100",
+                "TOKEN_VALIDATION_MODE": "stateful",
+                "REVOCATION_BUCKET_NAME": "minh-intern.auth-bucket",
+                "REVOCATION_OBJECT_KEY": "revocation/token_epochs.bloom",
+                "REVOCATION_REFRESH_INTERVAL": "60"
             }
         )
 
-        self.lambdas["get_list_map_pagination"] = aws_lambda.Function(
+        self.lambdas["get_list_map_pagination"] = self.create_function(
             self,
             "minh-intern-get_list_map_pagination",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="get_list_map_pagination.handler",
             layers=[self.layers["pyjwt"], self.layers["custom_modules"]],
             function_name="minh-intern-get_list_map_pagination",
@@ -366,17 +452,20 @@ class GameApiStack(core.Stack):
                 role_arn="arn:aws:iam::573915606947:role/ir.us.intern"
             ),
             environment={
-                "TABLE_NAME": "minh-intern.game_map",
+                "TABLE_NAME": "minh-intern.game_map_by_id",
                 "PAGINATION_PAGE_SIZE": "3",
-                "ROW_COUNT_TABLE_NAME": "minh-intern.table_row_count"
+                "ROW_COUNT_TABLE_NAME": "minh-intern.table_row_count",
+                "ROW_COUNT_SHARDS": "10",
+                "MAP_ROW_COUNT_NAME": "minh-intern.game_map",
+                "CURSOR_SECRET_KEY": "gameapi-cursor"
             }
         )
 
-        self.lambdas["get_map_by_id"] = aws_lambda.Function(
+        self.lambdas["get_map_by_id"] = self.create_function(
             self,
             "minh-intern-get_map_by_id",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="get_map_by_id.handler",
+            layers=[self.layers["custom_modules"]],
             function_name="minh-intern-get_map_by_id",
             runtime=aws_lambda.Runtime.PYTHON_3_8,
             role=iam.Role.from_role_arn(
@@ -385,14 +474,35 @@ class GameApiStack(core.Stack):
                 role_arn="arn:aws:iam::573915606947:role/ir.us.intern"
             ),
             environment={
-                "TABLE_NAME": "minh-intern.game_map"
+                "TABLE_NAME": "minh-intern.game_map_by_id"
             }
         )
 
-        self.lambdas["get_list_gamestate_pagination"] = aws_lambda.Function(
+        self.lambdas["get_map_tiles"] = self.create_function(
+            self,
+            "minh-intern-get_map_tiles",
+            handler="get_map_tiles.handler",
+            layers=[self.layers["custom_modules"]],
+            function_name="minh-intern-get_map_tiles",
+            runtime=aws_lambda.Runtime.PYTHON_3_8,
+            role=iam.Role.from_role_arn(
+                self,
+                "minh-intern-LambdaGetMapTiles",
+                role_arn="arn:aws:iam::573915606947:role/ir.us.intern"
+            ),
+            environment={
+                "TABLE_NAME": "minh-intern.game_map_by_id",
+                "S3_BUCKET_NAME": "minh-intern.game-bucket",
+                "S3_BUCKET_DOMAIN": "https://s3.amazonaws.com",
+                "MAX_REGION_TILES": "65536",
+                "MAP_INDEX_CACHE_TTL": "300"
+            },
+            memory_size=512
+        )
+
+        self.lambdas["get_list_gamestate_pagination"] = self.create_function(
             self,
             "minh-intern-get_list_gamestate_pagination",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="get_list_gamestate_pagination.handler",
             function_name="minh-intern-get_list_gamestate_pagination",
             layers=[self.layers["pyjwt"], self.layers["custom_modules"]],
@@ -404,17 +514,22 @@ class GameApiStack(core.Stack):
             ),
             environment={
                 "GAMESTATE_TABLE_NAME": "minh-intern.game_state",
-                "GAMEMAP_TABLE_NAME": "minh-intern.game_map",
+                "GAMEMAP_TABLE_NAME": "minh-intern.game_map_by_id",
                 "ROW_COUNT_TABLE_NAME": "minh-intern.table_row_count",
-                "PAGINATION_PAGE_SIZE": "3"
+                "ROW_COUNT_SHARDS": "10",
+                "MAP_ROW_COUNT_NAME": "minh-intern.game_map",
+                "PAGINATION_PAGE_SIZE": "10",
+                "MAP_FEED_OLDEST_BUCKET": "2020-08",
+                "MAP_FEED_MAX_BUCKETS": "6",
+                "CURSOR_SECRET_KEY": "gameapi-cursor"
             }
         )
 
-        self.lambdas["create_gamestate"] = aws_lambda.Function(
+        self.lambdas["create_gamestate"] = self.create_function(
             self,
             "minh-intern-create_gamestate",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="create_gamestate.handler",
+            layers=[self.layers["custom_modules"]],
             function_name="minh-intern-create_gamestate",
             runtime=aws_lambda.Runtime.PYTHON_3_8,
             role=iam.Role.from_role_arn(
@@ -424,15 +539,36 @@ class GameApiStack(core.Stack):
             ),
             environment={
                 "GAMESTATE_TABLE_NAME": "minh-intern.game_state",
-                "GAMEMAP_TABLE_NAME": "minh-intern.game_map"
+                "GAMEMAP_TABLE_NAME": "minh-intern.game_map_by_id",
+                "MAP_CACHE_TTL": "300"
             }
         )
 
-        self.lambdas["get_gamestate_by_mapid_userid"] = aws_lambda.Function(
+        self.lambdas["create_gamestate_batch"] = self.create_function(
+            self,
+            "minh-intern-create_gamestate_batch",
+            handler="create_gamestate_batch.handler",
+            layers=[self.layers["custom_modules"]],
+            function_name="minh-intern-create_gamestate_batch",
+            runtime=aws_lambda.Runtime.PYTHON_3_8,
+            role=iam.Role.from_role_arn(
+                self,
+                "minh-intern-LambdaCreateGameStateBatch",
+                role_arn="arn:aws:iam::573915606947:role/ir.us.intern"
+            ),
+            environment={
+                "GAMESTATE_TABLE_NAME": "minh-intern.game_state",
+                "GAMEMAP_TABLE_NAME": "minh-intern.game_map_by_id",
+                "MAP_CACHE_TTL": "300",
+                "MAX_BATCH_SIZE": "100"
+            }
+        )
+
+        self.lambdas["get_gamestate_by_mapid_userid"] = self.create_function(
             self,
             "minh-intern-get_gamestate_by_mapid_userid",
-            code=aws_lambda.Code.from_asset("./lambda"),
             handler="get_gamestate_by_mapid_userid.handler",
+            layers=[self.layers["custom_modules"]],
             function_name="minh-intern-get_gamestate_by_mapid_userid",
             runtime=aws_lambda.Runtime.PYTHON_3_8,
             role=iam.Role.from_role_arn(
@@ -442,10 +578,73 @@ class GameApiStack(core.Stack):
             ),
             environment={
                 "GAMESTATE_TABLE_NAME": "minh-intern.game_state",
-                "GAMEMAP_TABLE_NAME": "minh-intern.game_map"
+                "GAMEMAP_TABLE_NAME": "minh-intern.game_map_by_id"
             }
         )
 
+
+    def create_function(self, scope: core.Construct, id: str, **kwargs) -> aws_lambda.IFunction:
+        """
+        Create a function of `create_lambdas` with its own package, see `get_function_code`.\n
+        In router mode, the handlers of `lambda/routes.json` are not deployed on their own: their layers
+        and environment are added to the `router` function, which is returned instead.
+        """
+
+        module_name = kwargs["handler"].split(".")[0]
+        with open(ROUTES_PATH) as f:
+            routed_modules = set(json.load(f).values())
+        if not self.router_mode or module_name not in routed_modules:
+            return aws_lambda.Function(scope, id, code=self.get_function_code(module_name), **kwargs)
+
+        if "router" not in self.lambdas:
+            self.create_router()
+        router = self.lambdas["router"]
+        for layer in kwargs.get("layers") or []:
+            if layer not in self.router_layers:
+                self.router_layers.append(layer)
+                router.add_layers(layer)
+        for name, value in (kwargs.get("environment") or {}).items():
+            # The first value of a variable is shared, the handlers needing another one get it prefixed
+            if name not in self.router_environment:
+                self.router_environment[name] = value
+                router.add_environment(name, value)
+            elif self.router_environment[name] != value:
+                router.add_environment(f"{module_name.upper()}__{name}", value)
+        return router
+
+
+    def create_router(self):
+        """
+        Create the `router` function serving the api routes in router mode
+        """
+
+        self.router_environment = {}
+        self.router_layers = []
+        self.lambdas["router"] = aws_lambda.Function(
+            self,
+            "minh-intern-router",
+            code=self.get_function_code("router"),
+            handler="router.handler",
+            function_name="minh-intern-router",
+            runtime=aws_lambda.Runtime.PYTHON_3_8,
+            role=iam.Role.from_role_arn(
+                self,
+                "minh-intern-LambdaRouter",
+                role_arn="arn:aws:iam::573915606947:role/ir.us.intern"
+            ),
+            # Enough for the slowest route, the upload of map files
+            memory_size=512,
+            timeout=core.Duration.seconds(29)
+        )
+
+
+    def get_function_code(self, module_name: str) -> aws_lambda.Code:
+        """
+        Package of the function whose handler is in `lambda/<module_name>.py`, see `bundling.build_function`
+        """
+
+        return aws_lambda.Code.from_asset(bundling.build_function(module_name)["path"])
+
     
     def create_layers(self):
         """
@@ -463,10 +662,15 @@ class GameApiStack(core.Stack):
             "minh-intern-bcrypt",
             "arn:aws:lambda:us-east-1:770693421928:layer:Klayers-python38-bcrypt:6"
         )
+        self.layers["pillow"] = aws_lambda.LayerVersion.from_layer_version_arn(
+            self,
+            "minh-intern-pillow",
+            "arn:aws:lambda:us-east-1:770693421928:layer:Klayers-python38-Pillow:4"
+        )
         self.layers["custom_modules"] = aws_lambda.LayerVersion(
             self,
             "minh-intern-custom_modules",
-            code=aws_lambda.Code.from_asset("./layers/__custom__.zip"),
+            code=aws_lambda.Code.from_asset(bundling.build_layer()["path"]),
             layer_version_name="minh-intern-custom_modules"
         )
 
@@ -496,6 +700,17 @@ class GameApiStack(core.Stack):
             )]
         )
 
+        # Private bucket holding the token revocation snapshot
+        self.buckets["auth_bucket"] = s3.Bucket(
+            self,
+            "minh-intern.auth-bucket",
+            bucket_name="minh-intern.auth-bucket",
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL
+        )
+        self.buckets["auth_bucket"].grant_read_write(self.lambdas["build_revocation_snapshot"])
+        self.buckets["auth_bucket"].grant_read(self.lambdas["authorize_user"])
+        self.buckets["auth_bucket"].grant_read(self.lambdas["acquire_access_token"])
+
 
     def add_models_to_rest(self) -> None:
         """
@@ -511,6 +726,7 @@ class GameApiStack(core.Stack):
         self.models["create_user_model"] = self.rest_api.add_model("CreateUserModel", **models.create_user_model)
         self.models["update_user_model"] = self.rest_api.add_model("UpdateUserModel", **models.update_user_model)
         self.models["profile_model"] = self.rest_api.add_model("ProfileModel", **models.profile_model)
+        self.models["batch_gamestate_model"] = self.rest_api.add_model("BatchGameStateModel", **models.batch_gamestate_model)
 
     
     def add_authorizers(self) -> None:
@@ -676,6 +892,7 @@ class GameApiStack(core.Stack):
     def define_game_map_route(self):
         map_resource = self.rest_api.root.add_resource("map")
         specific_map_resource = map_resource.add_resource("{id}")
+        map_tiles_resource = specific_map_resource.add_resource("tiles")
 
         map_resource.add_method(
             "OPTIONS",
@@ -705,7 +922,7 @@ class GameApiStack(core.Stack):
                 validate_request_parameters=True
             ),
             request_parameters={
-                "method.request.querystring.page": True
+                "method.request.querystring.cursor": False
             },
             authorizer=self.authorizers["user_authorizer"]
         )
@@ -734,6 +951,34 @@ class GameApiStack(core.Stack):
             authorizer=self.authorizers["user_authorizer"]
         )
 
+        map_tiles_resource.add_method(
+            "OPTIONS",
+            integration=self.cors_integration
+        )
+
+        map_tiles_resource.add_method(
+            "GET",
+            integration=aws_apigateway.LambdaIntegration(
+                self.lambdas["get_map_tiles"],
+                proxy=True
+            ),
+            request_validator=aws_apigateway.RequestValidator(
+                self,
+                "get_map_tiles_validator_prud",
+                rest_api=self.rest_api,
+                request_validator_name="get_map_tiles_validator",
+                validate_request_parameters=True
+            ),
+            request_parameters={
+                "method.request.path.id": True,
+                "method.request.querystring.x": True,
+                "method.request.querystring.y": True,
+                "method.request.querystring.width": True,
+                "method.request.querystring.height": True
+            },
+            authorizer=self.authorizers["user_authorizer"]
+        )
+
         specific_map_resource.add_method(
             "PUT",
             integration=aws_apigateway.LambdaIntegration(
@@ -757,6 +1002,7 @@ class GameApiStack(core.Stack):
     def define_gamestate_route(self):
         gamestate_resource = self.rest_api.root.add_resource("gamestate")
         specific_gamestate_resource = gamestate_resource.add_resource("{map_id}")
+        batch_gamestate_resource = gamestate_resource.add_resource("batch")
 
         gamestate_resource.add_method(
             "OPTIONS",
@@ -778,7 +1024,8 @@ class GameApiStack(core.Stack):
             ),
             request_parameters={
                 "method.request.querystring.map_id": True,
-                "method.request.querystring.state": True
+                "method.request.querystring.state": True,
+                "method.request.querystring.from_state": False
             },
             authorizer=self.authorizers["user_authorizer"]
         )
@@ -797,7 +1044,7 @@ class GameApiStack(core.Stack):
                 validate_request_parameters=True
             ),
             request_parameters={
-                "method.request.querystring.page": True
+                "method.request.querystring.cursor": False
             },
             authorizer=self.authorizers["user_authorizer"]
         )
@@ -824,4 +1071,28 @@ class GameApiStack(core.Stack):
                 "method.request.path.map_id": True,
             },
             authorizer=self.authorizers["user_authorizer"]
+        )
+
+        batch_gamestate_resource.add_method(
+            "OPTIONS",
+            integration=self.cors_integration
+        )
+
+        batch_gamestate_resource.add_method(
+            "POST",
+            integration=aws_apigateway.LambdaIntegration(
+                self.lambdas["create_gamestate_batch"],
+                proxy=True
+            ),
+            request_validator=aws_apigateway.RequestValidator(
+                self,
+                "create_gamestate_batch_validator_prud",
+                rest_api=self.rest_api,
+                request_validator_name="create_gamestate_batch_validator",
+                validate_request_body=True
+            ),
+            request_models={
+                "application/json": self.models["batch_gamestate_model"]
+            },
+            authorizer=self.authorizers["user_authorizer"]
         )
\ No newline at end of file
@@ -1,14 +1,31 @@
 import json
-import boto3
-import jwt
-import datetime
 import os
-from custom import (generate_access_token, parse_cookies)
+from custom import (
+    generate_access_token,
+    parse_cookies,
+    RevocationSet,
+    STATEFUL_MODE,
+    STATELESS_MODE,
+    can_skip_user_lookup,
+    is_token_epoch_valid,
+    lazy_import,
+    lazy_table,
+    lazy_client
+)
 
-db = boto3.resource("dynamodb")
 USER_TABLE_NAME = os.environ.get("TABLE_NAME")
 JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
-users = db.Table(USER_TABLE_NAME)
+TOKEN_VALIDATION_MODE = os.environ.get("TOKEN_VALIDATION_MODE", STATEFUL_MODE)
+users = lazy_table(USER_TABLE_NAME)
+jwt = lazy_import("jwt")
+revocation_set = None
+if TOKEN_VALIDATION_MODE == STATELESS_MODE:
+    revocation_set = RevocationSet(
+        lazy_client("s3"),
+        os.environ.get("REVOCATION_BUCKET_NAME"),
+        os.environ.get("REVOCATION_OBJECT_KEY"),
+        int(os.environ.get("REVOCATION_REFRESH_INTERVAL", RevocationSet.DEFAULT_REFRESH_INTERVAL))
+    )
 
 def handler(event, context):
     cookies = parse_cookies(event["headers"]["Cookie"])
@@ -29,15 +46,17 @@ def handler(event, context):
         payload = jwt.decode(refresh_token, JWT_SECRET_KEY, algorithms=["HS256"])
         user_id = payload["user_id"]
         print(f"user_id: {user_id}")
-        # Check if user exists
-        response = users.get_item(
-            Key={
-                "user_id": user_id
-            }
-        )
-        if response.get("Item") is None:
-            raise Exception("User is invalid")
-        new_token = generate_access_token(payload["user_id"], JWT_SECRET_KEY)
+        # Check if user exists, unless the revocation set vouches for the token
+        if can_skip_user_lookup(payload, revocation_set) is False:
+            response = users.get_item(
+                Key={
+                    "user_id": user_id
+                }
+            )
+            user = response.get("Item")
+            if user is None or is_token_epoch_valid(payload, user) is False:
+                raise Exception("User is invalid")
+        new_token = generate_access_token(payload["user_id"], JWT_SECRET_KEY, payload.get("epoch"))
     except jwt.ExpiredSignatureError:
         error = "The token has been expired"
     except jwt.InvalidTokenError:
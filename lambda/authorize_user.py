@@ -1,17 +1,43 @@
 import os
 import json
-import boto3
 from custom import (
     decode_user_token,
     generate_allow_policy,
     generate_deny_policy,
-    parse_cookies
+    parse_cookies,
+    AuthorizationCache,
+    RevocationSet,
+    STATEFUL_MODE,
+    STATELESS_MODE,
+    can_skip_user_lookup,
+    is_token_epoch_valid,
+    lazy_table,
+    lazy_client
 )
 
-db = boto3.resource("dynamodb")
 JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
 TABLE_NAME = os.environ.get("TABLE_NAME")
-users = db.Table(TABLE_NAME)
+AUTH_CACHE_MAX_SIZE = int(os.environ.get("AUTH_CACHE_MAX_SIZE", AuthorizationCache.DEFAULT_MAX_SIZE))
+AUTH_CACHE_TTL = int(os.environ.get("AUTH_CACHE_TTL", AuthorizationCache.DEFAULT_TTL))
+AUTH_CACHE_NEGATIVE_TTL = int(os.environ.get("AUTH_CACHE_NEGATIVE_TTL", AuthorizationCache.DEFAULT_NEGATIVE_TTL))
+# The hits and misses of the cache are logged once every this many calls
+AUTH_CACHE_STATS_INTERVAL = int(os.environ.get("AUTH_CACHE_STATS_INTERVAL", 100))
+users = lazy_table(TABLE_NAME)
+# Lives as long as the warm container
+authorization_cache = AuthorizationCache(
+    max_size=AUTH_CACHE_MAX_SIZE,
+    ttl=AUTH_CACHE_TTL,
+    negative_ttl=AUTH_CACHE_NEGATIVE_TTL
+)
+TOKEN_VALIDATION_MODE = os.environ.get("TOKEN_VALIDATION_MODE", STATEFUL_MODE)
+revocation_set = None
+if TOKEN_VALIDATION_MODE == STATELESS_MODE:
+    revocation_set = RevocationSet(
+        lazy_client("s3"),
+        os.environ.get("REVOCATION_BUCKET_NAME"),
+        os.environ.get("REVOCATION_OBJECT_KEY"),
+        int(os.environ.get("REVOCATION_REFRESH_INTERVAL", RevocationSet.DEFAULT_REFRESH_INTERVAL))
+    )
 
 def handler(event, context):
     """
@@ -24,26 +50,45 @@ def handler(event, context):
             "error": "Token has invalid format"
         })
     token = token.split(" ")[1]
-    decode_data = decode_user_token(token, JWT_SECRET_KEY)
-    if decode_data["error"] is not None:
-        raise Exception("Unauthorized")
-    print(decode_data)
-    user_id = decode_data["payload"]["user_id"]
-    response = users.get_item(
-        Key={
-            "user_id": user_id
-        }
-    )
-    user = response.get("Item")
-    if user is None:
+    decision = authorization_cache.get(token)
+    if decision is None:
+        decode_data = decode_user_token(token, JWT_SECRET_KEY)
+        if decode_data["error"] is not None:
+            raise Exception("Unauthorized")
+        payload = decode_data["payload"]
+        user_id = payload["user_id"]
+        if can_skip_user_lookup(payload, revocation_set):
+            decision = {
+                "user_id": user_id
+            }
+        else:
+            response = users.get_item(
+                Key={
+                    "user_id": user_id
+                }
+            )
+            user = response.get("Item")
+            is_valid = user is not None and is_token_epoch_valid(payload, user)
+            decision = {
+                "user_id": user_id if is_valid else None
+            }
+        authorization_cache.put(token, decision["user_id"], payload.get("exp"))
+    log_cache_stats()
+    if decision["user_id"] is None:
         return generate_deny_policy(None, event["methodArn"], {
             "error": "Token is invalid"
         })
-    return generate_allow_policy(user["user_id"], event["methodArn"], {
-        "user_id": user["user_id"]
+    return generate_allow_policy(decision["user_id"], event["methodArn"], {
+        "user_id": decision["user_id"]
     })
 
 
+def log_cache_stats():
+    stats = authorization_cache.stats()
+    if (stats["hits"] + stats["misses"]) % AUTH_CACHE_STATS_INTERVAL == 0:
+        print(f"authorization cache: {stats}")
+
+
 def is_token_right_format(token: str):
     token_parts = token.split(" ")
     if len(token_parts) != 2 or token_parts[0].lower() != "token":
@@ -1,12 +1,10 @@
 import os
 import json
-import boto3
-from custom import decode_user_token
+from custom import (decode_user_token, lazy_table)
 
-db = boto3.resource("dynamodb")
 JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
 TABLE_NAME = os.environ.get("TABLE_NAME")
-users = db.Table(TABLE_NAME)
+users = lazy_table(TABLE_NAME)
 
 def handler(event, context):
     token = event["authorizationToken"]
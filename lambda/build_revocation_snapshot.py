@@ -0,0 +1,41 @@
+import os
+from custom import (build_revocation_filter, lazy_table, lazy_client)
+
+s3 = lazy_client("s3")
+USER_TABLE_NAME = os.environ.get("TABLE_NAME")
+REVOCATION_BUCKET_NAME = os.environ.get("REVOCATION_BUCKET_NAME")
+REVOCATION_OBJECT_KEY = os.environ.get("REVOCATION_OBJECT_KEY")
+users = lazy_table(USER_TABLE_NAME)
+
+def handler(event, context):
+    """
+    Scheduled job publishing the revoked token epochs used by the stateless authorizers
+    """
+
+    user_epochs = scan_user_epochs()
+    bloom = build_revocation_filter(user_epochs)
+    s3.put_object(
+        Bucket=REVOCATION_BUCKET_NAME,
+        Key=REVOCATION_OBJECT_KEY,
+        Body=bloom.to_bytes(),
+        ContentType="application/octet-stream"
+    )
+    print(f"Revocation snapshot: {len(user_epochs)} users, {bloom.size} bits")
+
+
+def scan_user_epochs() -> dict:
+    user_epochs = {}
+    params = {
+        "ProjectionExpression": "user_id, token_epoch",
+        "FilterExpression": "token_epoch > :zero",
+        "ExpressionAttributeValues": {
+            ":zero": 0
+        }
+    }
+    while True:
+        response = users.scan(**params)
+        for item in response.get("Items"):
+            user_epochs[item["user_id"]] = int(item["token_epoch"])
+        if response.get("LastEvaluatedKey") is None:
+            return user_epochs
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
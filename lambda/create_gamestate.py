@@ -1,37 +1,56 @@
-import boto3
 import os
 import json
 import datetime
+from custom import (
+    TTLCache,
+    lazy_table
+)
 
-db = boto3.resource("dynamodb")
 GAMEMAP_TABLE_NAME = os.environ.get("GAMEMAP_TABLE_NAME")
 GAMESTATE_TABLE_NAME = os.environ.get("GAMESTATE_TABLE_NAME")
-game_maps = db.Table(GAMEMAP_TABLE_NAME)
-game_states = db.Table(GAMESTATE_TABLE_NAME)
+MAP_CACHE_TTL = int(os.environ.get("MAP_CACHE_TTL", TTLCache.DEFAULT_TTL))
+game_maps = lazy_table(GAMEMAP_TABLE_NAME)
+game_states = lazy_table(GAMESTATE_TABLE_NAME)
 STATE_VALUES = ["NA", "AR", "OP"]
+# Ids of maps known to exist, maps are never deleted so only hits are cached
+existing_maps = TTLCache(ttl=MAP_CACHE_TTL)
 
 def handler(event, context):
     query = event["queryStringParameters"]
     map_id, state = (query["map_id"], query["state"])
+    # Optional state the saved game must be in for the transition to apply
+    from_state = query.get("from_state")
     user_id = event["requestContext"]["authorizer"]["user_id"]
     
     # State is invalid
-    if state not in STATE_VALUES:
+    for value in [state, from_state]:
+        if value is not None and value not in STATE_VALUES:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({
+                    "error": f"state '{value}' is invalid"
+                }),
+                "headers": {
+                    "Access-Control-Allow-Origin": "*"
+                }
+            }
+    map_not_found = get_map_not_found_response(map_id)
+    # Map is not found
+    if map_not_found is not None:
+        return map_not_found
+
+    try:
+        game_state = create_gamestate(user_id, map_id, state, from_state)
+    except game_states.meta.client.exceptions.ConditionalCheckFailedException:
         return {
-            "statusCode": 400,
+            "statusCode": 409,
             "body": json.dumps({
-                "error": f"state '{state}' is invalid"
+                "error": f"The game state is not '{from_state}'"
             }),
             "headers": {
                 "Access-Control-Allow-Origin": "*"
             }
         }
-    map_not_found = get_map_not_found_response(map_id)
-    # Map is not found
-    if map_not_found is not None:
-        return map_not_found
-
-    game_state = create_gamestate(user_id, map_id, state)
     return {
         "statusCode": 201,
         "body": json.dumps(game_state),
@@ -42,59 +61,55 @@ def handler(event, context):
 
 
 def get_map_not_found_response(map_id):
-    response = game_maps.query(
-        IndexName="game-map-unique-map-id",
-        KeyConditionExpression="id=:mi",
-        ExpressionAttributeValues={
-            ":mi": map_id
-        }
+    if existing_maps.get(map_id) is not None:
+        return None
+    response = game_maps.get_item(
+        Key={
+            "id": map_id
+        },
+        ProjectionExpression="id",
+        ConsistentRead=True
     )
-    if len(response.get("Items")) == 0:
+    if response.get("Item") is None:
         return {
             "statusCode": 404,
             "body": json.dumps({
                 "error": "Map not found"
-            })
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
         }
+    existing_maps.put(map_id, True)
     return None
 
 
-def get_gamestate(user_id, map_id):
-    response = game_states.get_item(
-        Key={
-            "user_id": user_id,
-            "map_id": map_id
-        }
-    )
-    return response.get("Item")
+def create_gamestate(user_id, map_id, state, from_state = None):
+    """
+    Upsert the game state in one `UpdateItem` and return the saved item.\n
+    With `from_state` the update only applies if the saved state is `from_state`,
+    a game that was never saved is in state `NA`.
+    """
 
-def create_gamestate(user_id, map_id, state):
-    response = game_states.get_item(
-        Key={
+    now = str(datetime.datetime.now())
+    params = {
+        "Key": {
             "user": user_id,
             "game_map": map_id
-        }
-    )
-    game_state = response.get("Item")
-    if game_state is not None:
-        game_state["state"] = state
-        game_state["saved_date"] = str(datetime.datetime.now())
-        game_states.put_item(
-            Item=game_state
-        )
-        return game_state
-    game_state = {
-        "user": user_id,
-        "game_map": map_id,
-        "state": state,
-        "saved_date": str(datetime.datetime.now())
+        },
+        "UpdateExpression": "SET #state = :s, saved_date = :now, created_date = if_not_exists(created_date, :now)",
+        "ExpressionAttributeNames": {
+            "#state": "state"
+        },
+        "ExpressionAttributeValues": {
+            ":s": state,
+            ":now": now
+        },
+        "ReturnValues": "ALL_NEW"
     }
-    game_states.put_item(
-        Item = game_state
-    )
-    return game_state
-
-
-    
-
-
+    if from_state is not None:
+        params["ConditionExpression"] = "#state = :from"
+        if from_state == "NA":
+            params["ConditionExpression"] += " OR attribute_not_exists(#state)"
+        params["ExpressionAttributeValues"][":from"] = from_state
+    return game_states.update_item(**params)["Attributes"]
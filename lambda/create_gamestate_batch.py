@@ -0,0 +1,138 @@
+import os
+import json
+import datetime
+from custom import (
+    TTLCache,
+    batch_get_items,
+    batch_write_items,
+    lazy_resource
+)
+
+db = lazy_resource("dynamodb")
+GAMEMAP_TABLE_NAME = os.environ.get("GAMEMAP_TABLE_NAME")
+GAMESTATE_TABLE_NAME = os.environ.get("GAMESTATE_TABLE_NAME")
+MAP_CACHE_TTL = int(os.environ.get("MAP_CACHE_TTL", TTLCache.DEFAULT_TTL))
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 100))
+STATE_VALUES = ["NA", "AR", "OP"]
+# Ids of maps known to exist, maps are never deleted so only hits are cached
+existing_maps = TTLCache(ttl=MAP_CACHE_TTL)
+
+def handler(event, context):
+    payload = json.loads(event["body"])
+    entries = payload["game_states"]
+    user_id = event["requestContext"]["authorizer"]["user_id"]
+
+    # Too many game states in one request
+    if len(entries) > MAX_BATCH_SIZE:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({
+                "error": f"At most {MAX_BATCH_SIZE} game states can be saved at once"
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
+        }
+
+    results = [None] * len(entries)
+    valid_entries = {}
+    for index, entry in enumerate(entries):
+        map_id, state = (entry["map_id"], entry["state"])
+        if state not in STATE_VALUES:
+            results[index] = get_item_result(map_id, 400, f"state '{state}' is invalid")
+        elif map_id in valid_entries:
+            # One `BatchWriteItem` cannot write the same key twice, the last entry wins
+            previous_index = valid_entries[map_id]["index"]
+            results[previous_index] = get_item_result(map_id, 400, "Duplicated map_id")
+            valid_entries[map_id] = {"index": index, "state": state}
+        else:
+            valid_entries[map_id] = {"index": index, "state": state}
+
+    for map_id in get_missing_map_ids(list(valid_entries)):
+        results[valid_entries.pop(map_id)["index"]] = get_item_result(map_id, 404, "Map not found")
+
+    for map_id, result in save_gamestates(user_id, valid_entries).items():
+        results[valid_entries[map_id]["index"]] = result
+
+    return {
+        "statusCode": 200,
+        "body": json.dumps({
+            "results": results
+        }),
+        "headers": {
+            "Access-Control-Allow-Origin": "*"
+        }
+    }
+
+
+def get_item_result(map_id, status_code, error = None) -> dict:
+    result = {
+        "map_id": map_id,
+        "statusCode": status_code
+    }
+    if error is not None:
+        result["error"] = error
+    return result
+
+
+def get_missing_map_ids(map_ids) -> list:
+    """
+    Return the ids of `map_ids` with no map, looked up with one `BatchGetItem` for the uncached ids
+    """
+
+    unknown_ids = [map_id for map_id in map_ids if existing_maps.get(map_id) is None]
+    if len(unknown_ids) == 0:
+        return []
+    game_maps = batch_get_items(
+        db,
+        GAMEMAP_TABLE_NAME,
+        [{"id": map_id} for map_id in unknown_ids],
+        projection_expression="id"
+    )
+    found_ids = set()
+    for game_map in game_maps:
+        existing_maps.put(game_map["id"], True)
+        found_ids.add(game_map["id"])
+    return [map_id for map_id in unknown_ids if map_id not in found_ids]
+
+
+def save_gamestates(user_id, entries: dict) -> dict:
+    """
+    Put the game states of `entries` with `BatchWriteItem` and return the result of each map id.\n
+    `BatchWriteItem` only puts whole items, so the saved game states are read first
+    to keep their `created_date` and to tell the new ones apart.
+    """
+
+    if len(entries) == 0:
+        return {}
+    now = str(datetime.datetime.now())
+    saved_states = batch_get_items(
+        db,
+        GAMESTATE_TABLE_NAME,
+        [{"user": user_id, "game_map": map_id} for map_id in entries],
+        projection_expression="game_map, created_date"
+    )
+    created_dates = {
+        game_state["game_map"]: game_state.get("created_date", now) for game_state in saved_states
+    }
+    items = [
+        {
+            "user": user_id,
+            "game_map": map_id,
+            "state": entry["state"],
+            "saved_date": now,
+            "created_date": created_dates.get(map_id, now)
+        } for map_id, entry in entries.items()
+    ]
+    unprocessed_ids = {item["game_map"] for item in batch_write_items(db, GAMESTATE_TABLE_NAME, items)}
+
+    results = {}
+    for item in items:
+        map_id = item["game_map"]
+        if map_id in unprocessed_ids:
+            results[map_id] = get_item_result(map_id, 503, "The game state was not saved, try again")
+        elif map_id in created_dates:
+            results[map_id] = get_item_result(map_id, 200)
+        else:
+            results[map_id] = get_item_result(map_id, 201)
+    return results
@@ -1,35 +1,90 @@
 import json
-import boto3
 import os
 import uuid
 import datetime
-import jwt
-import email
-import base64
+import functools
 from custom import (
     parse_binary_multipart_to_form,
-    validate_multipart_form_data
+    MultipartLimitError,
+    MultipartParseError,
+    generate_upload_post,
+    validate_multipart_form_data,
+    set_feed_attributes,
+    ShardedCounter,
+    scope_counter_name,
+    transact_write_items,
+    run_concurrently,
+    get_asset_key,
+    hash_content,
+    put_asset,
+    put_chunked_asset,
+    detect_image_content_type,
+    get_variant_urls,
+    get_map_tiles_key,
+    lazy_table,
+    lazy_client,
+    lazy_resource
 )
 
-db = boto3.resource("dynamodb")
-s3 = boto3.client("s3")
+db = lazy_resource("dynamodb")
+s3 = lazy_client("s3", endpoint_url=os.environ.get("S3_ENDPOINT_URL"))
 MAP_TABLE_NAME = os.environ.get("TABLE_NAME")
 ROW_COUNT_TABLE_NAME = os.environ.get("ROW_COUNT_TABLE_NAME")
 BUCKET_NAME = os.environ.get("S3_BUCKET_NAME")
 MAP_FOLDER = os.environ.get("S3_MAP_FOLDER")
-game_maps = db.Table(MAP_TABLE_NAME)
-row_count_table = db.Table(ROW_COUNT_TABLE_NAME)
+BUCKET_DOMAIN = os.environ.get("S3_BUCKET_DOMAIN")
+ROW_COUNT_SHARDS = int(os.environ.get("ROW_COUNT_SHARDS", 10))
+MAP_ROW_COUNT_NAME = os.environ.get("MAP_ROW_COUNT_NAME", MAP_TABLE_NAME)
+UPLOAD_EXPIRES_IN = int(os.environ.get("UPLOAD_EXPIRES_IN", 900))
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", 10 * 1024 * 1024))
+game_maps = lazy_table(MAP_TABLE_NAME)
+map_counter = ShardedCounter(db, ROW_COUNT_TABLE_NAME, MAP_ROW_COUNT_NAME, ROW_COUNT_SHARDS)
 
 
 
 required_keys = [
-    "map_image",
-    "map_file",
     "map_name"
 ]
 
+# Files of a map, the ones missing from the form are uploaded by the client with a presigned post
+map_uploads = {
+    "map_image": {
+        "prefix": "mapimage",
+        "content_type": "image/jpeg",
+        "content_type_prefix": "image/",
+        "chunked": False
+    },
+    "map_file": {
+        "prefix": "mapfile",
+        "content_type": "application/json",
+        "content_type_prefix": "application/json",
+        "chunked": True
+    }
+}
+
 def handler(event, context):
-    form = parse_binary_multipart_to_form(event)
+    try:
+        form = parse_binary_multipart_to_form(event)
+    except MultipartLimitError as e:
+        return {
+            "statusCode": 413,
+            "body": json.dumps({
+                "error": str(e)
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
+        }
+    except MultipartParseError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({
+                "error": str(e)
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
+        }
     if validate_multipart_form_data(form, required_keys) is False:
         return {
             "statusCode": 400,
@@ -44,32 +99,43 @@ def handler(event, context):
     # Construct the payload before saving to database
     payload = construct_payload(form, user_id)
 
-    try:
-        map_image, map_file = (payload["map_image"], payload["map_file"])
-        del payload["map_image"]
-        del payload["map_file"]
-        game_maps.put_item(
-            Item=payload
-        )
-        s3.put_object(
-            Bucket=BUCKET_NAME, 
-            Key=MAP_FOLDER + "/" + map_image["file_name"], 
-            Body=map_image["data"],
-            ACL="public-read",
-            ContentType="image/jpeg"
+    files = {}
+    for key in map_uploads:
+        value = payload.pop(key, None)
+        if isinstance(value, dict):
+            files[key] = value
+    # Files sent in the form are stored under their content hash, recorded on the map
+    for key, file in files.items():
+        file["hash"] = hash_content(file["data"])
+        payload[f"{key}_hash"] = file["hash"]
+        payload[f"{key}_url"] = f"{BUCKET_DOMAIN}/{BUCKET_NAME}/{get_asset_key(MAP_FOLDER, file['hash'])}"
+    # The bucket notification makes the variants of a stored image under known keys
+    if "map_image" in files:
+        payload["map_image_variants"] = get_variant_urls(
+            f"{BUCKET_DOMAIN}/{BUCKET_NAME}",
+            get_asset_key(MAP_FOLDER, files["map_image"]["hash"])
         )
-        s3.put_object(
-            Bucket=BUCKET_NAME, 
-            Key=MAP_FOLDER + "/" + map_file["file_name"], 
-            Body=map_file["data"],
-            ACL="public-read",
-            ContentType="application/json"
-        )
-        update_row_count()
+    # So does the tile encoding of a stored map file
+    if "map_file" in files:
+        map_file_key = get_asset_key(MAP_FOLDER, files["map_file"]["hash"])
+        payload["map_tiles_url"] = f"{BUCKET_DOMAIN}/{BUCKET_NAME}/{get_map_tiles_key(map_file_key)}"
+
+    try:
+        # The map and its files are written at once, a failed upload undoes the map.
+        # Assets may be shared with other maps, so they are never deleted
+        tasks = [functools.partial(write_game_map, payload, user_id)]
+        rollbacks = [functools.partial(delete_game_map, user_id=user_id)]
+        for key in files:
+            tasks.append(functools.partial(put_map_file, key, files[key]))
+            rollbacks.append(None)
+        run_concurrently(tasks, rollbacks)
+        uploads = get_upload_posts(payload["id"], files)
         return {
             "statusCode": 201,
             "body": json.dumps({
-                "message": "Create map successfully"
+                "message": "Create map successfully",
+                "map_id": payload["id"],
+                "uploads": uploads
             }),
             "headers": {
                 "Access-Control-Allow-Origin": "*"
@@ -88,35 +154,102 @@ def handler(event, context):
         }
 
 
-def update_row_count():
-    response = row_count_table.get_item(
-        Key={
-            "table_name": MAP_TABLE_NAME
-        }
+def write_game_map(payload, user_id):
+    """
+    Write the map and its counters in one transaction so the totals stay exact, return the map id
+    """
+
+    transact_write_items(db, [
+        {
+            "Put": {
+                "TableName": MAP_TABLE_NAME,
+                "Item": payload,
+                "ConditionExpression": "attribute_not_exists(id)"
+            }
+        },
+        map_counter.increment_operation(),
+        get_creator_counter(user_id).increment_operation()
+    ])
+    return payload["id"]
+
+
+def delete_game_map(map_id, user_id):
+    transact_write_items(db, [
+        {
+            "Delete": {
+                "TableName": MAP_TABLE_NAME,
+                "Key": {
+                    "id": map_id
+                }
+            }
+        },
+        map_counter.increment_operation(-1),
+        get_creator_counter(user_id).increment_operation(-1)
+    ])
+
+
+def get_map_file_key(key, map_id):
+    return f"{MAP_FOLDER}/{map_uploads[key]['prefix']}_{map_id}"
+
+
+def put_map_file(key, file):
+    """
+    Store a file sent in the form as a content addressed asset.\n
+    An unchanged file is not uploaded again, only the changed chunks of a large map file are.
+    """
+
+    upload = map_uploads[key]
+    content_type = upload["content_type"]
+    if content_type.startswith("image/"):
+        content_type = detect_image_content_type(file["data"], content_type)
+    store = put_chunked_asset if upload["chunked"] else put_asset
+    return store(
+        s3,
+        BUCKET_NAME,
+        MAP_FOLDER,
+        file["data"],
+        content_type,
+        content_hash=file["hash"]
     )
-    table = response.get("Item")
-    if table is None:
-        raise Exception("Table name not found")
-    count = table["row_count"] + 1
-    item = {
-        "table_name": MAP_TABLE_NAME,
-        "row_count": count
-    }
-    try:
-        row_count_table.put_item(
-            Item=item
+
+
+def get_upload_posts(map_id, files):
+    """
+    Return a presigned post for each file missing from the form
+    """
+
+    posts = {}
+    for key, upload in map_uploads.items():
+        if key in files:
+            continue
+        posts[key] = generate_upload_post(
+            s3,
+            BUCKET_NAME,
+            get_map_file_key(key, map_id),
+            upload["content_type_prefix"],
+            MAX_UPLOAD_SIZE,
+            UPLOAD_EXPIRES_IN
         )
-    except Exception as e:
-        print(f"Update table row count error: {e}")
+    return posts
+
+
+def get_creator_counter(user_id):
+    return ShardedCounter(
+        db,
+        ROW_COUNT_TABLE_NAME,
+        scope_counter_name(MAP_ROW_COUNT_NAME, "created_by", user_id),
+        ROW_COUNT_SHARDS
+    )
 
 def construct_payload(form, user_id):
     payload = get_payload_from_form(form)
     map_id = uuid.uuid4().hex[:10]
     payload["id"] = map_id
     payload["created_by"] = user_id
-    payload["last_edited"] = str(datetime.datetime.now())
-    payload["map_image"]["file_name"] = f"mapimage_{map_id}"
-    payload["map_file"]["file_name"] = f"mapfile_{map_id}"
+    created_at = datetime.datetime.now()
+    payload["last_edited"] = str(created_at)
+    payload["version"] = 1
+    set_feed_attributes(payload, created_at)
     return payload
 
 
@@ -1,53 +1,111 @@
-import json
-import boto3
-import datetime
 import os
+from custom import (
+    get_map_tiles_key,
+    get_variant_urls,
+    is_variant_key,
+    process_s3_event,
+    put_image_variants,
+    put_map_tiles,
+    lazy_table,
+    lazy_client
+)
 
 
-db = boto3.resource("dynamodb")
+s3 = lazy_client("s3")
 MAP_TABLE_NAME = os.environ.get("TABLE_NAME")
 BUCKET_DOMAIN = os.environ.get("S3_BUCKET_DOMAIN")
-game_maps = db.Table(MAP_TABLE_NAME)
+game_maps = lazy_table(MAP_TABLE_NAME)
 
 def handler(event, context):
-    bucket_name = event["Records"][0]["s3"]["bucket"]["name"]
-    object_name = event["Records"][0]["s3"]["object"]["key"]
-    file_url = f"{BUCKET_DOMAIN}/{bucket_name}/{object_name}"
+    process_s3_event(event, get_target, process_records)
+
+
+def get_target(record):
+    object_name = record["key"]
+    if is_variant_key(object_name):
+        return None
     parts = object_name.split("_")
-    file_type = parts[0].split("/")[1]
-    map_id = parts[1]
-
-    response = game_maps.query(
-        IndexName="game-map-unique-map-id",
-        KeyConditionExpression="id = :id",
-        ExpressionAttributeValues={
-            ":id": map_id
-        }
-    )
-    if len(response.get("Items"))== 0:
-        print("Error: map_id not found" + map_id)
+    # Content addressed assets and their chunks are recorded on the map by the handlers,
+    # only the variants of the images and map files are left to make
+    if len(parts) != 2:
+        return ("asset", object_name)
+    return ("map", parts[1])
+
+
+def process_records(target, records):
+    kind, name = target
+    if kind == "asset":
+        bucket_name = records[0]["bucket_name"]
+        content_type = s3.head_object(Bucket=bucket_name, Key=name).get("ContentType", "")
+        if content_type.startswith("image/"):
+            make_variants(bucket_name, name)
+        elif content_type == "application/json":
+            make_map_tiles(bucket_name, name)
         return
-    
-    game_map = response.get("Items")[0]
-    field = None
-    if file_type == "mapimage":
-        field = "map_image_url"
-    else:
-        field = "map_file_url"
+    map_id = name
+
+    # The map image and the map file of one map are recorded with a single update
+    files = {}
+    for record in records:
+        file_type = record["key"].split("_")[0].split("/")[1]
+        field = "map_image" if file_type == "mapimage" else "map_file"
+        files[field] = record
+    # The version of the map changes with its files, it is the ETag clients send back to update it
+    assignments = ["#version = if_not_exists(#version, :zero) + :one"]
+    removals = []
+    names = {
+        "#version": "version"
+    }
+    values = {
+        ":zero": 0,
+        ":one": 1
+    }
+    for field, record in files.items():
+        base_url = f"{BUCKET_DOMAIN}/{record['bucket_name']}"
+        assignments.append(f"#{field}_url=:{field}_url")
+        removals.append(f"#{field}_hash")
+        names[f"#{field}_url"] = f"{field}_url"
+        names[f"#{field}_hash"] = f"{field}_hash"
+        values[f":{field}_url"] = f"{base_url}/{record['key']}"
+        if field == "map_image":
+            assignments.append("map_image_variants=:variants")
+            values[":variants"] = get_variant_urls(base_url, record["key"])
+        else:
+            assignments.append("map_tiles_url=:tiles")
+            values[":tiles"] = f"{base_url}/{get_map_tiles_key(record['key'])}"
+    # Any other error is raised as well, `process_s3_event` reports the group and the
+    # notification is retried instead of losing the url
     try:
-        response = game_maps.update_item(
+        # The file uploaded with a presigned post replaces the content addressed one
+        game_maps.update_item(
             Key={
-                "created_by": game_map["created_by"],
-                "last_edited": game_map["last_edited"]
-            },
-            UpdateExpression="SET #url=:value",
-            ExpressionAttributeNames={
-                "#url": field
+                "id": map_id
             },
-            ExpressionAttributeValues={
-                ":value": file_url
-            }
+            UpdateExpression=f"SET {', '.join(assignments)} REMOVE {', '.join(removals)}",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ConditionExpression="attribute_exists(id)"
         )
-    except Exception as e: 
-        print(e)
+    except game_maps.meta.client.exceptions.ConditionalCheckFailedException:
+        # The file can be put while the map is still being written,
+        # raising lets the bucket notification retry the update
+        raise Exception(f"Map {map_id} not found")
+    for field, record in files.items():
+        if field == "map_image":
+            make_variants(record["bucket_name"], record["key"])
+        else:
+            make_map_tiles(record["bucket_name"], record["key"])
 
+
+def make_variants(bucket_name, object_name):
+    try:
+        put_image_variants(s3, bucket_name, object_name)
+    except Exception as e:
+        print(f"Make image variants error: {e}")
+
+
+def make_map_tiles(bucket_name, object_name):
+    try:
+        put_map_tiles(s3, bucket_name, object_name)
+    except Exception as e:
+        print(f"Make map tiles error: {e}")
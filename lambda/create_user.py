@@ -1,24 +1,30 @@
 import json
-import boto3
 import os
 import uuid
-import bcrypt
-import datetime
-import jwt
-import email
-import base64
+import functools
 from custom import (
-    generate_access_token, 
-    parse_binary_multipart_to_form
+    generate_access_token,
+    parse_binary_multipart_to_form,
+    MultipartLimitError,
+    MultipartParseError,
+    MemoryViewReader,
+    generate_upload_post,
+    run_concurrently,
+    detect_image_content_type,
+    lazy_import,
+    lazy_table,
+    lazy_client
 )
 
-db = boto3.resource("dynamodb")
-s3 = boto3.client("s3")
+s3 = lazy_client("s3", endpoint_url=os.environ.get("S3_ENDPOINT_URL"))
 USER_TABLE_NAME = os.environ.get("TABLE_NAME")
 JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
 BUCKET_NAME = os.environ.get("S3_BUCKET_NAME")
 FOLDER_NAME = os.environ.get("S3_USER_FOLDER_NAME")
-users = db.Table(USER_TABLE_NAME)
+UPLOAD_EXPIRES_IN = int(os.environ.get("UPLOAD_EXPIRES_IN", 900))
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", 10 * 1024 * 1024))
+users = lazy_table(USER_TABLE_NAME)
+bcrypt = lazy_import("bcrypt")
 
 
 
@@ -31,7 +37,28 @@ required_keys = [
 ]
 
 def handler(event, context):
-    form = parse_binary_multipart_to_form(event)
+    try:
+        form = parse_binary_multipart_to_form(event)
+    except MultipartLimitError as e:
+        return {
+            "statusCode": 413,
+            "body": json.dumps({
+                "error": str(e)
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
+        }
+    except MultipartParseError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({
+                "error": str(e)
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
+        }
     are_keys_represented = all(form.get(key) is not None for key in required_keys)
     if are_keys_represented is False:
         return {
@@ -50,20 +77,32 @@ def handler(event, context):
     # Construct the payload before saving to database
     payload = construct_payload(form)
     try:
-        picture = payload["picture"]
-        del payload["picture"]
-        users.put_item(
-            Item=payload
-        )
-        s3.put_object(
-            Bucket=BUCKET_NAME, 
-            Key=FOLDER_NAME + "/" + picture["file_name"], 
-            Body=picture["data"], 
-            ACL="public-read",
-            ContentType="image/jpeg"
-        )
-        payload["access_token"] = generate_access_token(payload["user_id"], JWT_SECRET_KEY)
+        picture = payload.pop("picture")
+        # Without a picture in the form the client uploads it with the presigned post,
+        # the `update_user_picture` bucket notification sets it on the profile
+        if isinstance(picture, dict):
+            # The user and the picture are written at once, a failed write undoes the other
+            run_concurrently(
+                [functools.partial(users.put_item, Item=payload), functools.partial(put_picture, picture)],
+                [lambda _: users.delete_item(Key={"user_id": payload["user_id"]}), delete_picture]
+            )
+        else:
+            users.put_item(
+                Item=payload
+            )
+            payload["uploads"] = {
+                "picture": generate_upload_post(
+                    s3,
+                    BUCKET_NAME,
+                    FOLDER_NAME + "/" + picture,
+                    "image/",
+                    MAX_UPLOAD_SIZE,
+                    UPLOAD_EXPIRES_IN
+                )
+            }
+        payload["access_token"] = generate_access_token(payload["user_id"], JWT_SECRET_KEY, payload["token_epoch"])
         del payload["password"]
+        del payload["token_epoch"]
         return {
             "statusCode": 201,
             "body": json.dumps(payload),
@@ -84,6 +123,25 @@ def handler(event, context):
         }
 
 
+def put_picture(picture):
+    object_key = FOLDER_NAME + "/" + picture["file_name"]
+    s3.put_object(
+        Bucket=BUCKET_NAME, 
+        Key=object_key, 
+        Body=MemoryViewReader(picture["data"]), 
+        ACL="public-read",
+        ContentType=detect_image_content_type(picture["data"])
+    )
+    return object_key
+
+
+def delete_picture(object_key):
+    s3.delete_object(
+        Bucket=BUCKET_NAME,
+        Key=object_key
+    )
+
+
 def get_user_exists_response(username):
     response = users.query(
         IndexName="user-unique-username-project-all",
@@ -105,12 +163,16 @@ def construct_payload(form):
     payload = get_payload_from_form(form)
     user_id = uuid.uuid4().hex[:10]
     payload["user_id"] = user_id
+    payload["token_epoch"] = 0
     payload["password"] = str(bcrypt.hashpw(payload["password"].encode("utf-8"), bcrypt.gensalt()).decode("utf-8"))
-    picture_ext = form["picture"]["file_name"].split(".")[-1]
-    if not picture_ext:
-        picture_ext = ""
-    file_name = f"user_{user_id}.{picture_ext}"
-    payload["picture"]["file_name"] = file_name
+    picture = payload.get("picture")
+    if isinstance(picture, dict):
+        picture_ext = picture["file_name"].split(".")[-1]
+        if not picture_ext:
+            picture_ext = ""
+        picture["file_name"] = f"user_{user_id}.{picture_ext}"
+    else:
+        payload["picture"] = f"user_{user_id}"
     profile_keys = ["given_name", "family_name"]
     payload["profile"] = {}
     for key in payload:
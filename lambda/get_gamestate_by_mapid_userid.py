@@ -1,12 +1,11 @@
 import json
-import boto3
 import os
+from custom import (get_conditional_response, lazy_client_table)
 
-db = boto3.resource("dynamodb")
 MAP_TABLE_NAME = os.environ.get("GAMEMAP_TABLE_NAME")
 GAMESTATE_TABLE_NAME = os.environ.get("GAMESTATE_TABLE_NAME")
-game_maps = db.Table(MAP_TABLE_NAME)
-game_states = db.Table(GAMESTATE_TABLE_NAME)
+game_maps = lazy_client_table(MAP_TABLE_NAME)
+game_states = lazy_client_table(GAMESTATE_TABLE_NAME)
 
 def handler(event, context):
     map_id = event["pathParameters"]["map_id"]
@@ -25,26 +24,17 @@ def handler(event, context):
             }
         }
     game_state["game_map"] = game_map
-    return {
-        "statusCode": 200,
-        "body": json.dumps(game_state),
-        "headers": {
-            "Access-Control-Allow-Origin": "*"
-        }
-    }
+    return get_conditional_response(event, game_state)
 
 
 def get_gamemap(map_id):
-    response = game_maps.query(
-        IndexName="game-map-unique-map-id",
-        KeyConditionExpression="id=:mi",
-        ExpressionAttributeValues={
-            ":mi": map_id
-        }
+    response = game_maps.get_item(
+        Key={
+            "id": map_id
+        },
+        ConsistentRead=True
     )
-    if len(response.get("Items")) == 0:
-        return None
-    return response.get("Items")[0]
+    return response.get("Item")
 
 
 def get_gamestate(user_id, map_id):
@@ -52,7 +42,8 @@ def get_gamestate(user_id, map_id):
         Key={
             "user": user_id,
             "game_map": map_id
-        }
+        },
+        ConsistentRead=True
     )
     game_state = response.get("Item")
     if game_state is not None:
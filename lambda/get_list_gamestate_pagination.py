@@ -1,60 +1,101 @@
-import boto3
 import os
 import json
 import datetime
-from custom import (RequestPaginator)
-
-db = boto3.resource("dynamodb")
+from custom import (
+    RequestPaginator,
+    batch_get_items,
+    ShardedCounter,
+    get_feed_start_key,
+    query_map_feed,
+    MAP_FEED_MAX_BUCKETS,
+    decimal_default,
+    lazy_client_table,
+    lazy_resource
+)
+
+db = lazy_resource("dynamodb")
 GAMEMAP_TABLE_NAME = os.environ.get("GAMEMAP_TABLE_NAME")
 GAMESTATE_TABLE_NAME = os.environ.get("GAMESTATE_TABLE_NAME")
 ROW_COUNT_TABLE_NAME = os.environ.get("ROW_COUNT_TABLE_NAME")
 PAGE_SIZE = int(os.environ.get("PAGINATION_PAGE_SIZE"))
-game_maps = db.Table(GAMEMAP_TABLE_NAME)
-game_states = db.Table(GAMESTATE_TABLE_NAME)
-row_count_table = db.Table(ROW_COUNT_TABLE_NAME)
+MAP_FEED_OLDEST_BUCKET = os.environ.get("MAP_FEED_OLDEST_BUCKET")
+FEED_MAX_BUCKETS = int(os.environ.get("MAP_FEED_MAX_BUCKETS", MAP_FEED_MAX_BUCKETS))
+CURSOR_SECRET_KEY = os.environ.get("CURSOR_SECRET_KEY")
+ROW_COUNT_SHARDS = int(os.environ.get("ROW_COUNT_SHARDS", 10))
+MAP_ROW_COUNT_NAME = os.environ.get("MAP_ROW_COUNT_NAME", GAMEMAP_TABLE_NAME)
+game_maps = lazy_client_table(GAMEMAP_TABLE_NAME)
+map_counter = ShardedCounter(db, ROW_COUNT_TABLE_NAME, MAP_ROW_COUNT_NAME, ROW_COUNT_SHARDS)
 
 def handler(event, context):
-    # Validate page value
-    page = get_page(event)
-    if page is None:
+    # Retrieve all needed values
+    host = event["headers"]["Host"]
+    path = event["requestContext"]["path"]
+    url = f"https://{host}{path}"
+    user_id = event["requestContext"]["authorizer"]["user_id"]
+    total_count = get_gamestate_count()
+    paginator = RequestPaginator(
+        request=url,
+        total_result_count=total_count,
+        page_size=PAGE_SIZE,
+        param_name="cursor",
+        secret_key=CURSOR_SECRET_KEY,
+        # The keys of a cursor are keys of the map feed, they are only read back on this endpoint
+        scope=f"gamestates#user#{user_id}"
+    )
+
+    # Validate cursor value
+    cursor = get_cursor(event, paginator)
+    if cursor is None:
         return {
             "statusCode": 400,
             "body": json.dumps({
-                "detail": "Invalid page"
+                "detail": "Invalid cursor"
             }),
             "headers": {
                 "Access-Control-Allow-Origin": "*"
             }
         }
 
-    # Retrieve all needed values
-    host = event["headers"]["Host"]
-    path = event["requestContext"]["path"]
-    url = f"https://{host}{path}"
-    last_map_id = event["headers"]["amz-last-map-id"]
-    user_id = event["requestContext"]["authorizer"]["user_id"]
-    exclusive_start_key = get_exclusive_start_key(last_map_id)
-
     # construct list of game states
-    list_maps = query_map(exclusive_start_key)
+    newest_first = cursor["direction"] == RequestPaginator.CURSOR_NEXT
+    list_maps, continue_key = query_map(cursor["key"], newest_first)
     list_gamestates = query_gamestate(user_id, list_maps)
-    gamestates_map_ids = set([game_map_id for game_map_id in list_gamestates.keys()])
+    results = []
+    # Keep the newest first order of the map feed
     for map_id in list_maps:
-        if map_id not in gamestates_map_ids:
-            list_gamestates[map_id] = create_gamestate(user_id, list_maps[map_id]) 
+        game_state = list_gamestates.get(map_id)
+        if game_state is None:
+            game_state = create_gamestate(user_id, list_maps[map_id])
         else:
-            list_gamestates[map_id]["game_map"] = list_maps[map_id]
-    
-    total_count = int(str(get_gamestate_count()))
-    paginator = RequestPaginator(
-        request=url,
-        total_result_count=total_count,
-        page_size=PAGE_SIZE,
-        param_name="page"
-    )
+            game_state["game_map"] = list_maps[map_id]
+        results.append(game_state)
+
+    maps = list(list_maps.values())
+    first_key = get_feed_start_key(maps[0]) if maps else None
+    last_key = get_feed_start_key(maps[-1]) if maps else None
+    # The feed continues from where the query stopped, a page cut short keeps its number
+    page = cursor["page"]
+    is_cut_short = len(maps) < PAGE_SIZE and continue_key is not None
+    previous_page = next_page = None
+    if newest_first:
+        last_key = continue_key
+        next_page = page if is_cut_short else None
+    else:
+        first_key = continue_key
+        previous_page = page if is_cut_short else None
     return {
         "statusCode": 200,
-        "body": json.dumps(paginator.paginate(list(list_gamestates.values()), page)),
+        "body": json.dumps(
+            paginator.paginate_with_cursor(
+                results,
+                page,
+                first_key,
+                last_key,
+                previous_page=previous_page,
+                next_page=next_page
+            ),
+            default=decimal_default
+        ),
         "headers": {
             "Access-Control-Allow-Origin": "*"
         }
@@ -70,73 +111,50 @@ def create_gamestate(user_id, game_map):
     }
 
 
-def get_page(event):
-    try:
-        page = int(event["queryStringParameters"]["page"])
-        if page <= 0:
-            return None
-        return page
-    except ValueError:
-        return None
-
-
-def get_exclusive_start_key(map_id):
-    response = game_maps.query(
-        IndexName="game-map-unique-map-id",
-        KeyConditionExpression="id = :mi",
-        ExpressionAttributeValues={
-            ":mi": map_id
+def get_cursor(event, paginator: RequestPaginator):
+    query = event.get("queryStringParameters") or {}
+    if query.get("cursor") is None:
+        return {
+            "page": 1,
+            "key": None,
+            "direction": RequestPaginator.CURSOR_NEXT
         }
-    )
-    if len(response.get("Items")) == 0:
+    try:
+        return paginator.decode_cursor(query["cursor"])
+    except Exception as e:
+        print(e)
         return None
-    item = response.get("Items")[0]
-    return {
-        "created_by": item["created_by"],
-        "last_edited": item["last_edited"]
-    }
     
 
-def query_map(exclusive_start_key) -> dict:
-    if exclusive_start_key == None:
-        response = game_maps.scan(
-            Limit=PAGE_SIZE
-        )
-    else:
-        response = game_maps.scan(
-            Limit=PAGE_SIZE,
-            ExclusiveStartKey=exclusive_start_key
-        )
-
-    results = response.get("Items")
+def query_map(exclusive_start_key, newest_first: bool = True) -> tuple:
+    results, continue_key = query_map_feed(
+        game_maps,
+        PAGE_SIZE,
+        exclusive_start_key=exclusive_start_key,
+        oldest_bucket=MAP_FEED_OLDEST_BUCKET,
+        newest_first=newest_first,
+        max_buckets=FEED_MAX_BUCKETS
+    )
     map_results = {}    
     for result in results:
         map_results[result["id"]] = result
 
-    return map_results
+    return map_results, continue_key
 
 
 def query_gamestate(user_id, dict_gamemap: dict) -> dict:
-    list_map_ids = [map_id for map_id in dict_gamemap]
-    print(list_map_ids)
+    keys = [
+        {
+            "user": user_id,
+            "game_map": map_id
+        }
+        for map_id in dict_gamemap
+    ]
     list_gamestates = {}
-    for map_id in list_map_ids:
-        response = game_states.get_item(
-            Key={
-                "user": user_id,
-                "game_map": map_id
-            }
-        )
-        game_state = response.get("Item")
-        if game_state is not None:
-            list_gamestates[map_id] = game_state
+    for game_state in batch_get_items(db, GAMESTATE_TABLE_NAME, keys):
+        list_gamestates[game_state["game_map"]] = game_state
     return list_gamestates
 
 
 def get_gamestate_count() -> int:
-    response = row_count_table.get_item(
-        Key={
-            "table_name": GAMEMAP_TABLE_NAME
-        }
-    )
-    return response.get("Item")["row_count"]
+    return map_counter.get()
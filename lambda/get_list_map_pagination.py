@@ -1,116 +1,121 @@
-import boto3
 import os
 import json
-from custom import (RequestPaginator)
+from custom import (
+    RequestPaginator,
+    ShardedCounter,
+    scope_counter_name,
+    lazy_client_table,
+    lazy_resource
+)
 
-db = boto3.resource("dynamodb")
+db = lazy_resource("dynamodb")
 TABLE_NAME = os.environ.get("TABLE_NAME")
 COUNT_ROW_TABLE_NAME = os.environ.get("ROW_COUNT_TABLE_NAME")
 PAGE_SIZE = int(os.environ.get("PAGINATION_PAGE_SIZE"))
-game_maps = db.Table(TABLE_NAME)
-table_count = db.Table(COUNT_ROW_TABLE_NAME)
+CURSOR_SECRET_KEY = os.environ.get("CURSOR_SECRET_KEY")
+ROW_COUNT_SHARDS = int(os.environ.get("ROW_COUNT_SHARDS", 10))
+MAP_ROW_COUNT_NAME = os.environ.get("MAP_ROW_COUNT_NAME", TABLE_NAME)
+game_maps = lazy_client_table(TABLE_NAME)
 
 def handler(event, context):
-    page = None
-    try:
-        page = int(event["queryStringParameters"]["page"])
-    except ValueError:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({
-                "detail": "Invalid page"
-            }),
-            "headers": {
-                "Access-Control-Allow-Origin": "*"
-            }
-        }
-    last_map_id = event["headers"]["amz-last-map-id"]
-    if page <= 0:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({
-                "detail": "Invalid page"
-            }),
-            "headers": {
-                "Access-Control-Allow-Origin": "*"
-            }
-        }
     user_id = event["requestContext"]["authorizer"]["user_id"]
     host = event["headers"]["Host"]
     path = event["requestContext"]["path"]
     url = f"https://{host}{path}"
-    total_count = query_row_count()
-    exclusive_start_key = get_exclusive_start_key(last_map_id)
-    
-    results = query(user_id, exclusive_start_key)
-    if exclusive_start_key == None:
-        page = 1
-
+    total_count = query_row_count(user_id)
     paginator = RequestPaginator(
         request=url,
         total_result_count=total_count,
         page_size=PAGE_SIZE,
-        param_name="page"
+        param_name="cursor",
+        secret_key=CURSOR_SECRET_KEY,
+        # The keys of a cursor belong to the maps of its user on this endpoint
+        scope=f"maps#created_by#{user_id}"
     )
+
+    cursor = get_cursor(event, paginator)
+    if cursor is None:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({
+                "detail": "Invalid cursor"
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
+        }
+
+    results = query(user_id, cursor["key"], cursor["direction"] == RequestPaginator.CURSOR_NEXT)
+    first_key = get_key(results[0]) if results else None
+    last_key = get_key(results[-1]) if results else None
     return {
         "statusCode": 200,
-        "body": json.dumps(paginator.paginate(results, page)),
+        "body": json.dumps(paginator.paginate_with_cursor(results, cursor["page"], first_key, last_key)),
         "headers": {
             "Access-Control-Allow-Origin": "*"
         }
     }
 
 
-def get_exclusive_start_key(map_id):
-    response = game_maps.query(
-        IndexName="game-map-unique-map-id",
-        KeyConditionExpression="id = :mi",
-        ExpressionAttributeValues={
-            ":mi": map_id
+def get_cursor(event, paginator: RequestPaginator):
+    query = event.get("queryStringParameters") or {}
+    if query.get("cursor") is None:
+        return {
+            "page": 1,
+            "key": None,
+            "direction": RequestPaginator.CURSOR_NEXT
         }
-    )
-    if len(response.get("Items")) == 0:
+    try:
+        return paginator.decode_cursor(query["cursor"])
+    except Exception as e:
+        print(e)
         return None
-    item = response.get("Items")[0]
+
+
+def get_key(game_map):
     return {
-        "created_by": item["created_by"],
-        "last_edited": item["last_edited"]
+        "id": game_map["id"],
+        "created_by": game_map["created_by"],
+        "last_edited": game_map["last_edited"]
     }
     
 
-def query(user_id, exclusive_start_key):
-    if exclusive_start_key == None:
-        response = game_maps.query(
-            KeyConditionExpression="created_by = :u",
-            ExpressionAttributeValues= {
-                ":u": user_id
-            },
-            Limit=PAGE_SIZE
-        )
-    else:
-        response = game_maps.query(
-            KeyConditionExpression="created_by = :u",
-            ExpressionAttributeValues= {
-                ":u": user_id
-            },
-            Limit=PAGE_SIZE,
-            ExclusiveStartKey=exclusive_start_key
-        )
+def query(user_id, exclusive_start_key, forward: bool = True):
+    """
+    A previous page is read backwards from its first item then put back in order
+    """
+
+    params = {
+        "IndexName": "game-map-created-by",
+        "KeyConditionExpression": "created_by = :u",
+        "ExpressionAttributeValues": {
+            ":u": user_id
+        },
+        "ScanIndexForward": forward,
+        "Limit": PAGE_SIZE
+    }
+    if exclusive_start_key is not None:
+        params["ExclusiveStartKey"] = exclusive_start_key
+    response = game_maps.query(**params)
         
     results = response.get("Items")
+    if forward is False:
+        results.reverse()
     return results
 
 
-def query_row_count():
+def query_row_count(user_id):
+    """
+    Number of maps created by `user_id`, which is what this endpoint lists
+    """
+
     try:
-        response = table_count.get_item(
-            Key={
-                "table_name": TABLE_NAME
-            }
-        )
-        table = response["Item"]
-        print(table)
-        return int(str(table["row_count"]))
+        return ShardedCounter(
+            db,
+            COUNT_ROW_TABLE_NAME,
+            scope_counter_name(MAP_ROW_COUNT_NAME, "created_by", user_id),
+            ROW_COUNT_SHARDS
+        ).get()
     except Exception as e:
         print(e)
         return 0
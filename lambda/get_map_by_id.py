@@ -1,23 +1,22 @@
 import json
-import boto3
 import os
+from custom import (format_version_etag, get_conditional_response, lazy_client_table)
 
-db = boto3.resource("dynamodb")
 MAP_TABLE_NAME = os.environ.get("TABLE_NAME")
-game_maps = db.Table(MAP_TABLE_NAME)
+game_maps = lazy_client_table(MAP_TABLE_NAME)
 
 def handler(event, context):
     map_id = event["pathParameters"]["id"]
     user_id = event["requestContext"]["authorizer"]["user_id"]
 
-    response = game_maps.query(
-        IndexName="game-map-unique-map-id",
-        KeyConditionExpression="id=:mi",
-        ExpressionAttributeValues={
-            ":mi": map_id
-        }
+    response = game_maps.get_item(
+        Key={
+            "id": map_id
+        },
+        ConsistentRead=True
     )
-    if len(response.get("Items")) == 0:
+    game_map = response.get("Item")
+    if game_map is None:
         return {
             "statusCode": 404,
             "body": json.dumps({
@@ -27,7 +26,6 @@ def handler(event, context):
                 "Access-Control-Allow-Origin": "*"
             }
         }
-    game_map = response.get("Items")[0]
     if user_id != game_map["created_by"]:
         return {
             "statusCode": 401,
@@ -38,10 +36,5 @@ def handler(event, context):
                 "Access-Control-Allow-Origin": "*"
             }
         }
-    return {
-        "statusCode": 200,
-        "body": json.dumps(game_map),
-        "headers": {
-            "Access-Control-Allow-Origin": "*"
-        }
-    }
+    # Every write of a map increases its version, the ETag is sent back in the `If-Match` of an update
+    return get_conditional_response(event, game_map, format_version_etag(game_map.get("version")))
@@ -0,0 +1,104 @@
+import json
+import os
+from custom import (
+    ConcurrentTaskError,
+    TTLCache,
+    read_map_index,
+    read_map_region,
+    lazy_client_table,
+    lazy_client
+)
+
+s3 = lazy_client("s3", endpoint_url=os.environ.get("S3_ENDPOINT_URL"))
+MAP_TABLE_NAME = os.environ.get("TABLE_NAME")
+BUCKET_NAME = os.environ.get("S3_BUCKET_NAME")
+BUCKET_DOMAIN = os.environ.get("S3_BUCKET_DOMAIN")
+MAX_REGION_TILES = int(os.environ.get("MAX_REGION_TILES", 256 * 256))
+MAP_INDEX_CACHE_TTL = int(os.environ.get("MAP_INDEX_CACHE_TTL", TTLCache.DEFAULT_TTL))
+game_maps = lazy_client_table(MAP_TABLE_NAME)
+# Header, index and meta of the tile files, a replaced file fails the ETag check of the reads
+map_indexes = TTLCache(max_size=256, ttl=MAP_INDEX_CACHE_TTL)
+
+def handler(event, context):
+    map_id = event["pathParameters"]["id"]
+    query = event["queryStringParameters"]
+    try:
+        x, y, width, height = [int(query[key]) for key in ["x", "y", "width", "height"]]
+    except (KeyError, TypeError, ValueError):
+        x, y, width, height = (0, 0, 0, 0)
+    if width <= 0 or height <= 0 or width * height > MAX_REGION_TILES:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({
+                "error": f"The region must be a box of at most {MAX_REGION_TILES} tiles"
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
+        }
+
+    # Map files are public, any signed in user can load the tiles of a map
+    response = game_maps.get_item(
+        Key={
+            "id": map_id
+        },
+        ProjectionExpression="id, map_tiles_url"
+    )
+    game_map = response.get("Item")
+    if game_map is None or game_map.get("map_tiles_url") is None:
+        return {
+            "statusCode": 404,
+            "body": json.dumps({
+                "error": "Map tiles not found"
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
+        }
+    tiles_key = game_map["map_tiles_url"][len(f"{BUCKET_DOMAIN}/{BUCKET_NAME}/"):]
+
+    try:
+        layers = get_region(tiles_key, x, y, width, height)
+    except s3.exceptions.NoSuchKey:
+        # The tile file is made by the bucket notification shortly after the map file
+        return {
+            "statusCode": 404,
+            "body": json.dumps({
+                "error": "Map tiles not found"
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
+        }
+    return {
+        "statusCode": 200,
+        "body": json.dumps({
+            "map_id": map_id,
+            "x": x,
+            "y": y,
+            "width": width,
+            "height": height,
+            "layers": layers
+        }),
+        "headers": {
+            "Access-Control-Allow-Origin": "*"
+        }
+    }
+
+
+def get_region(tiles_key, x, y, width, height):
+    map_index = map_indexes.get(tiles_key)
+    if map_index is not None:
+        try:
+            return read_map_region(s3, BUCKET_NAME, tiles_key, map_index, x, y, width, height)
+        except ConcurrentTaskError as e:
+            # The cached index is stale once the tile file has been replaced
+            if not all(is_precondition_failed(error) for _, error in e.errors):
+                raise e
+    map_index = read_map_index(s3, BUCKET_NAME, tiles_key)
+    map_indexes.put(tiles_key, map_index)
+    return read_map_region(s3, BUCKET_NAME, tiles_key, map_index, x, y, width, height)
+
+
+def is_precondition_failed(error):
+    return isinstance(error, s3.exceptions.ClientError) and error.response["Error"]["Code"] == "PreconditionFailed"
@@ -1,11 +1,9 @@
 import json
-import boto3
 import os
-import uuid
+from custom import (get_conditional_response, lazy_client_table)
 
-db = boto3.resource("dynamodb")
 USER_TABLE_NAME = os.environ.get("TABLE_NAME")
-users = db.Table(USER_TABLE_NAME)
+users = lazy_client_table(USER_TABLE_NAME)
 
 def handler(event, context):
     user_id = event["pathParameters"]["user_id"]
@@ -38,10 +36,5 @@ def handler(event, context):
             }
         }
     del user["password"]
-    return {
-        "statusCode": 200,
-        "body": json.dumps(user),
-        "headers": {
-            "Access-Control-Allow-Origin": "*"
-        }
-    }
+    user.pop("token_epoch", None)
+    return get_conditional_response(event, user)
@@ -1,13 +1,11 @@
 import json
-import boto3
-import bcrypt
 import os
-from custom import (generate_access_token, generate_refresh_token)
+from custom import (generate_access_token, generate_refresh_token, lazy_import, lazy_table)
 
-db = boto3.resource("dynamodb")
 USER_TABLE_NAME = os.environ.get("TABLE_NAME")
 JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
-users = db.Table(USER_TABLE_NAME)
+users = lazy_table(USER_TABLE_NAME)
+bcrypt = lazy_import("bcrypt")
 
 def handler(event, context):
     print(event["body"])
@@ -40,9 +38,11 @@ def handler(event, context):
                 "Access-Control-Allow-Origin": "*"
             }
         }
-    access_token = generate_access_token(user["user_id"], JWT_SECRET_KEY)
-    refresh_token = generate_refresh_token(user["user_id"], JWT_SECRET_KEY)
+    token_epoch = user.get("token_epoch", 0)
+    access_token = generate_access_token(user["user_id"], JWT_SECRET_KEY, token_epoch)
+    refresh_token = generate_refresh_token(user["user_id"], JWT_SECRET_KEY, token_epoch)
     del user["password"]
+    user.pop("token_epoch", None)
     return {
         "statusCode": 200,
         "headers": {
@@ -0,0 +1,60 @@
+import os
+import json
+import threading
+import importlib
+
+ROUTES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "routes.json")
+# Environment of the routed handlers that differs between them, e.g. `GET_MAP_BY_ID__TABLE_NAME`
+ENVIRONMENT_SEPARATOR = "__"
+with open(ROUTES_FILE) as f:
+    ROUTES = json.load(f)
+# Handler modules imported so far, the others are only imported by their first request
+handlers = {}
+lock = threading.Lock()
+
+def handler(event, context):
+    method = event.get("httpMethod")
+    module_name = ROUTES.get(f"{method} {event.get('resource')}") or ROUTES.get(f"{method} *")
+    if module_name is None:
+        return {
+            "statusCode": 404,
+            "body": json.dumps({
+                "error": "Route not found"
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
+        }
+    return get_handler(module_name)(event, context)
+
+
+def get_handler(module_name):
+    if module_name in handlers:
+        return handlers[module_name]
+    with lock:
+        if module_name not in handlers:
+            handlers[module_name] = import_handler(module_name)
+    return handlers[module_name]
+
+
+def import_handler(module_name):
+    """
+    Import a handler module with its own environment.\n
+    The handlers read their environment when they are imported, the variables prefixed with the
+    name of the module replace the shared ones during the import.
+    """
+
+    prefix = module_name.upper() + ENVIRONMENT_SEPARATOR
+    overrides = {
+        name[len(prefix):]: value for name, value in os.environ.items() if name.startswith(prefix)
+    }
+    previous = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    try:
+        return importlib.import_module(module_name).handler
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
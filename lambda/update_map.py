@@ -1,29 +1,97 @@
 import json
-import boto3
 import os
 import datetime
+import functools
 from custom import (
     parse_binary_multipart_to_form,
-    validate_multipart_form_data
+    MultipartLimitError,
+    MultipartParseError,
+    generate_upload_post,
+    validate_multipart_form_data,
+    set_feed_attributes,
+    run_concurrently,
+    get_asset_key,
+    hash_content,
+    put_asset,
+    put_chunked_asset,
+    detect_image_content_type,
+    get_variant_urls,
+    get_map_tiles_key,
+    format_version_etag,
+    parse_version_etag,
+    lazy_table,
+    lazy_client
 )
 
-db = boto3.resource("dynamodb")
-s3 = boto3.client("s3")
+s3 = lazy_client("s3", endpoint_url=os.environ.get("S3_ENDPOINT_URL"))
 MAP_TABLE_NAME = os.environ.get("TABLE_NAME")
 BUCKET_NAME = os.environ.get("S3_BUCKET_NAME")
 MAP_FOLDER = os.environ.get("S3_MAP_FOLDER")
-game_maps = db.Table(MAP_TABLE_NAME)
+BUCKET_DOMAIN = os.environ.get("S3_BUCKET_DOMAIN")
+UPLOAD_EXPIRES_IN = int(os.environ.get("UPLOAD_EXPIRES_IN", 900))
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", 10 * 1024 * 1024))
+game_maps = lazy_table(MAP_TABLE_NAME)
 
 
 
 required_keys = [
-    "map_image",
-    "map_file",
     "map_name"
 ]
 
+# Files of a map, the ones missing from the form are uploaded by the client with a presigned post
+map_uploads = {
+    "map_image": {
+        "prefix": "mapimage",
+        "content_type": "image/jpeg",
+        "content_type_prefix": "image/",
+        "chunked": False
+    },
+    "map_file": {
+        "prefix": "mapfile",
+        "content_type": "application/json",
+        "content_type_prefix": "application/json",
+        "chunked": True
+    }
+}
+
+# Attributes managed by the api that a form cannot overwrite
+protected_keys = [
+    "id",
+    "created_by",
+    "version",
+    "feed_bucket",
+    "feed_timestamp",
+    "map_image_url",
+    "map_file_url",
+    "map_image_hash",
+    "map_file_hash",
+    "map_image_variants",
+    "map_tiles_url"
+]
+
 def handler(event, context):
-    form = parse_binary_multipart_to_form(event)
+    try:
+        form = parse_binary_multipart_to_form(event)
+    except MultipartLimitError as e:
+        return {
+            "statusCode": 413,
+            "body": json.dumps({
+                "error": str(e)
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
+        }
+    except MultipartParseError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({
+                "error": str(e)
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
+        }
     user_id = event["requestContext"]["authorizer"]["user_id"]
 
     if validate_multipart_form_data(form, required_keys) is False:
@@ -36,58 +104,86 @@ def handler(event, context):
                 "Access-Control-Allow-Origin": "*"
             }
         }
-    [game_map, not_found_response] = get_map_or_not_found(event["pathParameters"]["id"])
-    if not_found_response:
-        return not_found_response
-
-    if user_id != game_map["created_by"]:
+    map_id = event["pathParameters"]["id"]
+    try:
+        expected_version = get_expected_version(event)
+    except ValueError:
         return {
-            "statusCode": 401,
+            "statusCode": 400,
             "body": json.dumps({
-                "error": "Unauthorized"
+                "error": "Invalid If-Match header"
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
+        }
+    # Every update is guarded by the version, an update without it could overwrite another one
+    if expected_version is None:
+        return {
+            "statusCode": 428,
+            "body": json.dumps({
+                "error": "The If-Match header with the ETag of the map is required"
             }),
             "headers": {
                 "Access-Control-Allow-Origin": "*"
             }
         }
     # Construct the payload before saving to database
-    payload = construct_payload(form, game_map)
+    payload = construct_payload(form, map_id)
+
+    files = {}
+    for key in map_uploads:
+        value = payload.pop(key, None)
+        if isinstance(value, dict):
+            files[key] = value
+    # Files sent in the form are stored under their content hash, recorded on the map
+    for key, file in files.items():
+        file["hash"] = hash_content(file["data"])
+        payload[f"{key}_hash"] = file["hash"]
+        payload[f"{key}_url"] = f"{BUCKET_DOMAIN}/{BUCKET_NAME}/{get_asset_key(MAP_FOLDER, file['hash'])}"
+    # The bucket notification makes the variants of a stored image under known keys
+    if "map_image" in files:
+        payload["map_image_variants"] = get_variant_urls(
+            f"{BUCKET_DOMAIN}/{BUCKET_NAME}",
+            get_asset_key(MAP_FOLDER, files["map_image"]["hash"])
+        )
+    # So does the tile encoding of a stored map file
+    if "map_file" in files:
+        map_file_key = get_asset_key(MAP_FOLDER, files["map_file"]["hash"])
+        payload["map_tiles_url"] = f"{BUCKET_DOMAIN}/{BUCKET_NAME}/{get_map_tiles_key(map_file_key)}"
 
     try:
-        map_image, map_file = (payload["map_image"], payload["map_file"])
-        del payload["map_image"]
-        del payload["map_file"]
-        print(game_map)
-        game_maps.delete_item(
-            Key={
-                "created_by": game_map["created_by"],
-                "last_edited": game_map["last_edited"]
+        # Assets are immutable, storing them before the update cannot overwrite the files
+        # of a map when the update is rejected
+        run_concurrently([functools.partial(put_map_file, key, files[key]) for key in files])
+        game_map = update_game_map(map_id, user_id, payload, expected_version)
+    except game_maps.meta.client.exceptions.ConditionalCheckFailedException:
+        return get_condition_failed_response(map_id, user_id)
+    except Exception as e:
+        print(e)
+        return {
+            "statusCode": 500,
+            "body": json.dumps({
+                "error": "Internal server error"
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
             }
-        )
-        game_maps.put_item(
-            Item=payload
-        )
-        s3.put_object(
-            Bucket=BUCKET_NAME, 
-            Key=MAP_FOLDER + "/" + map_image["file_name"], 
-            Body=map_image["data"],
-            ACL="public-read",
-            ContentType="image/jpeg"
-        )
-        s3.put_object(
-            Bucket=BUCKET_NAME, 
-            Key=MAP_FOLDER + "/" + map_file["file_name"], 
-            Body=map_file["data"],
-            ACL="public-read",
-            ContentType="application/json"
-        )
+        }
+
+    try:
+        uploads = get_upload_posts(map_id, files)
         return {
             "statusCode": 200,
             "body": json.dumps({
-                "map_id": game_map["id"]
+                "map_id": game_map["id"],
+                "version": int(game_map["version"]),
+                "uploads": uploads
             }),
             "headers": {
-                "Access-Control-Allow-Origin": "*"
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Expose-Headers": "ETag",
+                "ETag": format_version_etag(game_map["version"])
             }
         }
     except Exception as e:
@@ -102,17 +198,118 @@ def handler(event, context):
             }
         }
 
-def construct_payload(form, old_map):
+def construct_payload(form, map_id):
     payload = get_payload_from_form(form)
-    map_id = old_map["id"]
-    payload["id"] = old_map["id"]
-    payload["created_by"] = old_map["created_by"]
+    for key in protected_keys:
+        payload.pop(key, None)
     payload["last_edited"] = str(datetime.datetime.now())
-    payload["map_image"]["file_name"] = f"mapimage_{map_id}"
-    payload["map_file"]["file_name"] = f"mapfile_{map_id}"
     return payload
 
 
+def get_map_file_key(key, map_id):
+    return f"{MAP_FOLDER}/{map_uploads[key]['prefix']}_{map_id}"
+
+
+def put_map_file(key, file):
+    """
+    Store a file sent in the form as a content addressed asset.\n
+    An unchanged file is not uploaded again, only the changed chunks of a large map file are.
+    """
+
+    upload = map_uploads[key]
+    content_type = upload["content_type"]
+    if content_type.startswith("image/"):
+        content_type = detect_image_content_type(file["data"], content_type)
+    store = put_chunked_asset if upload["chunked"] else put_asset
+    return store(
+        s3,
+        BUCKET_NAME,
+        MAP_FOLDER,
+        file["data"],
+        content_type,
+        content_hash=file["hash"]
+    )
+
+
+def get_upload_posts(map_id, files):
+    """
+    Return a presigned post for each file missing from the form
+    """
+
+    posts = {}
+    for key, upload in map_uploads.items():
+        if key in files:
+            continue
+        posts[key] = generate_upload_post(
+            s3,
+            BUCKET_NAME,
+            get_map_file_key(key, map_id),
+            upload["content_type_prefix"],
+            MAX_UPLOAD_SIZE,
+            UPLOAD_EXPIRES_IN
+        )
+    return posts
+
+
+def get_expected_version(event):
+    """
+    Read the map version the client has edited from the `If-Match` header, the `ETag` of
+    GET /map/{id}, e.g. `"3"`. `None` without the header.
+    """
+
+    if_match = event["headers"].get("if-match")
+    if if_match is None:
+        return None
+    return parse_version_etag(if_match)
+
+
+def update_game_map(map_id, user_id, payload, expected_version):
+    """
+    Update the map in one conditional `UpdateItem` and return the new item.\n
+    The condition checks that the map exists, belongs to `user_id` and still has
+    `expected_version`. Maps without a version are at version 0.
+    """
+
+    names = {
+        "#version": "version"
+    }
+    values = {
+        ":u": user_id,
+        ":zero": 0,
+        ":one": 1
+    }
+    assignments = []
+    for index, key in enumerate(payload):
+        names[f"#f{index}"] = key
+        values[f":f{index}"] = payload[key]
+        assignments.append(f"#f{index} = :f{index}")
+    # Keep the feed position of the map, maps created before the feed join it on their first edit
+    feed = set_feed_attributes({}, datetime.datetime.now())
+    values[":fb"] = feed["feed_bucket"]
+    values[":ft"] = feed["feed_timestamp"]
+    assignments.append("feed_bucket = if_not_exists(feed_bucket, :fb)")
+    assignments.append("feed_timestamp = if_not_exists(feed_timestamp, :ft)")
+    assignments.append("#version = if_not_exists(#version, :zero) + :one")
+
+    condition = "created_by = :u"
+    if expected_version == 0:
+        condition += " AND attribute_not_exists(#version)"
+    else:
+        condition += " AND #version = :v"
+        values[":v"] = expected_version
+    response = game_maps.update_item(
+        Key={
+            "id": map_id
+        },
+        UpdateExpression="SET " + ", ".join(assignments),
+        ConditionExpression=condition,
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values,
+        ReturnValues="ALL_NEW"
+    )
+    return response["Attributes"]
+
+
 def get_payload_from_form(form):
     if form is None:
         return None
@@ -122,25 +319,49 @@ def get_payload_from_form(form):
     return payload
 
 
-def get_map_or_not_found(map_id):
-    response = game_maps.query(
-        IndexName="game-map-unique-map-id",
-        KeyConditionExpression="id=:mi",
-        ExpressionAttributeValues={
-            ":mi": map_id
-        }
+def get_condition_failed_response(map_id, user_id):
+    """
+    Tell apart why the update condition failed, only read on the failure path
+    """
+
+    response = game_maps.get_item(
+        Key={
+            "id": map_id
+        },
+        ProjectionExpression="created_by, #version",
+        ExpressionAttributeNames={
+            "#version": "version"
+        },
+        ConsistentRead=True
     )
-    if len(response.get("Items")) == 0:
-        return [
-            None,
-            {
-                "statusCode": 404,
-                "body": json.dumps({
-                    "error": "Map not found"
-                })
+    game_map = response.get("Item")
+    if game_map is None:
+        return {
+            "statusCode": 404,
+            "body": json.dumps({
+                "error": "Map not found"
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
+            }
+        }
+    if user_id != game_map["created_by"]:
+        return {
+            "statusCode": 401,
+            "body": json.dumps({
+                "error": "Unauthorized"
+            }),
+            "headers": {
+                "Access-Control-Allow-Origin": "*"
             }
-        ]
-    return [
-        response.get("Items")[0],
-        None
-    ]
\ No newline at end of file
+        }
+    return {
+        "statusCode": 409,
+        "body": json.dumps({
+            "error": "The map has been modified",
+            "version": int(game_map.get("version", 0))
+        }),
+        "headers": {
+            "Access-Control-Allow-Origin": "*"
+        }
+    }
\ No newline at end of file
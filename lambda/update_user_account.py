@@ -1,12 +1,9 @@
 import json
-import boto3
-import jwt
 import os
-import uuid
-import bcrypt
-db = boto3.resource("dynamodb")
+from custom import (lazy_import, lazy_table)
 USER_TABLE_NAME = os.environ.get("TABLE_NAME")
-users = db.Table(USER_TABLE_NAME)
+users = lazy_table(USER_TABLE_NAME)
+bcrypt = lazy_import("bcrypt")
 
 
 def handler(event, context):
@@ -41,6 +38,8 @@ def handler(event, context):
     payload["password"] = bcrypt.hashpw(payload["password"].encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
     payload["profile"] = user["profile"] 
     payload["email"] = user["email"]
+    # Changing the password revokes every token issued before
+    payload["token_epoch"] = int(user.get("token_epoch", 0)) + 1
     try:
         users.put_item(
             Item=payload,
@@ -1,37 +1,63 @@
-import json
-import boto3
-import datetime
 import os
+from custom import (
+    get_variant_urls,
+    is_variant_key,
+    process_s3_event,
+    put_image_variants,
+    lazy_table,
+    lazy_client
+)
 
 
-db = boto3.resource("dynamodb")
+s3 = lazy_client("s3")
 USER_TABLE_NAME = os.environ.get("TABLE_NAME")
 BUCKET_DOMAIN = os.environ.get("S3_BUCKET_DOMAIN")
-users = db.Table(USER_TABLE_NAME)
+users = lazy_table(USER_TABLE_NAME)
 
 def handler(event, context):
-    bucket_name = event["Records"][0]["s3"]["bucket"]["name"]
-    object_name = event["Records"][0]["s3"]["object"]["key"]
+    process_s3_event(event, get_target, process_records)
+
+
+def get_target(record):
+    object_name = record["key"]
+    if is_variant_key(object_name):
+        return None
+    parts = object_name.split("_")
+    user_id = parts[1].split(".")[0] if len(parts) > 1 else ""
+    if user_id == "":
+        # Only the pictures put as `user_<user_id>` belong to a user
+        print(f"Skip object without a user id: {object_name}")
+        return None
+    return user_id
+
+
+def process_records(user_id, records):
+    # Only the latest picture of a user is kept
+    record = records[-1]
+    bucket_name = record["bucket_name"]
+    object_name = record["key"]
     file_url = f"{BUCKET_DOMAIN}/{bucket_name}/{object_name}"
-    user_id = object_name.split("_")[1].split(".")[0]
-
-    response = users.get_item(
-        Key={
-            "user_id": user_id
-        }
-    )
-    if response.get("Item") is None:
-        print("Error: user_id not found" + user_id)
-        return
-    
-    user = response.get("Item")
-    user["profile"]["picture"] = file_url
-    
+
+    # Any other error is raised as well, `process_s3_event` reports the user and the
+    # notification is retried instead of losing the picture
     try:
-        response = users.put_item(
-            Item=user,
+        # Updating the profile in place replaces reading the whole user and putting it back
+        users.update_item(
+            Key={
+                "user_id": user_id
+            },
+            UpdateExpression="SET profile.picture=:picture, profile.picture_variants=:variants",
+            ExpressionAttributeValues={
+                ":picture": file_url,
+                ":variants": get_variant_urls(f"{BUCKET_DOMAIN}/{bucket_name}", object_name)
+            },
             ConditionExpression="attribute_exists(user_id)"
         )
-    except Exception as e: 
-        print(e)
-
+    except users.meta.client.exceptions.ConditionalCheckFailedException:
+        # The picture can be put while the user is still being written,
+        # raising lets the bucket notification retry the update
+        raise Exception("Error: user_id not found" + user_id)
+    try:
+        put_image_variants(s3, bucket_name, object_name)
+    except Exception as e:
+        print(f"Make image variants error: {e}")
@@ -1,9 +1,8 @@
 import json
-import boto3
 import os
-db = boto3.resource("dynamodb")
+from custom import (lazy_table)
 USER_TABLE_NAME = os.environ.get("TABLE_NAME")
-users = db.Table(USER_TABLE_NAME)
+users = lazy_table(USER_TABLE_NAME)
 
 
 def handler(event, context):
@@ -1,18 +1,141 @@
-from .request_helper import (
-    parse_cookies,
-    parse_binary_multipart_to_form,
-    validate_multipart_form_data
-)
+"""
+Shared modules of the handlers.\n
+A submodule is imported on the first use of one of its names, `from custom import decode_user_token`
+only loads `user_token`, so a function does not pay at init for the modules and dependencies
+of the others, such as pyjwt or Pillow.
+"""
 
-from .user_token import (
-    generate_access_token,
-    generate_refresh_token,
-    decode_user_token
-)
+import importlib
 
-from .authorization_helper import (
-    generate_allow_policy,
-    generate_deny_policy
-)
+# Submodule of each name of the package
+EXPORTS = {
+    "request_helper": [
+        "parse_cookies",
+        "parse_binary_multipart_to_form",
+        "validate_multipart_form_data"
+    ],
+    "multipart_parser": [
+        "MultipartLimitError",
+        "MultipartParseError",
+        "MemoryViewReader",
+        "parse_multipart"
+    ],
+    "user_token": [
+        "generate_access_token",
+        "generate_refresh_token",
+        "decode_user_token"
+    ],
+    "authorization_helper": [
+        "generate_allow_policy",
+        "generate_deny_policy"
+    ],
+    "paginatior": [
+        "RequestPaginator"
+    ],
+    "authorization_cache": [
+        "AuthorizationCache"
+    ],
+    "token_revocation": [
+        "STATEFUL_MODE",
+        "STATELESS_MODE",
+        "BloomFilter",
+        "RevocationSet",
+        "build_revocation_filter",
+        "can_skip_user_lookup",
+        "is_token_epoch_valid"
+    ],
+    "dynamodb_helper": [
+        "batch_get_items",
+        "batch_write_items",
+        "transact_write_items"
+    ],
+    "map_feed": [
+        "MAP_FEED_INDEX_NAME",
+        "MAP_FEED_MAX_BUCKETS",
+        "set_feed_attributes",
+        "get_feed_start_key",
+        "query_map_feed"
+    ],
+    "row_counter": [
+        "ShardedCounter",
+        "scope_counter_name"
+    ],
+    "json_helper": [
+        "decimal_default"
+    ],
+    "ttl_cache": [
+        "TTLCache"
+    ],
+    "presigned_upload": [
+        "generate_upload_post"
+    ],
+    "concurrent_executor": [
+        "ConcurrentTaskError",
+        "run_concurrently"
+    ],
+    "content_store": [
+        "get_asset_key",
+        "hash_content",
+        "put_asset",
+        "put_chunked_asset"
+    ],
+    "image_variants": [
+        "detect_image_content_type",
+        "get_variant_urls",
+        "is_variant_key",
+        "put_image_variants"
+    ],
+    "map_format": [
+        "encode_map",
+        "decode_map",
+        "get_map_tiles_key",
+        "put_map_tiles",
+        "read_map_index",
+        "read_map_region"
+    ],
+    "http_cache": [
+        "format_version_etag",
+        "get_conditional_response",
+        "parse_version_etag"
+    ],
+    "s3_event_processor": [
+        "S3EventBatchError",
+        "get_s3_records",
+        "process_s3_event"
+    ],
+    "client_factory": [
+        "get_call_counts",
+        "get_client",
+        "get_client_config",
+        "get_resource"
+    ],
+    "dynamodb_client": [
+        "ClientTable",
+        "deserialize_item",
+        "serialize_item"
+    ],
+    "lazy_loader": [
+        "LazyObject",
+        "lazy_client",
+        "lazy_client_table",
+        "lazy_import",
+        "lazy_resource",
+        "lazy_table"
+    ]
+}
+MODULE_NAMES = {name: module_name for module_name, names in EXPORTS.items() for name in names}
+__all__ = list(MODULE_NAMES)
 
-from .paginatior import (RequestPaginator)
\ No newline at end of file
+
+def __getattr__(name: str):
+    module_name = MODULE_NAMES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    # Later lookups of the name no longer go through `__getattr__`
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
\ No newline at end of file
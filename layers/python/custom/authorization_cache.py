@@ -0,0 +1,58 @@
+import hashlib
+from .ttl_cache import TTLCache
+
+
+class AuthorizationCache(TTLCache):
+    """
+    Bounded LRU cache of authorization decisions, kept for the life of a warm container.\n
+    Entries are keyed by a hash of the token, so the raw token is never kept in memory.\n
+    An entry expires at the earliest of its TTL and the token `exp` claim.
+    Negative lookups (unknown user) are stored with `user_id = None` and a shorter TTL.
+    """
+
+    DEFAULT_NEGATIVE_TTL = 30
+
+    negative_ttl = DEFAULT_NEGATIVE_TTL
+
+    def __init__(
+        self,
+        max_size:int = TTLCache.DEFAULT_MAX_SIZE,
+        ttl:int = TTLCache.DEFAULT_TTL,
+        negative_ttl:int = DEFAULT_NEGATIVE_TTL
+    ):
+        if negative_ttl < 0:
+            raise Exception("Invalid arguments")
+        super().__init__(max_size=max_size, ttl=ttl)
+        self.negative_ttl = negative_ttl
+
+
+    def get(self, token: str) -> dict:
+        """
+        Return the cached decision of `token` as `{"user_id": ...}` or `None` on a miss.\n
+        A cached negative decision is returned as `{"user_id": None}`
+        """
+
+        decision = super().get(self.__hash_token__(token))
+        if decision is None:
+            return None
+        return dict(decision)
+
+
+    def put(self, token: str, user_id: str, token_exp = None) -> None:
+        """
+        Store the decision of `token`. Pass `user_id = None` to cache a negative lookup.\n
+        `token_exp` is the `exp` claim of the token as a unix timestamp
+        """
+
+        super().put(
+            self.__hash_token__(token),
+            {
+                "user_id": user_id
+            },
+            ttl=self.ttl if user_id is not None else self.negative_ttl,
+            expires_at=token_exp
+        )
+
+
+    def __hash_token__(self, token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
@@ -0,0 +1,119 @@
+import os
+import time
+import threading
+import boto3
+from botocore.config import Config
+
+# Defaults of the client config, each one can be set in the environment of a function
+DEFAULT_CONNECT_TIMEOUT = 2
+DEFAULT_READ_TIMEOUT = 10
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_MODE = "adaptive"
+DEFAULT_MAX_POOL_CONNECTIONS = 16
+# Resources and clients of the container, shared by the handlers and by the threads of the executor
+resources = {}
+clients = {}
+# Calls of the clients by `<service>.<operation>`
+call_counts = {}
+lock = threading.RLock()
+
+
+def get_client_config(**kwargs) -> Config:
+    """
+    Return the `botocore` config of the clients.\n
+    Connections are kept alive and reused from a pool, large enough for the threads of the executor.
+    Timeouts are short so a stuck connection is retried instead of holding the request, retries
+    use the adaptive mode which also slows down the calls of a throttled container.
+    `kwargs` replace the options read from the environment.
+    """
+
+    options = {
+        "connect_timeout": float(os.environ.get("AWS_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)),
+        "read_timeout": float(os.environ.get("AWS_READ_TIMEOUT", DEFAULT_READ_TIMEOUT)),
+        "max_pool_connections": int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", DEFAULT_MAX_POOL_CONNECTIONS)),
+        "retries": {
+            "mode": os.environ.get("AWS_RETRY_MODE", DEFAULT_RETRY_MODE),
+            "total_max_attempts": int(os.environ.get("AWS_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS))
+        }
+    }
+    # Older botocore versions only keep the connections of the pool alive
+    if "tcp_keepalive" in Config.OPTION_DEFAULTS:
+        options["tcp_keepalive"] = True
+    options.update(kwargs)
+    return Config(**options)
+
+
+def count_calls(client) -> None:
+    """
+    Count the calls, errors and time of each operation of `client` in `call_counts`
+    """
+
+    service_name = client.meta.service_model.service_name
+
+    def before_call(context, **kwargs):
+        context["call_started"] = time.perf_counter()
+
+    def after_call(event_name, context, **kwargs):
+        # Error responses are parsed before they are raised, failed requests only have an exception
+        failed = "exception" in kwargs or "Error" in (kwargs.get("parsed") or {})
+        update_count(f"{service_name}.{event_name.split('.')[-1]}", context, failed)
+
+    client.meta.events.register("before-call", before_call)
+    client.meta.events.register("after-call", after_call)
+    client.meta.events.register("after-call-error", after_call)
+
+
+def update_count(name: str, context: dict, failed: bool) -> None:
+    started = context.get("call_started")
+    duration = time.perf_counter() - started if started is not None else 0.0
+    with lock:
+        count = call_counts.setdefault(name, {"calls": 0, "errors": 0, "time": 0.0})
+        count["calls"] += 1
+        count["time"] += duration
+        if failed:
+            count["errors"] += 1
+
+
+def get_call_counts(reset: bool = False) -> dict:
+    """
+    Return a copy of the call counts of the container, e.g. `{"dynamodb.GetItem": {"calls": 2, "errors": 0, "time": 0.01}}`
+    """
+
+    with lock:
+        counts = {name: dict(count) for name, count in call_counts.items()}
+        if reset:
+            call_counts.clear()
+    return counts
+
+
+def get_resource(service_name: str, **kwargs):
+    """
+    Return the `boto3` resource of `service_name`, created once per container and arguments.\n
+    It uses the config of `get_client_config` unless `kwargs` holds one.
+    """
+
+    key = (service_name, tuple(sorted(kwargs.items())))
+    with lock:
+        # Sessions are not thread safe, resources and clients are created one at a time
+        if key not in resources:
+            kwargs.setdefault("config", get_client_config())
+            resource = boto3.resource(service_name, **kwargs)
+            count_calls(resource.meta.client)
+            resources[key] = resource
+        return resources[key]
+
+
+def get_client(service_name: str, **kwargs):
+    """
+    Return the `boto3` client of `service_name`, created once per container and arguments.\n
+    It uses the config of `get_client_config` unless `kwargs` holds one.
+    """
+
+    key = (service_name, tuple(sorted(kwargs.items())))
+    with lock:
+        if key not in clients:
+            kwargs.setdefault("config", get_client_config())
+            client = boto3.client(service_name, **kwargs)
+            count_calls(client)
+            clients[key] = client
+        return clients[key]
@@ -0,0 +1,90 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_WORKERS = 8
+THREAD_NAME_PREFIX = "custom-executor"
+# Pools of the nested calls, deeper calls run their tasks in the calling thread
+MAX_NESTING_LEVEL = 2
+# Pool of each nesting level, the tasks of a pool only wait for the tasks of the next one
+executors = {}
+lock = threading.Lock()
+# Nesting level of the current thread, the threads of the pool of level `n` are at level `n + 1`
+thread_state = threading.local()
+
+
+class ConcurrentTaskError(Exception):
+    """
+    Raised by `run_concurrently` when tasks fail.\n
+    `errors` is the list of `(index, exception)` of the failed tasks and rollbacks.
+    """
+
+    errors = None
+
+    def __init__(self, errors: list):
+        super().__init__("; ".join(f"task {index}: {error}" for index, error in errors))
+        self.errors = errors
+
+
+def get_executor(level: int = 0) -> ThreadPoolExecutor:
+    """
+    Return the thread pool of the nesting `level`, it is created once and reused by warm invocations
+    """
+
+    with lock:
+        if level not in executors:
+            executors[level] = ThreadPoolExecutor(
+                max_workers=DEFAULT_MAX_WORKERS,
+                thread_name_prefix=f"{THREAD_NAME_PREFIX}-{level}",
+                initializer=set_thread_level,
+                initargs=(level + 1,)
+            )
+        return executors[level]
+
+
+def set_thread_level(level: int) -> None:
+    thread_state.level = level
+
+
+def run_concurrently(tasks: list, rollbacks: list = None) -> list:
+    """
+    Run the independent callables of `tasks` on the thread pool and return their results in order.\n
+    `rollbacks` holds, at the index of a task, `None` or a callable taking the result of the task.
+    When any task fails, the rollbacks of the tasks that succeeded are run and
+    `ConcurrentTaskError` is raised with every error.\n
+    Called from a task, the tasks run on the pool of the next level, so a task never waits
+    for a thread of its own pool and the pools cannot deadlock. Past `MAX_NESTING_LEVEL`
+    the tasks run in the calling thread.
+    """
+
+    if rollbacks is None:
+        rollbacks = [None] * len(tasks)
+    if len(rollbacks) != len(tasks):
+        raise Exception("Invalid arguments")
+    level = getattr(thread_state, "level", 0)
+    if level >= MAX_NESTING_LEVEL:
+        calls = tasks
+    else:
+        executor = get_executor(level)
+        calls = [executor.submit(task).result for task in tasks]
+
+    results = [None] * len(tasks)
+    succeeded = []
+    errors = []
+    # Wait for every task, so no rollback runs while a task is still writing
+    for index, call in enumerate(calls):
+        try:
+            results[index] = call()
+            succeeded.append(index)
+        except Exception as e:
+            errors.append((index, e))
+    if len(errors) == 0:
+        return results
+
+    for index in succeeded:
+        if rollbacks[index] is None:
+            continue
+        try:
+            rollbacks[index](results[index])
+        except Exception as e:
+            errors.append((index, e))
+    raise ConcurrentTaskError(errors)
@@ -0,0 +1,148 @@
+import hashlib
+import functools
+from .multipart_parser import MemoryViewReader
+from .concurrent_executor import run_concurrently
+
+ASSET_FOLDER = "assets"
+# S3 minimum part size, the chunks of a file are its parts when it is composed
+DEFAULT_CHUNK_SIZE = 5 * 1024 * 1024
+
+
+def hash_content(data) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def get_asset_key(folder: str, content_hash: str) -> str:
+    return f"{folder}/{ASSET_FOLDER}/{content_hash}"
+
+
+def asset_exists(s3, bucket_name: str, key: str) -> bool:
+    try:
+        s3.head_object(Bucket=bucket_name, Key=key)
+        return True
+    except s3.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] in ["404", "NoSuchKey", "NotFound"]:
+            return False
+        raise e
+
+
+def put_asset(
+    s3,
+    bucket_name: str,
+    folder: str,
+    data,
+    content_type: str,
+    acl: str = "public-read",
+    content_hash: str = None
+) -> dict:
+    """
+    Store `data` under its sha256 and return its `key`, `hash`, `size` and whether it was `uploaded`.\n
+    Assets are immutable, the upload is skipped when the content is already stored.
+    `content_hash` saves hashing `data` again when the caller already has it.
+    """
+
+    if content_hash is None:
+        content_hash = hash_content(data)
+    key = get_asset_key(folder, content_hash)
+    uploaded = not asset_exists(s3, bucket_name, key)
+    if uploaded:
+        s3.put_object(
+            Bucket=bucket_name,
+            Key=key,
+            Body=MemoryViewReader(memoryview(data)),
+            ACL=acl,
+            ContentType=content_type
+        )
+    return {
+        "key": key,
+        "hash": content_hash,
+        "size": len(data),
+        "uploaded": uploaded
+    }
+
+
+def put_chunked_asset(
+    s3,
+    bucket_name: str,
+    folder: str,
+    data,
+    content_type: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    acl: str = "public-read",
+    content_hash: str = None
+) -> dict:
+    """
+    Store a large `data` like `put_asset`, writing only the chunks that are not stored yet.\n
+    The chunks are assets themselves and the file is composed from them inside S3 with
+    `UploadPartCopy`, so the unchanged chunks of an edited file are never sent again.\n
+    Chunks are cut at fixed offsets of `chunk_size`. Only an edit keeping the length of the
+    data before a chunk leaves that chunk unchanged: overwriting bytes in place, or changing
+    the end of the file. Inserting or removing bytes shifts every later chunk, which are all
+    uploaded again. Content defined boundaries would need a rolling hash over every byte,
+    too slow in Python for a request, and S3 parts cannot be smaller than 5 MB anyway.
+    """
+
+    view = memoryview(data)
+    if len(view) <= chunk_size:
+        return put_asset(s3, bucket_name, folder, view, content_type, acl, content_hash)
+    if content_hash is None:
+        content_hash = hash_content(view)
+    key = get_asset_key(folder, content_hash)
+    if asset_exists(s3, bucket_name, key):
+        return {
+            "key": key,
+            "hash": content_hash,
+            "size": len(view),
+            "uploaded": False
+        }
+
+    chunks = run_concurrently([
+        functools.partial(put_asset, s3, bucket_name, folder, view[start:start + chunk_size], "application/octet-stream", acl)
+        for start in range(0, len(view), chunk_size)
+    ])
+    upload_id = s3.create_multipart_upload(
+        Bucket=bucket_name,
+        Key=key,
+        ACL=acl,
+        ContentType=content_type
+    )["UploadId"]
+    try:
+        parts = run_concurrently([
+            functools.partial(copy_part, s3, bucket_name, key, upload_id, part_number, chunk["key"])
+            for part_number, chunk in enumerate(chunks, start=1)
+        ])
+        s3.complete_multipart_upload(
+            Bucket=bucket_name,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={
+                "Parts": parts
+            }
+        )
+    except Exception as e:
+        s3.abort_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id)
+        raise e
+    return {
+        "key": key,
+        "hash": content_hash,
+        "size": len(view),
+        "uploaded": True,
+        "chunks": [{"hash": chunk["hash"], "size": chunk["size"]} for chunk in chunks]
+    }
+
+
+def copy_part(s3, bucket_name: str, key: str, upload_id: str, part_number: int, source_key: str) -> dict:
+    response = s3.upload_part_copy(
+        Bucket=bucket_name,
+        Key=key,
+        UploadId=upload_id,
+        PartNumber=part_number,
+        CopySource={
+            "Bucket": bucket_name,
+            "Key": source_key
+        }
+    )
+    return {
+        "PartNumber": part_number,
+        "ETag": response["CopyPartResult"]["ETag"]
+    }
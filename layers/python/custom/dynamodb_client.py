@@ -0,0 +1,172 @@
+import math
+import decimal
+from types import SimpleNamespace
+from boto3.dynamodb.conditions import (ConditionBase, ConditionExpressionBuilder)
+
+# Parameters holding attribute values, serialized before a call
+SERIALIZED_PARAMS = ["Key", "Item", "ExclusiveStartKey", "ExpressionAttributeValues"]
+# Parameters holding condition objects, e.g. `Key("id").eq(...)`, built into expressions
+CONDITION_PARAMS = ["KeyConditionExpression", "FilterExpression", "ConditionExpression"]
+
+
+def parse_number(value: str):
+    """
+    Return a DynamoDB number as an `int`, or a `float` when it has a fraction or an exponent
+    """
+
+    if "." in value or "e" in value or "E" in value:
+        return float(value)
+    return int(value)
+
+
+def deserialize_value(value: dict):
+    """
+    Return the python value of an attribute of the low level api.\n
+    Numbers are `int` or `float` instead of `Decimal`, so items go to `json.dumps` as they are.
+    Floats keep about 15 significant digits, which is enough for the numbers of this api.
+    """
+
+    # Checked from the most to the least common type, membership is faster than unpacking the pair
+    if "S" in value:
+        return value["S"]
+    if "N" in value:
+        return parse_number(value["N"])
+    if "M" in value:
+        return {name: deserialize_value(attribute) for name, attribute in value["M"].items()}
+    if "L" in value:
+        return [deserialize_value(attribute) for attribute in value["L"]]
+    if "BOOL" in value:
+        return value["BOOL"]
+    if "NULL" in value:
+        return None
+    if "B" in value:
+        return value["B"]
+    if "SS" in value:
+        return set(value["SS"])
+    if "NS" in value:
+        return {parse_number(number) for number in value["NS"]}
+    if "BS" in value:
+        return set(value["BS"])
+    raise TypeError(f"Unknown attribute type {list(value)}")
+
+
+def deserialize_item(item: dict) -> dict:
+    return {name: deserialize_value(attribute) for name, attribute in item.items()}
+
+
+def serialize_value(value) -> dict:
+    """
+    Return `value` as an attribute of the low level api, `float` is accepted as well as `Decimal`
+    """
+
+    value_type = type(value)
+    if value_type is str:
+        return {"S": value}
+    if value_type is bool:
+        return {"BOOL": value}
+    if value_type is int or value_type is decimal.Decimal:
+        return {"N": str(value)}
+    if value_type is float:
+        if math.isnan(value) or math.isinf(value):
+            raise TypeError("Infinity and NaN are not supported")
+        return {"N": repr(value)}
+    if value is None:
+        return {"NULL": True}
+    if isinstance(value, dict):
+        return {"M": {name: serialize_value(attribute) for name, attribute in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {"L": [serialize_value(attribute) for attribute in value]}
+    if isinstance(value, (bytes, bytearray)):
+        return {"B": bytes(value)}
+    if isinstance(value, (set, frozenset)) and value:
+        members = [serialize_value(member) for member in value]
+        type_codes = {type_code for member in members for type_code in member}
+        if len(type_codes) == 1 and type_codes <= {"S", "N", "B"}:
+            type_code = type_codes.pop()
+            return {type_code + "S": [member[type_code] for member in members]}
+    raise TypeError(f"Unsupported type {value_type.__name__} for value {value!r}")
+
+
+def serialize_item(item: dict) -> dict:
+    return {name: serialize_value(attribute) for name, attribute in item.items()}
+
+
+class ClientTable:
+    """
+    Table on the low level DynamoDB client, with the parameters and results of the resource `Table`.\n
+    The resource deserializes each attribute with `TypeDeserializer` into `Decimal` numbers.
+    This table reads the responses of the client with `deserialize_item` instead, which takes
+    half the time and returns numbers as `int` and `float`, ready for `json.dumps`.\n
+    Only the calls used by the handlers are available: `get_item`, `put_item`, `update_item`,
+    `delete_item`, `query` and `scan`.
+    """
+
+    client = None
+    name = None
+    meta = None
+
+    def __init__(self, client, table_name: str):
+        self.client = client
+        self.name = table_name
+        # Handlers catch the errors of the table through `meta.client.exceptions`
+        self.meta = SimpleNamespace(client=client)
+
+
+    def get_item(self, **kwargs) -> dict:
+        return self.__request__("get_item", kwargs)
+
+
+    def put_item(self, **kwargs) -> dict:
+        return self.__request__("put_item", kwargs)
+
+
+    def update_item(self, **kwargs) -> dict:
+        return self.__request__("update_item", kwargs)
+
+
+    def delete_item(self, **kwargs) -> dict:
+        return self.__request__("delete_item", kwargs)
+
+
+    def query(self, **kwargs) -> dict:
+        return self.__request__("query", kwargs)
+
+
+    def scan(self, **kwargs) -> dict:
+        return self.__request__("scan", kwargs)
+
+
+    def __request__(self, operation: str, params: dict) -> dict:
+        params = self.__serialize_params__(params)
+        response = getattr(self.client, operation)(**params)
+        for name in ["Item", "Attributes", "LastEvaluatedKey"]:
+            if name in response:
+                response[name] = deserialize_item(response[name])
+        if "Items" in response:
+            response["Items"] = [deserialize_item(item) for item in response["Items"]]
+        return response
+
+
+    def __serialize_params__(self, params: dict) -> dict:
+        params = dict(params)
+        params["TableName"] = self.name
+        builder = ConditionExpressionBuilder()
+        for name in CONDITION_PARAMS:
+            condition = params.get(name)
+            if not isinstance(condition, ConditionBase):
+                continue
+            expression = builder.build_expression(condition, is_key_condition=name == "KeyConditionExpression")
+            params[name] = expression.condition_expression
+            params["ExpressionAttributeNames"] = {
+                **params.get("ExpressionAttributeNames", {}),
+                **expression.attribute_name_placeholders
+            }
+            if expression.attribute_value_placeholders:
+                params["ExpressionAttributeValues"] = {
+                    **params.get("ExpressionAttributeValues", {}),
+                    **expression.attribute_value_placeholders
+                }
+        for name in SERIALIZED_PARAMS:
+            if name in params:
+                params[name] = serialize_item(params[name])
+        return params
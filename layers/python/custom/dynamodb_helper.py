@@ -0,0 +1,102 @@
+import time
+from boto3.dynamodb.types import TypeSerializer
+
+BATCH_GET_MAX_KEYS = 100
+BATCH_WRITE_MAX_ITEMS = 25
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_BASE = 0.05
+
+
+def batch_get_items(
+    db,
+    table_name: str,
+    keys: list,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    backoff_base: float = DEFAULT_BACKOFF_BASE,
+    projection_expression: str = None
+) -> list:
+    """
+    Get all items of `keys` from `table_name` with `BatchGetItem`.\n
+    `db` is a `boto3.resource("dynamodb")`. The keys are sent in chunks of 100 and
+    `UnprocessedKeys` are retried with exponential backoff.\n
+    Keys that are not found are absent from the result, the order of the result is not guaranteed.
+    """
+
+    items = []
+    for start in range(0, len(keys), BATCH_GET_MAX_KEYS):
+        request_items = {
+            table_name: {
+                "Keys": keys[start:start + BATCH_GET_MAX_KEYS]
+            }
+        }
+        if projection_expression is not None:
+            request_items[table_name]["ProjectionExpression"] = projection_expression
+        attempt = 0
+        while request_items:
+            response = db.batch_get_item(RequestItems=request_items)
+            items.extend(response.get("Responses", {}).get(table_name, []))
+            request_items = response.get("UnprocessedKeys")
+            if not request_items:
+                break
+            if attempt >= max_retries:
+                raise Exception(f"Unprocessed keys remain after {max_retries} retries")
+            time.sleep(backoff_base * (2 ** attempt))
+            attempt += 1
+    return items
+
+
+def batch_write_items(
+    db,
+    table_name: str,
+    items: list,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    backoff_base: float = DEFAULT_BACKOFF_BASE
+) -> list:
+    """
+    Put all `items` into `table_name` with `BatchWriteItem`.\n
+    The items are sent in chunks of 25 and `UnprocessedItems` are retried with exponential backoff.
+    Return the items still unprocessed once the retries are exhausted, so callers can report them.
+    """
+
+    unprocessed = []
+    for start in range(0, len(items), BATCH_WRITE_MAX_ITEMS):
+        request_items = {
+            table_name: [
+                {"PutRequest": {"Item": item}} for item in items[start:start + BATCH_WRITE_MAX_ITEMS]
+            ]
+        }
+        attempt = 0
+        while request_items:
+            response = db.batch_write_item(RequestItems=request_items)
+            request_items = response.get("UnprocessedItems")
+            if not request_items:
+                break
+            if attempt >= max_retries:
+                unprocessed.extend(request["PutRequest"]["Item"] for request in request_items[table_name])
+                break
+            time.sleep(backoff_base * (2 ** attempt))
+            attempt += 1
+    return unprocessed
+
+
+def transact_write_items(db, operations: list) -> None:
+    """
+    Run `operations` in one `TransactWriteItems` call.\n
+    Operations are written like the `Table` API, e.g. `{"Put": {"TableName": ..., "Item": {...}}}`:
+    `Item`, `Key` and `ExpressionAttributeValues` hold plain python values and are serialized here.
+    """
+
+    serializer = TypeSerializer()
+    transact_items = []
+    for operation in operations:
+        transact_item = {}
+        for action, params in operation.items():
+            params = dict(params)
+            for field in ("Item", "Key", "ExpressionAttributeValues"):
+                if field in params:
+                    params[field] = {
+                        name: serializer.serialize(value) for name, value in params[field].items()
+                    }
+            transact_item[action] = params
+        transact_items.append(transact_item)
+    db.meta.client.transact_write_items(TransactItems=transact_items)
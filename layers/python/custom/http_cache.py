@@ -0,0 +1,92 @@
+import json
+import hashlib
+from .json_helper import decimal_default
+from .request_helper import lowercase_headers
+
+# Responses depend on the signed in user, so they are only cached by the client,
+# which has to revalidate them before each use
+DEFAULT_CACHE_CONTROL = "private, no-cache"
+
+
+def compute_etag(body: str) -> str:
+    """
+    Strong ETag of a response body, for items without a version changed by every write
+    """
+
+    return '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def format_version_etag(version) -> str:
+    """
+    ETag of an item whose `version` is increased by every write, e.g. `"3"`.
+    Items without a version are at version 0.
+    """
+
+    return f'"{int(version or 0)}"'
+
+
+def parse_version_etag(value: str) -> int:
+    """
+    Return the version of an ETag made by `format_version_etag`, a weak one is accepted.\n
+    Raise `ValueError` if `value` is not the ETag of a version.
+    """
+
+    tag = value.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    if len(tag) < 2 or tag[0] != '"' or tag[-1] != '"' or not tag[1:-1].isdigit():
+        raise ValueError(f"Invalid version ETag {value!r}")
+    return int(tag[1:-1])
+
+
+def is_not_modified(headers: dict, etag: str) -> bool:
+    """
+    Evaluate `If-None-Match` against the ETag of the response
+    """
+
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # GET compares ETags weakly
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+
+def get_conditional_response(
+    event: dict,
+    item,
+    etag: str = None,
+    cache_control: str = DEFAULT_CACHE_CONTROL,
+    status_code: int = 200
+) -> dict:
+    """
+    Return `item` as a JSON response with `ETag` and `Cache-Control`,
+    or an empty `304` when the `If-None-Match` of the request matches.\n
+    `etag` defaults to the hash of the body, a versioned item passes its `format_version_etag`
+    so the same ETag can be sent back in the `If-Match` of an update.\n
+    Only ETags validate the responses: no timestamp changes with every write of the items,
+    so `Last-Modified` is not sent and `If-Modified-Since` is ignored.
+    """
+
+    body = json.dumps(item, default=decimal_default)
+    if etag is None:
+        etag = compute_etag(body)
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Expose-Headers": "ETag",
+        "Cache-Control": cache_control,
+        "ETag": etag
+    }
+
+    request_headers = lowercase_headers(event.get("headers") or {})
+    if is_not_modified(request_headers, etag):
+        return {
+            "statusCode": 304,
+            "body": "",
+            "headers": headers
+        }
+    return {
+        "statusCode": status_code,
+        "body": body,
+        "headers": headers
+    }
\ No newline at end of file
@@ -0,0 +1,117 @@
+import io
+import posixpath
+
+VARIANT_FOLDER = "variants"
+DEFAULT_VARIANTS = [
+    {
+        "name": "thumbnail",
+        "size": (256, 256),
+        "format": "WEBP",
+        "extension": "webp",
+        "content_type": "image/webp"
+    },
+    {
+        "name": "thumbnail_jpeg",
+        "size": (256, 256),
+        "format": "JPEG",
+        "extension": "jpg",
+        "content_type": "image/jpeg"
+    },
+    {
+        "name": "medium",
+        "size": (1024, 1024),
+        "format": "WEBP",
+        "extension": "webp",
+        "content_type": "image/webp"
+    }
+]
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif")
+]
+
+
+def detect_image_content_type(data, default: str = "image/jpeg") -> str:
+    """
+    Return the content type of an image from its first bytes, `default` when it is not recognized
+    """
+
+    head = bytes(data[:12])
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return default
+
+
+def is_variant_key(key: str) -> bool:
+    return posixpath.basename(posixpath.dirname(key)) == VARIANT_FOLDER
+
+
+def get_variant_key(key: str, variant: dict) -> str:
+    """
+    Key of a variant of the image `key`, e.g. `gamemap/variants/mapimage_1_thumbnail.webp`
+    for `gamemap/mapimage_1`. It is known before the variant is made.
+    """
+
+    folder, file_name = posixpath.split(key)
+    base_name = posixpath.splitext(file_name)[0]
+    return posixpath.join(folder, VARIANT_FOLDER, f"{base_name}_{variant['name']}.{variant['extension']}")
+
+
+def get_variant_urls(base_url: str, key: str, variants: list = DEFAULT_VARIANTS) -> dict:
+    return {variant["name"]: f"{base_url}/{get_variant_key(key, variant)}" for variant in variants}
+
+
+def build_image_variants(data, variants: list = DEFAULT_VARIANTS) -> list:
+    """
+    Resize and re-encode an image to each of `variants`, keeping its aspect ratio.\n
+    Return the `variant` and its encoded `data` for each of them. Images smaller
+    than a variant are re-encoded without being enlarged.
+    """
+
+    # Pillow comes from its own layer and takes long to import, only the functions making variants load it
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise Exception("Pillow is not available")
+    results = []
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        for variant in variants:
+            resized = image.copy()
+            resized.thumbnail(variant["size"], Image.LANCZOS)
+            if variant["format"] == "JPEG" and resized.mode != "RGB":
+                resized = resized.convert("RGB")
+            elif resized.mode not in ["RGB", "RGBA"]:
+                resized = resized.convert("RGBA")
+            output = io.BytesIO()
+            resized.save(output, variant["format"], quality=80)
+            results.append({
+                "variant": variant,
+                "data": output.getvalue()
+            })
+    return results
+
+
+def put_image_variants(s3, bucket_name: str, key: str, variants: list = DEFAULT_VARIANTS, acl: str = "public-read") -> list:
+    """
+    Read the image `key` from the bucket, put its variants next to it and return their keys
+    """
+
+    data = s3.get_object(Bucket=bucket_name, Key=key)["Body"].read()
+    keys = []
+    for result in build_image_variants(data, variants):
+        variant_key = get_variant_key(key, result["variant"])
+        s3.put_object(
+            Bucket=bucket_name,
+            Key=variant_key,
+            Body=result["data"],
+            ACL=acl,
+            ContentType=result["variant"]["content_type"]
+        )
+        keys.append(variant_key)
+    return keys
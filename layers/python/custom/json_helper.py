@@ -0,0 +1,12 @@
+import decimal
+
+
+def decimal_default(value):
+    """
+    `default` of `json.dumps` for items read with the DynamoDB resource api,
+    which returns every number as a `Decimal`
+    """
+
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
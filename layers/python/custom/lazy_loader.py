@@ -0,0 +1,69 @@
+import threading
+import importlib
+from .client_factory import (get_client, get_resource)
+from .dynamodb_client import ClientTable
+
+lock = threading.RLock()
+
+
+class LazyObject:
+    """
+    Proxy of the object returned by `factory`, which is only called on the first access to one
+    of its attributes.\n
+    Handlers keep defining their modules, clients and tables at module level, the init of a
+    container no longer pays for the ones its requests do not use.
+    """
+
+    __slots__ = ("_factory", "_target")
+
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_target", None)
+
+    def _load(self):
+        if self._target is None:
+            with lock:
+                if self._target is None:
+                    object.__setattr__(self, "_target", self._factory())
+        return self._target
+
+    def __getattr__(self, name: str):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(self._load(), name, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+
+def lazy_import(name: str) -> LazyObject:
+    """
+    Module imported on first use, e.g. `bcrypt = lazy_import("bcrypt")`
+    """
+
+    return LazyObject(lambda: importlib.import_module(name))
+
+
+def lazy_resource(service_name: str, **kwargs) -> LazyObject:
+    return LazyObject(lambda: get_resource(service_name, **kwargs))
+
+
+def lazy_client(service_name: str, **kwargs) -> LazyObject:
+    return LazyObject(lambda: get_client(service_name, **kwargs))
+
+
+def lazy_table(table_name: str) -> LazyObject:
+    """
+    DynamoDB `Table` of `table_name` on the shared resource
+    """
+
+    return LazyObject(lambda: get_resource("dynamodb").Table(table_name))
+
+
+def lazy_client_table(table_name: str) -> ClientTable:
+    """
+    `ClientTable` of `table_name` on the shared low level client, which is created on first use
+    """
+
+    return ClientTable(lazy_client("dynamodb"), table_name)
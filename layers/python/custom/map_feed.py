@@ -0,0 +1,115 @@
+import datetime
+
+MAP_FEED_INDEX_NAME = "game-map-feed"
+MAP_FEED_BUCKET_FORMAT = "%Y-%m"
+DEFAULT_OLDEST_BUCKET = "2020-08"
+# Months read by one call, empty months cost a query each
+MAP_FEED_MAX_BUCKETS = 6
+
+
+def get_feed_bucket(timestamp: datetime.datetime) -> str:
+    return timestamp.strftime(MAP_FEED_BUCKET_FORMAT)
+
+
+def previous_feed_bucket(bucket: str) -> str:
+    month_start = datetime.datetime.strptime(bucket, MAP_FEED_BUCKET_FORMAT)
+    return get_feed_bucket(month_start - datetime.timedelta(days=1))
+
+
+def next_feed_bucket(bucket: str) -> str:
+    month_start = datetime.datetime.strptime(bucket, MAP_FEED_BUCKET_FORMAT)
+    return get_feed_bucket(month_start + datetime.timedelta(days=31))
+
+
+def set_feed_attributes(game_map: dict, created_at: datetime.datetime) -> dict:
+    """
+    Set the `feed_bucket` and `feed_timestamp` keys of the map feed index on `game_map`
+    """
+
+    game_map["feed_bucket"] = get_feed_bucket(created_at)
+    game_map["feed_timestamp"] = created_at.isoformat()
+    return game_map
+
+
+def get_feed_start_key(game_map: dict) -> dict:
+    """
+    Build the `ExclusiveStartKey` of the map feed index to continue after `game_map`
+    """
+
+    return {
+        "id": game_map["id"],
+        "feed_bucket": game_map["feed_bucket"],
+        "feed_timestamp": game_map["feed_timestamp"]
+    }
+
+
+def get_bucket_start_key(bucket: str) -> dict:
+    """
+    Build a start key of `query_map_feed` which reads `bucket` from its first map
+    """
+
+    return {
+        "feed_bucket": bucket
+    }
+
+
+def query_map_feed(
+    game_maps,
+    limit: int,
+    exclusive_start_key: dict = None,
+    oldest_bucket: str = DEFAULT_OLDEST_BUCKET,
+    newest_first: bool = True,
+    max_buckets: int = MAP_FEED_MAX_BUCKETS
+) -> tuple:
+    """
+    Query up to `limit` maps from the map feed index, newest first.\n
+    Starts from the current month, or after `exclusive_start_key`, and moves to older
+    monthly buckets until the page is full, `oldest_bucket` has been read or `max_buckets`
+    buckets have been queried.\n
+    With `newest_first = False` the feed is read towards newer maps from `exclusive_start_key`,
+    which is how a previous page is read, and the items are still returned newest first.\n
+    Return the items and the start key to continue reading in the same direction, which is
+    `None` once the feed has been read to its end. When the page stops at `max_buckets`
+    the key is a `get_bucket_start_key` of the next bucket to read.
+    """
+
+    oldest_bucket = oldest_bucket or DEFAULT_OLDEST_BUCKET
+    newest_bucket = get_feed_bucket(datetime.datetime.now())
+    if exclusive_start_key is not None:
+        bucket = exclusive_start_key["feed_bucket"]
+        # A bucket start key has no item to start after
+        if "id" not in exclusive_start_key:
+            exclusive_start_key = None
+    else:
+        bucket = newest_bucket if newest_first else oldest_bucket
+    items = []
+    bucket_count = 0
+    while len(items) < limit and oldest_bucket <= bucket <= newest_bucket:
+        if bucket_count == max_buckets:
+            return sort_feed_items(items, newest_first), get_bucket_start_key(bucket)
+        params = {
+            "IndexName": MAP_FEED_INDEX_NAME,
+            "KeyConditionExpression": "feed_bucket = :b",
+            "ExpressionAttributeValues": {
+                ":b": bucket
+            },
+            "ScanIndexForward": newest_first is False,
+            "Limit": limit - len(items)
+        }
+        if exclusive_start_key is not None:
+            params["ExclusiveStartKey"] = exclusive_start_key
+        response = game_maps.query(**params)
+        items.extend(response.get("Items"))
+        exclusive_start_key = response.get("LastEvaluatedKey")
+        if exclusive_start_key is None:
+            bucket = previous_feed_bucket(bucket) if newest_first else next_feed_bucket(bucket)
+            bucket_count += 1
+    if len(items) < limit:
+        return sort_feed_items(items, newest_first), None
+    return sort_feed_items(items, newest_first), get_feed_start_key(items[-1])
+
+
+def sort_feed_items(items: list, newest_first: bool) -> list:
+    if newest_first is False:
+        return items[::-1]
+    return items
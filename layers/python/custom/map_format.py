@@ -0,0 +1,336 @@
+import sys
+import json
+import zlib
+import array
+import struct
+import functools
+from .image_variants import get_variant_key
+from .concurrent_executor import run_concurrently
+
+MAGIC = b"GMAP"
+VERSION = 1
+DEFAULT_CHUNK_SIZE = 32
+DEFAULT_INDEX_PREFETCH_SIZE = 64 * 1024
+# Sections closer than this are read together, a request costs more than the extra bytes
+DEFAULT_RANGE_GAP = 16 * 1024
+# magic, version, flags, chunk size, index entry count
+HEADER_FORMAT = "<4sBBHI"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+# kind, layer, chunk x, chunk y, offset, length
+INDEX_ENTRY_FORMAT = "<BxHHHQI"
+INDEX_ENTRY_SIZE = struct.calcsize(INDEX_ENTRY_FORMAT)
+SECTION_META = 0
+SECTION_TILES = 1
+# Tiles of a chunk are stored with the narrowest unsigned type holding its largest tile id
+TILE_TYPECODES = {
+    1: "B",
+    2: "H",
+    4: "I"
+}
+MAP_TILES_VARIANT = {
+    "name": "tiles",
+    "extension": "gmap",
+    "content_type": "application/octet-stream"
+}
+
+
+def is_tile_layer(layer) -> bool:
+    if not isinstance(layer, dict):
+        return False
+    data, width, height = (layer.get("data"), layer.get("width"), layer.get("height"))
+    return (
+        isinstance(data, list)
+        and isinstance(width, int)
+        and isinstance(height, int)
+        and len(data) == width * height
+        and all(isinstance(tile, int) and 0 <= tile <= 0xFFFFFFFF for tile in data)
+    )
+
+
+def encode_tiles(tiles: list) -> bytes:
+    """
+    Encode tile ids as one byte for their width followed by the compressed little endian ids
+    """
+
+    largest = max(tiles, default=0)
+    width = 1 if largest <= 0xFF else 2 if largest <= 0xFFFF else 4
+    values = array.array(TILE_TYPECODES[width], tiles)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return bytes([width]) + zlib.compress(values.tobytes(), 9)
+
+
+def decode_tiles(section: bytes) -> list:
+    values = array.array(TILE_TYPECODES[section[0]])
+    values.frombytes(zlib.decompress(section[1:]))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+def encode_map(game_map: dict, chunk_size: int = DEFAULT_CHUNK_SIZE) -> bytes:
+    """
+    Encode a map to the indexed `GMAP` format.\n
+    The `data` of every tile layer, a `width` x `height` list of tile ids, is split into
+    `chunk_size` x `chunk_size` chunks compressed on their own. The rest of the map is one
+    compressed JSON `meta` section. The index after the header gives the offset and length
+    of each section, so a chunk can be read with one byte range request.\n
+    Compressing the chunks apart makes the whole file slightly larger than the gzipped JSON,
+    the format pays off when a region of the map is read instead of the whole map.
+    """
+
+    meta = dict(game_map) if isinstance(game_map, dict) else game_map
+    sections = []
+    layers = meta.get("layers") if isinstance(meta, dict) else None
+    if isinstance(layers, list):
+        meta["layers"] = []
+        for layer_index, layer in enumerate(layers):
+            # An empty layer has no chunk to restore its `data` from, it stays in the meta section
+            if not is_tile_layer(layer) or len(layer["data"]) == 0:
+                meta["layers"].append(layer)
+                continue
+            meta["layers"].append({key: value for key, value in layer.items() if key != "data"})
+            width, height, tiles = (layer["width"], layer["height"], layer["data"])
+            for chunk_y in range(0, (height + chunk_size - 1) // chunk_size):
+                for chunk_x in range(0, (width + chunk_size - 1) // chunk_size):
+                    x, y = (chunk_x * chunk_size, chunk_y * chunk_size)
+                    chunk = []
+                    for row in range(y, min(y + chunk_size, height)):
+                        chunk.extend(tiles[row * width + x:row * width + min(x + chunk_size, width)])
+                    sections.append((SECTION_TILES, layer_index, chunk_x, chunk_y, encode_tiles(chunk)))
+    meta_section = zlib.compress(json.dumps(meta, separators=(",", ":")).encode("utf-8"), 9)
+    sections.insert(0, (SECTION_META, 0, 0, 0, meta_section))
+
+    offset = HEADER_SIZE + INDEX_ENTRY_SIZE * len(sections)
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, 0, chunk_size, len(sections))
+    index = []
+    for kind, layer_index, chunk_x, chunk_y, section in sections:
+        index.append(struct.pack(INDEX_ENTRY_FORMAT, kind, layer_index, chunk_x, chunk_y, offset, len(section)))
+        offset += len(section)
+    return b"".join([header] + index + [section[4] for section in sections])
+
+
+def parse_header(data: bytes) -> dict:
+    magic, version, flags, chunk_size, entry_count = struct.unpack_from(HEADER_FORMAT, data)
+    if magic != MAGIC or version != VERSION:
+        raise Exception("Invalid map format")
+    return {
+        "chunk_size": chunk_size,
+        "entry_count": entry_count,
+        "index_size": entry_count * INDEX_ENTRY_SIZE
+    }
+
+
+def parse_index(data: bytes, entry_count: int) -> list:
+    """
+    Parse the index entries found right after the header in `data`
+    """
+
+    entries = []
+    for position in range(entry_count):
+        kind, layer_index, chunk_x, chunk_y, offset, length = struct.unpack_from(
+            INDEX_ENTRY_FORMAT,
+            data,
+            position * INDEX_ENTRY_SIZE
+        )
+        entries.append({
+            "kind": kind,
+            "layer": layer_index,
+            "chunk_x": chunk_x,
+            "chunk_y": chunk_y,
+            "offset": offset,
+            "length": length
+        })
+    return entries
+
+
+def decode_meta(section: bytes) -> dict:
+    return json.loads(zlib.decompress(section))
+
+
+def decode_map(data: bytes) -> dict:
+    """
+    Decode a whole `GMAP` map back to the map JSON it was encoded from
+    """
+
+    header = parse_header(data)
+    entries = parse_index(data[HEADER_SIZE:HEADER_SIZE + header["index_size"]], header["entry_count"])
+    chunk_size = header["chunk_size"]
+    game_map = None
+    layers = {}
+    for entry in entries:
+        section = data[entry["offset"]:entry["offset"] + entry["length"]]
+        if entry["kind"] == SECTION_META:
+            game_map = decode_meta(section)
+        else:
+            layers.setdefault(entry["layer"], []).append((entry, decode_tiles(section)))
+    for layer_index, chunks in layers.items():
+        layer = game_map["layers"][layer_index]
+        width, height = (layer["width"], layer["height"])
+        tiles = [0] * (width * height)
+        for entry, chunk in chunks:
+            x, y = (entry["chunk_x"] * chunk_size, entry["chunk_y"] * chunk_size)
+            chunk_width = min(x + chunk_size, width) - x
+            for row in range(y, min(y + chunk_size, height)):
+                start = (row - y) * chunk_width
+                tiles[row * width + x:row * width + x + chunk_width] = chunk[start:start + chunk_width]
+        layer["data"] = tiles
+    return game_map
+
+
+def get_map_tiles_key(key: str) -> str:
+    """
+    Key of the `GMAP` encoding of the map file `key`, known before it is encoded
+    """
+
+    return get_variant_key(key, MAP_TILES_VARIANT)
+
+
+def put_map_tiles(s3, bucket_name: str, key: str, acl: str = "public-read") -> str:
+    """
+    Read the map JSON `key` from the bucket, put its `GMAP` encoding next to it and return its key
+    """
+
+    game_map = json.loads(s3.get_object(Bucket=bucket_name, Key=key)["Body"].read())
+    tiles_key = get_map_tiles_key(key)
+    s3.put_object(
+        Bucket=bucket_name,
+        Key=tiles_key,
+        Body=encode_map(game_map),
+        ACL=acl,
+        ContentType=MAP_TILES_VARIANT["content_type"]
+    )
+    return tiles_key
+
+
+def read_range(s3, bucket_name: str, key: str, start: int, length: int, etag: str = None) -> tuple:
+    """
+    Read `length` bytes of `key` from `start` and return them with the ETag of the object.\n
+    With `etag` the read fails with `PreconditionFailed` when the object has been replaced.
+    """
+
+    params = {
+        "Bucket": bucket_name,
+        "Key": key,
+        "Range": f"bytes={start}-{start + length - 1}"
+    }
+    if etag is not None:
+        params["IfMatch"] = etag
+    response = s3.get_object(**params)
+    return (response["Body"].read(), response["ETag"])
+
+
+def read_map_index(s3, bucket_name: str, key: str, prefetch_size: int = DEFAULT_INDEX_PREFETCH_SIZE) -> dict:
+    """
+    Read the header, index and meta section of the `GMAP` object `key` with byte range reads.\n
+    They are at the start of the object, one read of `prefetch_size` bytes usually gets them all.
+    """
+
+    data, etag = read_range(s3, bucket_name, key, 0, prefetch_size)
+    header = parse_header(data)
+    index_end = HEADER_SIZE + header["index_size"]
+    if len(data) < index_end:
+        data += read_range(s3, bucket_name, key, len(data), index_end - len(data), etag)[0]
+    entries = parse_index(data[HEADER_SIZE:index_end], header["entry_count"])
+    meta_entry = entries[0]
+    meta_end = meta_entry["offset"] + meta_entry["length"]
+    if len(data) < meta_end:
+        data += read_range(s3, bucket_name, key, len(data), meta_end - len(data), etag)[0]
+    return {
+        "etag": etag,
+        "chunk_size": header["chunk_size"],
+        "meta": decode_meta(data[meta_entry["offset"]:meta_end]),
+        "chunks": {
+            (entry["layer"], entry["chunk_x"], entry["chunk_y"]): entry
+            for entry in entries if entry["kind"] == SECTION_TILES
+        }
+    }
+
+
+def coalesce_ranges(entries: list, max_gap: int) -> list:
+    """
+    Group `entries` sorted by offset into ranges, entries less than `max_gap` bytes apart
+    share a range so the region is read with few requests
+    """
+
+    ranges = []
+    for entry in sorted(entries, key=lambda entry: entry["offset"]):
+        if ranges and entry["offset"] - ranges[-1]["end"] <= max_gap:
+            ranges[-1]["end"] = max(ranges[-1]["end"], entry["offset"] + entry["length"])
+            ranges[-1]["entries"].append(entry)
+        else:
+            ranges.append({
+                "start": entry["offset"],
+                "end": entry["offset"] + entry["length"],
+                "entries": [entry]
+            })
+    return ranges
+
+
+def read_map_region(
+    s3,
+    bucket_name: str,
+    key: str,
+    map_index: dict,
+    x: int,
+    y: int,
+    width: int,
+    height: int,
+    max_gap: int = DEFAULT_RANGE_GAP
+) -> list:
+    """
+    Return the tiles of every tile layer inside the box at `x`, `y` of `width` x `height` tiles.\n
+    Only the chunks covering the box are read, with concurrent byte range reads checked
+    against the ETag of `map_index`. Each layer has its `layer` index, `name`, the box
+    clipped to the layer and its `data`, row by row.
+    """
+
+    chunk_size = map_index["chunk_size"]
+    layer_indexes = sorted({chunk_key[0] for chunk_key in map_index["chunks"]})
+    regions = []
+    needed = []
+    for layer_index in layer_indexes:
+        layer = map_index["meta"]["layers"][layer_index]
+        left, top = (max(x, 0), max(y, 0))
+        right, bottom = (min(x + width, layer["width"]), min(y + height, layer["height"]))
+        if right <= left or bottom <= top:
+            continue
+        regions.append({
+            "layer": layer_index,
+            "name": layer.get("name"),
+            "x": left,
+            "y": top,
+            "width": right - left,
+            "height": bottom - top
+        })
+        for chunk_y in range(top // chunk_size, (bottom - 1) // chunk_size + 1):
+            for chunk_x in range(left // chunk_size, (right - 1) // chunk_size + 1):
+                needed.append(map_index["chunks"][(layer_index, chunk_x, chunk_y)])
+
+    ranges = coalesce_ranges(needed, max_gap)
+    contents = run_concurrently([
+        functools.partial(read_range, s3, bucket_name, key, read["start"], read["end"] - read["start"], map_index["etag"])
+        for read in ranges
+    ])
+    chunks = {}
+    for read, (content, _) in zip(ranges, contents):
+        for entry in read["entries"]:
+            start = entry["offset"] - read["start"]
+            chunks[(entry["layer"], entry["chunk_x"], entry["chunk_y"])] = decode_tiles(content[start:start + entry["length"]])
+
+    for region in regions:
+        layer = map_index["meta"]["layers"][region["layer"]]
+        data = []
+        for row in range(region["y"], region["y"] + region["height"]):
+            chunk_y = row // chunk_size
+            column = region["x"]
+            while column < region["x"] + region["width"]:
+                chunk_x = column // chunk_size
+                chunk_left = chunk_x * chunk_size
+                chunk_width = min(chunk_left + chunk_size, layer["width"]) - chunk_left
+                chunk_end = min(chunk_left + chunk_size, region["x"] + region["width"])
+                start = (row - chunk_y * chunk_size) * chunk_width + column - chunk_left
+                data.extend(chunks[(region["layer"], chunk_x, chunk_y)][start:start + chunk_end - column])
+                column = chunk_end
+        region["data"] = data
+    return regions
@@ -0,0 +1,179 @@
+import io
+import re
+
+DEFAULT_MAX_PART_SIZE = 10 * 1024 * 1024
+DEFAULT_MAX_FIELD_SIZE = 64 * 1024
+DEFAULT_MAX_PARTS = 16
+HEADER_PARAM_PATTERN = re.compile(r';\s*([^=;\s]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)')
+
+
+class MultipartLimitError(Exception):
+    """
+    Raised when a part of the body is bigger than its limit or the body has too many parts
+    """
+
+
+class MultipartParseError(Exception):
+    """
+    Raised when the body is truncated or is not a valid `multipart/form-data` body
+    """
+
+
+class MemoryViewReader(io.RawIOBase):
+    """
+    Read-only, seekable file over a `memoryview`.\n
+    boto3 does not accept a `memoryview` as a `Body`, wrapping it uploads the part
+    without copying it to `bytes` first.
+    """
+
+    def __init__(self, view: memoryview):
+        super().__init__()
+        self.__view = view.cast("B") if view.format != "B" else view
+        self.__position = 0
+
+
+    def readable(self) -> bool:
+        return True
+
+
+    def seekable(self) -> bool:
+        return True
+
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), len(self.__view) - self.__position)
+        if size <= 0:
+            return 0
+        buffer[:size] = self.__view[self.__position:self.__position + size]
+        self.__position += size
+        return size
+
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.__position
+        elif whence == io.SEEK_END:
+            offset += len(self.__view)
+        if offset < 0:
+            raise ValueError("Negative seek position")
+        self.__position = offset
+        return self.__position
+
+
+    def tell(self) -> int:
+        return self.__position
+
+
+    def __len__(self) -> int:
+        return len(self.__view)
+
+
+def get_boundary(content_type: str) -> bytes:
+    """
+    Return the boundary of a `multipart/form-data` content type, `None` for any other content type
+    """
+
+    if content_type is None or not content_type.lower().startswith("multipart/"):
+        return None
+    params = parse_header_params(content_type)
+    boundary = params.get("boundary")
+    if not boundary:
+        return None
+    return boundary.encode("latin-1")
+
+
+def parse_header_params(value: str) -> dict:
+    params = {}
+    for key, param in HEADER_PARAM_PATTERN.findall(value):
+        param = param.strip()
+        if len(param) >= 2 and param[0] == param[-1] == '"':
+            param = re.sub(r'\\(.)', r'\1', param[1:-1])
+        params[key.lower()] = param
+    return params
+
+
+def parse_multipart(
+    body: bytes,
+    boundary: bytes,
+    max_part_size: int = DEFAULT_MAX_PART_SIZE,
+    max_field_size: int = DEFAULT_MAX_FIELD_SIZE,
+    max_parts: int = DEFAULT_MAX_PARTS
+) -> dict:
+    """
+    Parse a `multipart/form-data` body by scanning for the boundary.\n
+    Files are `memoryview` slices of `body`, nothing is copied. Fields without a `filename`
+    are decoded to `str` and limited to `max_field_size` bytes, files to `max_part_size` bytes.\n
+    The result has the shape of `parse_binary_multipart_to_form`.\n
+    Raise `MultipartParseError` when the body is truncated or malformed.
+    """
+
+    view = memoryview(body)
+    delimiter = b"--" + boundary
+    # Every part body ends with a line break followed by the delimiter
+    part_end = b"\r\n" + delimiter
+    position = body.find(delimiter)
+    if position < 0:
+        raise MultipartParseError("The multipart body has no boundary")
+    position += len(delimiter)
+
+    form = {}
+    part_count = 0
+    while True:
+        if body[position:position + 2] == b"--":
+            return form
+        if body[position:position + 2] != b"\r\n":
+            raise MultipartParseError("The multipart body is malformed")
+        part_count += 1
+        if part_count > max_parts:
+            raise MultipartLimitError(f"The body has more than {max_parts} parts")
+
+        headers_end = body.find(b"\r\n\r\n", position + 2)
+        if headers_end < 0:
+            raise MultipartParseError("The multipart body is malformed")
+        headers = parse_part_headers(body[position + 2:headers_end])
+        data_start = headers_end + 4
+        data_end = body.find(part_end, data_start)
+        if data_end < 0:
+            raise MultipartParseError("The multipart body is malformed")
+        position = data_end + len(part_end)
+
+        disposition = headers.get("content-disposition", "")
+        metadata = parse_header_params(disposition)
+        disposition_type = disposition.split(";", 1)[0].strip()
+        if disposition_type:
+            metadata = {disposition_type: "", **metadata}
+        key = metadata.get("name")
+        if key is None:
+            continue
+        size = data_end - data_start
+        if "filename" in metadata:
+            if size > max_part_size:
+                raise MultipartLimitError(f"The part '{key}' is larger than {max_part_size} bytes")
+            form[key] = {
+                "metadata": metadata,
+                "value": {
+                    "file_name": metadata["filename"],
+                    "content_type": headers.get("content-type"),
+                    "data": view[data_start:data_end]
+                }
+            }
+        else:
+            if size > max_field_size:
+                raise MultipartLimitError(f"The field '{key}' is larger than {max_field_size} bytes")
+            try:
+                value = str(view[data_start:data_end], "utf-8")
+            except UnicodeDecodeError:
+                raise MultipartParseError(f"The field '{key}' is not valid UTF-8")
+            form[key] = {
+                "metadata": metadata,
+                "value": value
+            }
+
+
+def parse_part_headers(raw_headers: bytes) -> dict:
+    headers = {}
+    for line in raw_headers.decode("utf-8", "replace").split("\r\n"):
+        name, separator, value = line.partition(":")
+        if separator:
+            headers[name.strip().lower()] = value.strip()
+    return headers
@@ -1,9 +1,15 @@
 import math
+import json
+import hmac
+import base64
+import hashlib
 
 
 class RequestPaginator(object):
     DEFAULT_PAGE_SIZE = 3
     DEFAULT_PARAM_NAME = "page"
+    CURSOR_NEXT = "next"
+    CURSOR_PREVIOUS = "previous"
     
     total_result_count = 0
     page_count = 0
@@ -11,13 +17,17 @@ class RequestPaginator(object):
     param_name = DEFAULT_PARAM_NAME
     request = None
     number_of_pages = 0
+    secret_key = None
+    scope = None
 
     def __init__(
         self, 
         request:str,
         total_result_count:int,
         page_size:int = DEFAULT_PAGE_SIZE,
-        param_name:str = DEFAULT_PAGE_SIZE
+        param_name:str = DEFAULT_PAGE_SIZE,
+        secret_key:str = None,
+        scope:str = None
     ):
         if total_result_count < 0 or page_size <= 0:
             raise Exception("Invalid arguments")
@@ -26,6 +36,9 @@ class RequestPaginator(object):
         self.page_size = page_size
         self.param_name = param_name
         self.total_result_count = total_result_count
+        self.secret_key = secret_key
+        # Endpoint and caller the cursors are signed for
+        self.scope = scope
         self.number_of_pages = math.ceil(self.total_result_count / self.page_size)
 
     
@@ -59,4 +72,87 @@ class RequestPaginator(object):
         if page == None:
             return None
         return f"{self.request}?{self.param_name}={page}"
-        
\ No newline at end of file
+
+
+    def paginate_with_cursor(
+        self,
+        results: list,
+        page:int,
+        first_key:dict,
+        last_key:dict,
+        previous_page:int = None,
+        next_page:int = None
+    ) -> dict:
+        """
+        Same as `paginate` but the `next` and `previous` links carry signed cursors instead of page numbers.\n
+        `first_key` and `last_key` are the DynamoDB keys of the first and last item of `results`,
+        they become the `ExclusiveStartKey` of the previous and next page.
+        `previous_page` and `next_page` default to the pages around `page`, a page cut short
+        by the query passes its own number so the rest of it keeps that number.
+        """
+
+        if self.secret_key is None:
+            raise Exception("Cursor pagination requires a secret key")
+        if results == None:
+            results = []
+        if previous_page is None:
+            previous_page = page - 1
+        if next_page is None:
+            next_page = page + 1
+        previous = next = None
+        if previous_page >= 1 and first_key is not None:
+            previous = self.__construct_cursor_request__(previous_page, first_key, self.CURSOR_PREVIOUS)
+        if next_page <= self.number_of_pages and last_key is not None:
+            next = self.__construct_cursor_request__(next_page, last_key, self.CURSOR_NEXT)
+
+        return {
+            "count": self.total_result_count,
+            "next": next,
+            "previous": previous,
+            "results": results
+        }
+
+
+    def encode_cursor(self, page:int, key:dict, direction:str = CURSOR_NEXT) -> str:
+        body = base64.urlsafe_b64encode(json.dumps({
+            "page": page,
+            "key": key,
+            "direction": direction,
+            "scope": self.scope
+        }, separators=(",", ":")).encode("utf-8")).decode("utf-8").rstrip("=")
+        return f"{body}.{self.__sign__(body)}"
+
+
+    def decode_cursor(self, cursor:str) -> dict:
+        """
+        Return the `page`, `key` and `direction` of a cursor created by `encode_cursor`.\n
+        Raise an `Exception` if the cursor is malformed, its signature does not match or it was
+        made for another `scope`, such as another endpoint or user.
+        """
+
+        if self.secret_key is None:
+            raise Exception("Cursor pagination requires a secret key")
+        try:
+            body, signature = cursor.split(".")
+        except (AttributeError, ValueError):
+            raise Exception("Invalid cursor")
+        if hmac.compare_digest(signature, self.__sign__(body)) is False:
+            raise Exception("Invalid cursor")
+        try:
+            data = json.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+        except ValueError:
+            raise Exception("Invalid cursor")
+        if data.get("direction") not in (self.CURSOR_NEXT, self.CURSOR_PREVIOUS):
+            raise Exception("Invalid cursor")
+        if data.get("scope") != self.scope:
+            raise Exception("Invalid cursor")
+        return data
+
+
+    def __construct_cursor_request__(self, page:int, key:dict, direction:str) -> str:
+        return f"{self.request}?{self.param_name}={self.encode_cursor(page, key, direction)}"
+
+
+    def __sign__(self, body:str) -> str:
+        digest = hmac.new(self.secret_key.encode("utf-8"), body.encode("utf-8"), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode("utf-8").rstrip("=")
@@ -0,0 +1,33 @@
+DEFAULT_EXPIRES_IN = 900
+DEFAULT_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+
+def generate_upload_post(
+    s3,
+    bucket_name: str,
+    key: str,
+    content_type_prefix: str,
+    max_size: int = DEFAULT_MAX_UPLOAD_SIZE,
+    expires_in: int = DEFAULT_EXPIRES_IN,
+    acl: str = "public-read"
+) -> dict:
+    """
+    Presign a browser `POST` of one object to `key` and return its `url` and form `fields`.\n
+    The client posts the `fields`, a `Content-Type` starting with `content_type_prefix`
+    and the `file` last. S3 rejects bodies larger than `max_size` bytes, the upload is
+    completed by the bucket notification of `key`, not by the api.
+    """
+
+    return s3.generate_presigned_post(
+        Bucket=bucket_name,
+        Key=key,
+        Fields={
+            "acl": acl
+        },
+        Conditions=[
+            {"acl": acl},
+            ["starts-with", "$Content-Type", content_type_prefix],
+            ["content-length-range", 1, max_size]
+        ],
+        ExpiresIn=expires_in
+    )
@@ -1,5 +1,13 @@
-import email
 import base64
+import binascii
+from .multipart_parser import (
+    MultipartParseError,
+    DEFAULT_MAX_PART_SIZE,
+    DEFAULT_MAX_FIELD_SIZE,
+    DEFAULT_MAX_PARTS,
+    get_boundary,
+    parse_multipart
+)
 
 def parse_cookies(cookie_str: str) -> dict:
     if cookie_str is None:
@@ -15,46 +23,39 @@ def parse_cookies(cookie_str: str) -> dict:
     return cookies
 
 
-def parse_binary_multipart_to_form(request: dict) -> dict:
+def parse_binary_multipart_to_form(
+    request: dict,
+    max_part_size: int = DEFAULT_MAX_PART_SIZE,
+    max_field_size: int = DEFAULT_MAX_FIELD_SIZE,
+    max_parts: int = DEFAULT_MAX_PARTS
+) -> dict:
     """
     Parse binary body from `multipart/form-data` type to `dict`\n
     If the `Content-Type` is not `multipart/form-data` then return `None`\n
     Else the returned result is a `dict`. Each pair is a `dict` contains of 2 fields:\n
     `metadata`: a map of parameters from subpart of the body\n
-    `value`: the value of subpart
+    `value`: the value of subpart, files are `memoryview` slices of the decoded body\n
+    Raise `MultipartLimitError` when a part exceeds its size limit or there are too many parts,
+    `MultipartParseError` when the body is not valid base64 or not a valid multipart body.
     """
 
-    request["headers"] = lowercase_headers(request["headers"])
     if request is None:
         raise Exception("The request param cannot be None")
-    post_data = ("Content-Type: " + request["headers"]["content-type"] + "\n").encode() + base64.b64decode(request["body"])
-    msg = email.message_from_bytes(post_data)
-    if msg.is_multipart() is False:
+    request["headers"] = lowercase_headers(request["headers"])
+    boundary = get_boundary(request["headers"].get("content-type"))
+    if boundary is None:
         return None
-
-    form = {}
-    for part in msg.get_payload():
-        key = part.get_param("name", header="Content-Disposition")
-        tuple_params = part.get_params(header="Content-Disposition", unquote=True)
-        map_params = {}
-        for param in tuple_params:
-            map_params[param[0]] = param[1]
-        payload = part.get_payload()
-        if "filename" in map_params:
-            payload = part.get_payload(decode=True)
-            form[key] = {
-                "metadata": map_params,
-                "value": {
-                    "file_name": map_params["filename"],
-                    "data": payload
-                }
-            }
-        else:
-            form[key] = {
-                "metadata": map_params,
-                "value": payload
-            }
-    return form
+    try:
+        body = base64.b64decode(request.get("body") or "")
+    except binascii.Error:
+        raise MultipartParseError("The body is not valid base64")
+    return parse_multipart(
+        body,
+        boundary,
+        max_part_size,
+        max_field_size,
+        max_parts
+    )
 
 
 def validate_multipart_form_data(form: dict, validator: list = []) -> bool:
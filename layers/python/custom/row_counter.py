@@ -0,0 +1,73 @@
+import random
+from .dynamodb_helper import batch_get_items
+
+DEFAULT_SHARD_COUNT = 10
+
+
+class ShardedCounter(object):
+    """
+    Row counter of the `table_row_count` table spread over `shard_count` items.\n
+    Writers atomically `ADD` to one random shard, so concurrent increments are never lost
+    and no single item takes every write. Readers sum every shard with one `BatchGetItem`.\n
+    The un-sharded item `counter_name` written before sharding is still counted.
+    """
+
+    db = None
+    table_name = None
+    counter_name = None
+    shard_count = DEFAULT_SHARD_COUNT
+
+    def __init__(self, db, table_name:str, counter_name:str, shard_count:int = DEFAULT_SHARD_COUNT):
+        if shard_count <= 0:
+            raise Exception("Invalid arguments")
+        self.db = db
+        self.table_name = table_name
+        self.counter_name = counter_name
+        self.shard_count = shard_count
+
+
+    def increment(self, amount:int = 1) -> None:
+        params = self.increment_operation(amount)["Update"]
+        del params["TableName"]
+        self.db.Table(self.table_name).update_item(**params)
+
+
+    def increment_operation(self, amount:int = 1) -> dict:
+        """
+        Return the increment as an `Update` operation for `transact_write_items`,
+        so the counter is written in the same transaction as the counted item.
+        """
+
+        return {
+            "Update": {
+                "TableName": self.table_name,
+                "Key": {
+                    "table_name": self.__shard_key__(random.randrange(self.shard_count))
+                },
+                "UpdateExpression": "ADD row_count :n",
+                "ExpressionAttributeValues": {
+                    ":n": amount
+                }
+            }
+        }
+
+
+    def get(self) -> int:
+        keys = [{"table_name": self.counter_name}] + [
+            {"table_name": self.__shard_key__(shard)} for shard in range(self.shard_count)
+        ]
+        items = batch_get_items(self.db, self.table_name, keys)
+        return sum(int(item.get("row_count", 0)) for item in items)
+
+
+    def __shard_key__(self, shard:int) -> str:
+        return f"{self.counter_name}#{shard}"
+
+
+def scope_counter_name(table_name: str, scope: str, value: str) -> str:
+    """
+    Name of the counter of the rows of `table_name` where `scope` equals `value`,
+    e.g. the maps of one creator
+    """
+
+    return f"{table_name}#{scope}#{value}"
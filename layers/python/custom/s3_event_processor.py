@@ -0,0 +1,92 @@
+import urllib.parse
+from .concurrent_executor import (ConcurrentTaskError, run_concurrently)
+
+
+class S3EventBatchError(Exception):
+    """
+    Raised by `process_s3_event` once every group has been processed, when some of them failed.\n
+    `failures` is the list of `{"target", "keys", "error"}` of the failed groups. Raising makes the
+    bucket notification retry the event, so the group functions have to be idempotent.
+    """
+
+    failures = None
+
+    def __init__(self, failures: list):
+        super().__init__("; ".join(
+            f"{failure['target']} ({', '.join(failure['keys'])}): {failure['error']}" for failure in failures
+        ))
+        self.failures = failures
+
+
+def get_s3_records(event: dict) -> list:
+    """
+    Return the `bucket_name`, `key`, `event_name` and `sequencer` of every record of an S3 event.\n
+    Keys are URL encoded in the notifications and decoded here. When an object is written several
+    times in one event, only its latest record is kept, the order of the records is preserved.
+    """
+
+    records = {}
+    for record in event.get("Records") or []:
+        s3_record = record.get("s3")
+        if s3_record is None:
+            continue
+        key = urllib.parse.unquote_plus(s3_record["object"]["key"])
+        bucket_name = s3_record["bucket"]["name"]
+        sequencer = s3_record["object"].get("sequencer") or ""
+        previous = records.get((bucket_name, key))
+        if previous is not None:
+            # Sequencers of one key are hexadecimal strings of any length, compared once padded
+            width = max(len(previous["sequencer"]), len(sequencer))
+            if previous["sequencer"].rjust(width, "0") > sequencer.rjust(width, "0"):
+                continue
+        records.pop((bucket_name, key), None)
+        records[(bucket_name, key)] = {
+            "bucket_name": bucket_name,
+            "key": key,
+            "event_name": record.get("eventName"),
+            "sequencer": sequencer
+        }
+    return list(records.values())
+
+
+def group_s3_records(records: list, get_target) -> dict:
+    """
+    Group `records` by the item they update.\n
+    `get_target` takes a record and returns a hashable target, e.g. the id of a map,
+    or `None` for records that are ignored.
+    """
+
+    groups = {}
+    for record in records:
+        target = get_target(record)
+        if target is None:
+            continue
+        groups.setdefault(target, []).append(record)
+    return groups
+
+
+def process_s3_event(event: dict, get_target, process_group) -> int:
+    """
+    Process every record of an S3 event, with one call of `process_group(target, records)` per target.\n
+    The groups are independent and run concurrently. A failed group does not stop the others,
+    `S3EventBatchError` is raised with all the failures once they are done.
+    Return the number of groups processed.
+    """
+
+    groups = list(group_s3_records(get_s3_records(event), get_target).items())
+    tasks = [
+        (lambda target=target, records=records: process_group(target, records)) for target, records in groups
+    ]
+    try:
+        run_concurrently(tasks)
+    except ConcurrentTaskError as e:
+        failures = []
+        for index, error in e.errors:
+            target, records = groups[index]
+            failures.append({
+                "target": str(target),
+                "keys": [record["key"] for record in records],
+                "error": str(error)
+            })
+        raise S3EventBatchError(failures)
+    return len(groups)
@@ -0,0 +1,157 @@
+import math
+import time
+import struct
+import hashlib
+
+STATEFUL_MODE = "stateful"
+STATELESS_MODE = "stateless"
+
+
+class BloomFilter(object):
+    """
+    Compact probabilistic set used to ship revoked token epochs to the authorizers.\n
+    `__contains__` never returns a false negative, a positive only means "maybe".
+    """
+
+    HEADER_FORMAT = ">II"
+    MIN_SIZE = 1024
+
+    size = 0
+    hash_count = 0
+    bits = None
+
+    def __init__(self, size:int, hash_count:int, bits:bytearray = None):
+        if size <= 0 or hash_count <= 0:
+            raise Exception("Invalid arguments")
+        self.size = size
+        self.hash_count = hash_count
+        self.bits = bits if bits is not None else bytearray(math.ceil(size / 8))
+
+
+    @classmethod
+    def create(cls, expected_items:int, false_positive_rate:float = 0.01):
+        expected_items = max(expected_items, 1)
+        size = math.ceil(-expected_items * math.log(false_positive_rate) / (math.log(2) ** 2))
+        hash_count = max(1, round(size / expected_items * math.log(2)))
+        return cls(max(size, cls.MIN_SIZE), hash_count)
+
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        header_size = struct.calcsize(cls.HEADER_FORMAT)
+        size, hash_count = struct.unpack(cls.HEADER_FORMAT, data[:header_size])
+        return cls(size, hash_count, bytearray(data[header_size:]))
+
+
+    def to_bytes(self) -> bytes:
+        return struct.pack(self.HEADER_FORMAT, self.size, self.hash_count) + bytes(self.bits)
+
+
+    def add(self, value: str) -> None:
+        for position in self.__positions__(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.__positions__(value))
+
+
+    def __positions__(self, value: str):
+        digest = hashlib.sha256(value.encode("utf-8")).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:16], "big") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+
+class RevocationSet(object):
+    """
+    Revoked `(user_id, epoch)` pairs, loaded from an S3 snapshot and refreshed on a timer.\n
+    The snapshot is only downloaded again when its `ETag` has changed.
+    Until a snapshot is loaded every token is treated as possibly revoked.
+    """
+
+    DEFAULT_REFRESH_INTERVAL = 60
+
+    s3 = None
+    bucket = None
+    key = None
+    refresh_interval = DEFAULT_REFRESH_INTERVAL
+
+    def __init__(self, s3, bucket:str, key:str, refresh_interval:int = DEFAULT_REFRESH_INTERVAL):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.refresh_interval = refresh_interval
+        self.__bloom = None
+        self.__etag = None
+        self.__loaded_at = 0
+
+
+    def is_possibly_revoked(self, user_id: str, epoch: int) -> bool:
+        self.refresh()
+        if self.__bloom is None:
+            return True
+        return revocation_key(user_id, epoch) in self.__bloom
+
+
+    def refresh(self, force: bool = False) -> None:
+        if not force and time.time() - self.__loaded_at < self.refresh_interval:
+            return
+        self.__loaded_at = time.time()
+        try:
+            params = {
+                "Bucket": self.bucket,
+                "Key": self.key
+            }
+            if self.__etag is not None:
+                params["IfNoneMatch"] = self.__etag
+            response = self.s3.get_object(**params)
+            self.__bloom = BloomFilter.from_bytes(response["Body"].read())
+            self.__etag = response.get("ETag")
+        except Exception as e:
+            # A 304 keeps the current snapshot, any other error too
+            error_code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if error_code not in ("304", "NotModified"):
+                print(f"Load revocation snapshot error: {e}")
+
+
+def revocation_key(user_id: str, epoch: int) -> str:
+    return f"{user_id}:{int(epoch)}"
+
+
+def build_revocation_filter(user_epochs: dict, false_positive_rate: float = 0.01) -> BloomFilter:
+    """
+    Build the filter from a `dict` of `user_id` to the current `token_epoch`.\n
+    Every epoch lower than the current one of a user is revoked.
+    """
+
+    revoked = [
+        revocation_key(user_id, epoch)
+        for user_id, current_epoch in user_epochs.items()
+        for epoch in range(int(current_epoch))
+    ]
+    bloom = BloomFilter.create(len(revoked), false_positive_rate)
+    for key in revoked:
+        bloom.add(key)
+    return bloom
+
+
+def can_skip_user_lookup(payload: dict, revocation_set: RevocationSet) -> bool:
+    """
+    Return `True` if the decoded token can be trusted without reading the user table:
+    it carries an `epoch` claim and the revocation set does not contain it.
+    """
+
+    if revocation_set is None or payload is None or payload.get("epoch") is None:
+        return False
+    return revocation_set.is_possibly_revoked(payload["user_id"], payload["epoch"]) is False
+
+
+def is_token_epoch_valid(payload: dict, user: dict) -> bool:
+    """
+    Tokens issued before epochs existed carry no `epoch` claim and stay valid.
+    """
+
+    if payload.get("epoch") is None:
+        return True
+    return int(payload["epoch"]) == int(user.get("token_epoch", 0))
@@ -0,0 +1,75 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache(object):
+    """
+    Bounded LRU cache whose entries expire after `ttl` seconds.\n
+    Meant to be created at module level so it lives as long as the warm container.
+    """
+
+    DEFAULT_MAX_SIZE = 1024
+    DEFAULT_TTL = 300
+
+    max_size = DEFAULT_MAX_SIZE
+    ttl = DEFAULT_TTL
+    hits = 0
+    misses = 0
+
+    def __init__(self, max_size:int = DEFAULT_MAX_SIZE, ttl:int = DEFAULT_TTL):
+        if max_size <= 0 or ttl < 0:
+            raise Exception("Invalid arguments")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+
+
+    def get(self, key, default = None):
+        entry = self.__entries.get(key)
+        if entry is None or entry["expires_at"] <= time.time():
+            if entry is not None:
+                del self.__entries[key]
+            self.misses += 1
+            return default
+        self.__entries.move_to_end(key)
+        self.hits += 1
+        return entry["value"]
+
+
+    def put(self, key, value, ttl:int = None, expires_at:float = None) -> None:
+        """
+        Store `value` for `ttl` seconds, the `ttl` of the cache by default.\n
+        `expires_at` is a unix timestamp the entry cannot outlive, an entry already expired is not stored.
+        """
+
+        now = time.time()
+        entry_expires_at = now + (self.ttl if ttl is None else ttl)
+        if expires_at is not None:
+            entry_expires_at = min(entry_expires_at, float(expires_at))
+        if entry_expires_at <= now:
+            return
+        self.__entries[key] = {
+            "value": value,
+            "expires_at": entry_expires_at
+        }
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.max_size:
+            self.__entries.popitem(last=False)
+
+
+    def clear(self) -> None:
+        self.__entries.clear()
+
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.__entries)
+        }
+
+
+    def __len__(self) -> int:
+        return len(self.__entries)
@@ -1,7 +1,10 @@
 import datetime
-import jwt
+from .lazy_loader import lazy_import
 
-def generate_access_token(user_id: str, SECRET_KEY: str):
+# pyjwt comes from its own layer, functions importing the package without it still start
+jwt = lazy_import("jwt")
+
+def generate_access_token(user_id: str, SECRET_KEY: str, token_epoch: int = None):
     if user_id is None:
         raise Exception("User cannot be None")
 
@@ -10,11 +13,13 @@ def generate_access_token(user_id: str, SECRET_KEY: str):
         "iat": datetime.datetime.now(),
         "exp": datetime.datetime.now() + datetime.timedelta(hours=2)
     }
+    if token_epoch is not None:
+        payload["epoch"] = int(token_epoch)
     token = jwt.encode(payload, SECRET_KEY, algorithm="HS256").decode("utf-8")
 
     return token
 
-def generate_refresh_token(user_id: str, SECRET_KEY: str):
+def generate_refresh_token(user_id: str, SECRET_KEY: str, token_epoch: int = None):
     if user_id is None:
         raise Exception("User cannot be None")
     payload = {
@@ -22,6 +27,8 @@ def generate_refresh_token(user_id: str, SECRET_KEY: str):
         "iat": datetime.datetime.now(),
         "exp": datetime.datetime.now() + datetime.timedelta(days=5)
     }
+    if token_epoch is not None:
+        payload["epoch"] = int(token_epoch)
     token = jwt.encode(payload, SECRET_KEY, algorithm="HS256").decode("utf-8")
 
     return token
@@ -40,8 +47,6 @@ def decode_user_token(token: str, SECRET_KEY: str):
     except:
         error = "Token decoding error"
     finally:
-        print(f"error: {error}")
-        print(f"payload: {payload}")
         if error is None:
             return {
                 "payload": payload,
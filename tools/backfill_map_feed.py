@@ -0,0 +1,52 @@
+"""
+Set the map feed index keys on maps created before the `game-map-feed` index existed.\n
+Usage: `python tools/backfill_map_feed.py [--table minh-intern.game_map_by_id] [--dry-run]`
+"""
+
+import os
+import sys
+import argparse
+import datetime
+import boto3
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "layers", "python"))
+from custom.map_feed import set_feed_attributes
+
+
+def backfill(table, dry_run: bool = False) -> int:
+    updated_count = 0
+    params = {}
+    while True:
+        response = table.scan(**params)
+        for game_map in response.get("Items"):
+            if game_map.get("feed_bucket") is not None:
+                continue
+            # `last_edited` is the best known creation time of a legacy map
+            created_at = datetime.datetime.fromisoformat(game_map["last_edited"])
+            keys = set_feed_attributes({}, created_at)
+            print(f"{game_map['id']}: {keys}")
+            if not dry_run:
+                table.update_item(
+                    Key={
+                        "id": game_map["id"]
+                    },
+                    UpdateExpression="SET feed_bucket = :b, feed_timestamp = :t",
+                    ExpressionAttributeValues={
+                        ":b": keys["feed_bucket"],
+                        ":t": keys["feed_timestamp"]
+                    },
+                    ConditionExpression="attribute_exists(id)"
+                )
+            updated_count += 1
+        if response.get("LastEvaluatedKey") is None:
+            return updated_count
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the map feed index keys")
+    parser.add_argument("--table", default="minh-intern.game_map_by_id")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    table = boto3.resource("dynamodb").Table(args.table)
+    print(f"Updated {backfill(table, args.dry_run)} maps")
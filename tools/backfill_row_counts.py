@@ -0,0 +1,62 @@
+"""
+Write the per-scope row counters (maps per creator) of existing data.\n
+Run it once before deploying the handlers that maintain the counters, it sets the
+un-sharded counter item of every scope to the number of rows found.\n
+Usage: `python tools/backfill_row_counts.py [--dry-run]`
+"""
+
+import os
+import sys
+import argparse
+import collections
+import boto3
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "layers", "python"))
+from custom.row_counter import scope_counter_name
+
+
+def count_by(table, attribute: str) -> dict:
+    counts = collections.Counter()
+    params = {
+        "ProjectionExpression": "#a",
+        "ExpressionAttributeNames": {
+            "#a": attribute
+        }
+    }
+    while True:
+        response = table.scan(**params)
+        for item in response.get("Items"):
+            counts[item[attribute]] += 1
+        if response.get("LastEvaluatedKey") is None:
+            return counts
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def write_counts(row_count_table, table_name: str, scope: str, counts: dict, dry_run: bool) -> None:
+    for value, count in counts.items():
+        counter_name = scope_counter_name(table_name, scope, value)
+        print(f"{counter_name}: {count}")
+        if not dry_run:
+            row_count_table.put_item(
+                Item={
+                    "table_name": counter_name,
+                    "row_count": count
+                }
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the per-scope row counters")
+    parser.add_argument("--map-table", default="minh-intern.game_map")
+    parser.add_argument("--row-count-table", default="minh-intern.table_row_count")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    db = boto3.resource("dynamodb")
+    row_count_table = db.Table(args.row_count_table)
+    write_counts(
+        row_count_table,
+        args.map_table,
+        "created_by",
+        count_by(db.Table(args.map_table), "created_by"),
+        args.dry_run
+    )
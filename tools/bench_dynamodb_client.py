@@ -0,0 +1,165 @@
+"""
+Compare reading items with the DynamoDB resource `Table` and with `ClientTable` of the custom layer.\n
+The responses are served from memory at the HTTP level, so both paths parse the same JSON
+with botocore and only differ by how the items are deserialized. The items look like the
+maps and users of the api. Each case reads the items and dumps them to JSON like the handlers.\n
+Usage: `python tools/bench_dynamodb_client.py [--items 100] [--runs 200]`
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import boto3
+from botocore.awsrequest import AWSResponse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "layers", "python"))
+from custom.json_helper import decimal_default
+from custom.dynamodb_client import (ClientTable, deserialize_item, serialize_item)
+from boto3.dynamodb.types import TypeDeserializer
+
+
+class RawResponse:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+def make_map(index: int) -> dict:
+    map_id = f"{random.getrandbits(128):032x}"
+    base_url = "https://s3.amazonaws.com/minh-intern.game-bucket/gamemap"
+    return {
+        "id": map_id,
+        "created_by": f"{random.getrandbits(128):032x}",
+        "last_edited": f"2020-08-{index % 28 + 1:02d} 10:11:12.123456",
+        "created_date": "2020-08-01 10:11:12.123456",
+        "feed_bucket": "2020-08",
+        "map_name": f"Map {index}",
+        "description": "A map of the island with a castle and a forest " * 3,
+        "version": random.randint(1, 40),
+        "width": 512,
+        "height": 512,
+        "tile_width": 32,
+        "tile_height": 32,
+        "layer_count": 3,
+        "scale": 1.5,
+        "map_image_url": f"{base_url}/assets/{map_id}",
+        "map_file_url": f"{base_url}/assets/{map_id}f",
+        "map_tiles_url": f"{base_url}/tiles/{map_id}.gmap",
+        "map_image_hash": f"{random.getrandbits(256):064x}",
+        "map_file_hash": f"{random.getrandbits(256):064x}",
+        "map_image_variants": {
+            name: f"{base_url}/variants/{map_id}_{name}.webp" for name in ["thumbnail", "thumbnail_jpeg", "medium"]
+        },
+        "spawn_points": [{"x": random.randint(0, 511), "y": random.randint(0, 511)} for _ in range(8)],
+        "tags": ["castle", "forest", "island"],
+        "is_public": True
+    }
+
+
+def make_user(index: int) -> dict:
+    user_id = f"{random.getrandbits(128):032x}"
+    return {
+        "user_id": user_id,
+        "username": f"user{index}",
+        "password": "$2b$12$" + "x" * 53,
+        "created_date": "2020-08-01 10:11:12.123456",
+        "token_epoch": random.randint(1, 10),
+        "profile": {
+            "given_name": "Given",
+            "family_name": "Family",
+            "picture": f"https://s3.amazonaws.com/minh-intern.game-bucket/user/user_{user_id}",
+            "picture_variants": {
+                "thumbnail": f"https://s3.amazonaws.com/minh-intern.game-bucket/user/variants/user_{user_id}_thumbnail.webp"
+            },
+            "level": random.randint(1, 99),
+            "score": random.randint(0, 10 ** 6)
+        }
+    }
+
+
+def make_client(body: bytes):
+    """
+    Low level client answering every call with `body`
+    """
+
+    client = boto3.client(
+        "dynamodb",
+        region_name="us-east-1",
+        aws_access_key_id="bench",
+        aws_secret_access_key="bench"
+    )
+
+    def respond(request, **kwargs):
+        return AWSResponse(request.url, 200, {"Content-Type": "application/x-amz-json-1.0"}, RawResponse(body))
+
+    client.meta.events.register("before-send", respond)
+    return client
+
+
+def measure(function, runs: int) -> float:
+    function()
+    start = time.perf_counter()
+    for _ in range(runs):
+        function()
+    return (time.perf_counter() - start) / runs
+
+
+def bench(name: str, items: list, runs: int):
+    serialized = [serialize_item(item) for item in items]
+    body = json.dumps({"Items": serialized, "Count": len(items)}).encode("utf-8")
+    resource = boto3.resource(
+        "dynamodb",
+        region_name="us-east-1",
+        aws_access_key_id="bench",
+        aws_secret_access_key="bench"
+    )
+    resource.meta.client.meta.events.register(
+        "before-send",
+        lambda request, **kwargs: AWSResponse(
+            request.url, 200, {"Content-Type": "application/x-amz-json-1.0"}, RawResponse(body)
+        )
+    )
+    resource_table = resource.Table("bench")
+    client_table = ClientTable(make_client(body), "bench")
+    deserializer = TypeDeserializer()
+    params = {
+        "KeyConditionExpression": "id = :id",
+        "ExpressionAttributeValues": {":id": "bench"}
+    }
+
+    # Deserialization only, then a whole query and the JSON of the handlers
+    type_deserializer = measure(
+        lambda: [{key: deserializer.deserialize(value) for key, value in item.items()} for item in serialized], runs
+    )
+    fast_deserializer = measure(lambda: [deserialize_item(item) for item in serialized], runs)
+    resource_query = measure(
+        lambda: json.dumps(resource_table.query(**params)["Items"], default=decimal_default), runs
+    )
+    client_query = measure(lambda: json.dumps(client_table.query(**params)["Items"]), runs)
+    assert json.loads(json.dumps(resource_table.query(**params)["Items"], default=decimal_default)) == \
+        json.loads(json.dumps(client_table.query(**params)["Items"]))
+
+    print(f"{name}: {len(items)} items, {len(body) / 1024:.1f} KiB response")
+    print(f"  deserialize   TypeDeserializer {type_deserializer * 1000:8.2f} ms   deserialize_item {fast_deserializer * 1000:8.2f} ms   x{type_deserializer / fast_deserializer:.1f}")
+    print(f"  query + json  resource Table   {resource_query * 1000:8.2f} ms   ClientTable      {client_query * 1000:8.2f} ms   x{resource_query / client_query:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the resource Table with ClientTable")
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(0)
+    bench("maps", [make_map(index) for index in range(args.items)], args.runs)
+    bench("users", [make_user(index) for index in range(args.items)], args.runs)
+    bench("one map", [make_map(0)], args.runs * 10)
+
+
+if __name__ == "__main__":
+    main()
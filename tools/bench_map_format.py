@@ -0,0 +1,94 @@
+"""
+Compare loading a map as JSON with loading it from the `GMAP` tile format.\n
+The map is read from `--map-file` or generated with random tile layers. The report shows
+the bytes a client downloads and the time it spends to get the whole map, and to get the
+tiles of one screen, a chunk, which only needs the header, index and one section.
+The whole `GMAP` file is not smaller than the gzipped JSON, reading a chunk is the gain.\n
+Usage: `python tools/bench_map_format.py [--map-file map.json] [--width 512] [--height 512] [--layers 3]`
+"""
+
+import os
+import sys
+import json
+import gzip
+import time
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "layers", "python"))
+from custom.map_format import (
+    HEADER_SIZE,
+    SECTION_TILES,
+    encode_map,
+    decode_map,
+    decode_tiles,
+    parse_header,
+    parse_index
+)
+
+
+def generate_map(width: int, height: int, layer_count: int) -> dict:
+    layers = []
+    for layer_index in range(layer_count):
+        # The ground is made of 8 x 8 areas of one tile with a few details,
+        # upper layers are mostly empty
+        if layer_index == 0:
+            areas = [random.choice([1, 2, 3, 17]) for _ in range(((width + 7) // 8) * ((height + 7) // 8))]
+            data = [
+                areas[(y // 8) * ((width + 7) // 8) + x // 8] if random.random() < 0.95 else random.randint(1, 64)
+                for y in range(height) for x in range(width)
+            ]
+        else:
+            data = [0 if random.random() < 0.85 else random.randint(1, 256) for _ in range(width * height)]
+        layers.append({
+            "name": f"layer_{layer_index}",
+            "type": "tilelayer",
+            "width": width,
+            "height": height,
+            "data": data
+        })
+    return {
+        "width": width,
+        "height": height,
+        "tilewidth": 16,
+        "tileheight": 16,
+        "layers": layers
+    }
+
+
+def timed(call):
+    started_at = time.perf_counter()
+    result = call()
+    return result, round((time.perf_counter() - started_at) * 1000, 1)
+
+
+def read_one_chunk(data: bytes) -> list:
+    header = parse_header(data[:HEADER_SIZE])
+    entries = parse_index(data[HEADER_SIZE:HEADER_SIZE + header["index_size"]], header["entry_count"])
+    entry = next(entry for entry in entries if entry["kind"] == SECTION_TILES)
+    return decode_tiles(data[entry["offset"]:entry["offset"] + entry["length"]]), HEADER_SIZE + header["index_size"] + entry["length"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the GMAP map format")
+    parser.add_argument("--map-file")
+    parser.add_argument("--width", type=int, default=512)
+    parser.add_argument("--height", type=int, default=512)
+    parser.add_argument("--layers", type=int, default=3)
+    args = parser.parse_args()
+    if args.map_file is not None:
+        with open(args.map_file, "rb") as map_file:
+            raw = map_file.read()
+    else:
+        raw = json.dumps(generate_map(args.width, args.height, args.layers)).encode("utf-8")
+
+    game_map, json_ms = timed(lambda: json.loads(raw))
+    encoded, encode_ms = timed(lambda: encode_map(game_map))
+    decoded, decode_ms = timed(lambda: decode_map(encoded))
+    assert decoded == game_map
+    (chunk, chunk_bytes), chunk_ms = timed(lambda: read_one_chunk(encoded))
+    gzip_size = len(gzip.compress(raw))
+    print(f"json:      {len(raw)} bytes, parsed in {json_ms} ms")
+    print(f"json gzip: {gzip_size} bytes")
+    print(f"gmap:      {len(encoded)} bytes ({len(encoded) / gzip_size:.2f}x json gzip), encoded in {encode_ms} ms, decoded in {decode_ms} ms")
+    print(f"one chunk: {chunk_bytes} bytes ({chunk_bytes / gzip_size:.1%} of json gzip), decoded in {chunk_ms} ms")
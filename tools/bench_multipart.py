@@ -0,0 +1,92 @@
+"""
+Compare the boundary-scanning multipart parser with the former `email` based parser.\n
+Both parse the same base64 encoded body of one text field and two files, the report
+shows the throughput and the peak memory traced by `tracemalloc` for each parser.\n
+Usage: `python tools/bench_multipart.py [--file-size-mb 4] [--repeat 5]`
+"""
+
+import os
+import sys
+import time
+import email
+import base64
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "layers", "python"))
+from custom.request_helper import parse_binary_multipart_to_form
+
+BOUNDARY = "----GameApiBenchmarkBoundary"
+
+
+def parse_with_email(request: dict) -> dict:
+    """
+    The `email` based parser `parse_binary_multipart_to_form` used before, kept as the baseline
+    """
+
+    post_data = ("Content-Type: " + request["headers"]["content-type"] + "\n").encode() + base64.b64decode(request["body"])
+    msg = email.message_from_bytes(post_data)
+    form = {}
+    for part in msg.get_payload():
+        key = part.get_param("name", header="Content-Disposition")
+        map_params = dict(part.get_params(header="Content-Disposition", unquote=True))
+        if "filename" in map_params:
+            form[key] = {
+                "metadata": map_params,
+                "value": {
+                    "file_name": map_params["filename"],
+                    "data": part.get_payload(decode=True)
+                }
+            }
+        else:
+            form[key] = {
+                "metadata": map_params,
+                "value": part.get_payload()
+            }
+    return form
+
+
+def build_request(file_size: int) -> dict:
+    parts = [
+        (b'Content-Disposition: form-data; name="map_name"', b"Benchmark map"),
+        (b'Content-Disposition: form-data; name="map_image"; filename="image.jpg"\r\nContent-Type: image/jpeg', os.urandom(file_size)),
+        (b'Content-Disposition: form-data; name="map_file"; filename="map.json"\r\nContent-Type: application/json', os.urandom(file_size))
+    ]
+    delimiter = b"--" + BOUNDARY.encode()
+    body = b"".join(delimiter + b"\r\n" + headers + b"\r\n\r\n" + data + b"\r\n" for headers, data in parts)
+    body += delimiter + b"--\r\n"
+    return {
+        "headers": {
+            "content-type": f"multipart/form-data; boundary={BOUNDARY}"
+        },
+        "body": base64.b64encode(body).decode()
+    }
+
+
+def measure(parse, request: dict, repeat: int) -> dict:
+    body_size = len(request["body"])
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        parse(dict(request))
+    elapsed = time.perf_counter() - started_at
+
+    tracemalloc.start()
+    form = parse(dict(request))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert bytes(form["map_file"]["value"]["data"])
+    return {
+        "throughput_mb_s": round(body_size * repeat / elapsed / 1024 / 1024, 1),
+        "peak_memory_mb": round(peak / 1024 / 1024, 1)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the multipart parsers")
+    parser.add_argument("--file-size-mb", type=float, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    request = build_request(int(args.file_size_mb * 1024 * 1024))
+    print(f"Body: {round(len(request['body']) / 1024 / 1024, 1)} MB base64 encoded")
+    print(f"email:    {measure(parse_with_email, request, args.repeat)}")
+    print(f"boundary: {measure(parse_binary_multipart_to_form, request, args.repeat)}")
@@ -0,0 +1,59 @@
+"""
+Build the package of every function and the `custom` layer, and report their sizes.\n
+`cdk synth` runs the same build, this shows what it deploys and how the packages compare
+with zipping the whole `lambda` folder for each function.\n
+Usage: `python tools/build_bundles.py [--handler create_map] [--bytecode | --no-bytecode]`
+"""
+
+import os
+import sys
+import glob
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from game_api import bundling
+
+
+def format_size(size: int) -> str:
+    return f"{size / 1024:.1f} KiB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the function packages and the custom layer")
+    parser.add_argument("--handler", action="append", help="Handler to build, every handler by default")
+    parser.add_argument("--bytecode", dest="bytecode", action="store_true", default=None)
+    parser.add_argument("--no-bytecode", dest="bytecode", action="store_false")
+    args = parser.parse_args()
+    if args.bytecode and not bundling.can_compile():
+        version = ".".join(str(number) for number in bundling.RUNTIME_VERSION)
+        sys.exit(f"Bytecode has to be compiled by Python {version}, the version of the runtime")
+
+    handlers = args.handler or sorted(
+        os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(bundling.LAMBDA_PATH, "*.py"))
+    )
+    all_files = sorted(
+        os.path.basename(path) for path in glob.glob(os.path.join(bundling.LAMBDA_PATH, "*"))
+        if os.path.isfile(path)
+    )
+    full = bundling.write_zip(
+        os.path.join(bundling.BUILD_PATH, "lambda.zip"),
+        bundling.get_entries(bundling.LAMBDA_PATH, all_files, "", bundling.FUNCTION_RUNTIME_PATH, False)
+    )
+    os.remove(full["path"])
+
+    print(f"{'package':<34} {'files':>5} {'size':>12} {'unzipped':>12}")
+    reports = [(handler, bundling.build_function(handler, args.bytecode)) for handler in handlers]
+    reports.append(("custom layer", bundling.build_layer(args.bytecode)))
+    for name, report in reports:
+        print(f"{name:<34} {report['files']:>5} {format_size(report['size']):>12} {format_size(report['source_size']):>12}")
+    function_sizes = [report["size"] for name, report in reports[:-1]]
+    print(f"{'whole lambda folder':<34} {full['files']:>5} {format_size(full['size']):>12} {format_size(full['source_size']):>12}")
+    print(
+        f"Functions: {format_size(sum(function_sizes))} in total, "
+        f"{format_size(full['size'] * len(function_sizes))} with the whole folder in each. "
+        f"Bytecode: {'yes' if args.bytecode or (args.bytecode is None and bundling.can_compile()) else 'no'}"
+    )
+
+
+if __name__ == "__main__":
+    main()
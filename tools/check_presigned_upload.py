@@ -0,0 +1,75 @@
+"""
+Check the presigned upload flow against a local S3 stand-in (MinIO, LocalStack or `moto_server`).\n
+A post presigned like the handlers do uploads a small object, then a post larger than the
+size limit must be rejected by the stand-in. The handlers use the same stand-in when
+`S3_ENDPOINT_URL` is set in their environment.\n
+Usage: `python tools/check_presigned_upload.py --endpoint-url http://localhost:9000
+[--bucket minh-intern.game-bucket] [--key gamemap/mapfile_local]`
+"""
+
+import os
+import sys
+import uuid
+import argparse
+import urllib.error
+import urllib.request
+import boto3
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "layers", "python"))
+from custom.presigned_upload import generate_upload_post
+
+
+def post_form(post: dict, content_type: str, data: bytes) -> int:
+    """
+    Post `data` the way a browser form does and return the status code
+    """
+
+    boundary = uuid.uuid4().hex
+    fields = dict(post["fields"], **{"Content-Type": content_type})
+    body = b""
+    for name, value in fields.items():
+        body += f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+    body += f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="upload"\r\n'.encode()
+    body += f"Content-Type: {content_type}\r\n\r\n".encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    request = urllib.request.Request(
+        post["url"],
+        data=body,
+        headers={
+            "Content-Type": f"multipart/form-data; boundary={boundary}"
+        },
+        method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def check(s3, bucket_name: str, key: str, max_size: int) -> bool:
+    try:
+        s3.head_bucket(Bucket=bucket_name)
+    except s3.exceptions.ClientError:
+        s3.create_bucket(Bucket=bucket_name)
+
+    post = generate_upload_post(s3, bucket_name, key, "application/json", max_size)
+    status = post_form(post, "application/json", b'{"tiles": []}')
+    uploaded = s3.head_object(Bucket=bucket_name, Key=key)["ContentLength"] == 13
+    print(f"Upload within the limit: {status}, object written: {uploaded}")
+
+    too_large_key = key + "_too_large"
+    post = generate_upload_post(s3, bucket_name, too_large_key, "application/json", max_size)
+    status = post_form(post, "application/json", b"0" * (max_size + 1))
+    print(f"Upload over the limit: {status}")
+    return uploaded and status >= 400
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check presigned uploads against a local S3")
+    parser.add_argument("--endpoint-url", required=True)
+    parser.add_argument("--bucket", default="minh-intern.game-bucket")
+    parser.add_argument("--key", default="gamemap/mapfile_local")
+    parser.add_argument("--max-size", type=int, default=1024)
+    args = parser.parse_args()
+    s3 = boto3.client("s3", endpoint_url=args.endpoint_url)
+    sys.exit(0 if check(s3, args.bucket, args.key, args.max_size) else 1)
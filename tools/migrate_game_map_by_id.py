@@ -0,0 +1,58 @@
+"""
+Copy every map from the legacy `created_by`/`last_edited` table to the table keyed by `id`.\n
+Maps without the map feed keys get them from `last_edited` on the way. An item already
+present in the target table is only overwritten with `--overwrite`, so the tool can be
+run again after new maps have been written by the handlers.\n
+Usage: `python tools/migrate_game_map_by_id.py [--source minh-intern.game_map]
+[--target minh-intern.game_map_by_id] [--overwrite] [--dry-run]`
+"""
+
+import os
+import sys
+import argparse
+import datetime
+import boto3
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "layers", "python"))
+from custom.map_feed import set_feed_attributes
+
+
+def migrate(source, target, overwrite: bool = False, dry_run: bool = False) -> dict:
+    result = {
+        "copied": 0,
+        "skipped": 0
+    }
+    params = {}
+    while True:
+        response = source.scan(**params)
+        for game_map in response.get("Items"):
+            if game_map.get("feed_bucket") is None:
+                set_feed_attributes(game_map, datetime.datetime.fromisoformat(game_map["last_edited"]))
+            if dry_run:
+                print(f"{game_map['id']}: {game_map['created_by']} {game_map['last_edited']}")
+                result["copied"] += 1
+                continue
+            put_params = {
+                "Item": game_map
+            }
+            if not overwrite:
+                put_params["ConditionExpression"] = "attribute_not_exists(id)"
+            try:
+                target.put_item(**put_params)
+                result["copied"] += 1
+            except target.meta.client.exceptions.ConditionalCheckFailedException:
+                result["skipped"] += 1
+        if response.get("LastEvaluatedKey") is None:
+            return result
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate game maps to the table keyed by id")
+    parser.add_argument("--source", default="minh-intern.game_map")
+    parser.add_argument("--target", default="minh-intern.game_map_by_id")
+    parser.add_argument("--overwrite", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    db = boto3.resource("dynamodb")
+    print(migrate(db.Table(args.source), db.Table(args.target), args.overwrite, args.dry_run))
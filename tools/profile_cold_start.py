@@ -0,0 +1,147 @@
+"""
+Report the cold start init cost of every handler in `lambda/`.\n
+Each handler module is imported in a fresh interpreter, like the init phase of a new Lambda
+container, with the `custom` layer on the path and placeholder values for the environment
+variables it reads. The import is repeated `--runs` times and the median is reported with
+the modules that took the longest, from `python -X importtime`.\n
+Usage: `python tools/profile_cold_start.py [--runs 5] [--top 5] [--handler create_map] [--json]`
+"""
+
+import os
+import re
+import sys
+import json
+import glob
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+LAMBDA_FOLDER = os.path.join(ROOT, "lambda")
+LAYER_FOLDER = os.path.join(ROOT, "layers", "python")
+ENVIRON_PATTERN = re.compile(r"os\.environ\.get\(\s*[\"'](\w+)[\"']\s*\)|os\.environ\[\s*[\"'](\w+)[\"']\s*\]")
+# Left unset, the handlers fall back to the AWS endpoints
+OPTIONAL_ENVIRON = ["S3_ENDPOINT_URL"]
+IMPORT_SCRIPT = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "import {handler}\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def get_handlers(names: list = None) -> list:
+    handlers = sorted(
+        os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(LAMBDA_FOLDER, "*.py"))
+    )
+    if names:
+        handlers = [handler for handler in handlers if handler in names]
+    return handlers
+
+
+def get_environ(handler: str) -> dict:
+    """
+    Environment of a handler, the variables it reads without a default are given placeholders
+    """
+
+    with open(os.path.join(LAMBDA_FOLDER, f"{handler}.py")) as f:
+        source = f.read()
+    environ = dict(os.environ)
+    environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    environ.setdefault("AWS_ACCESS_KEY_ID", "profile")
+    environ.setdefault("AWS_SECRET_ACCESS_KEY", "profile")
+    for match in ENVIRON_PATTERN.finditer(source):
+        name = match.group(1) or match.group(2)
+        if name in OPTIONAL_ENVIRON:
+            continue
+        # Numbers are parsed at import time
+        if re.search(rf"int\(\s*os\.environ\.get\(\s*[\"']{name}[\"']\s*\)", source):
+            environ.setdefault(name, "1")
+        else:
+            environ.setdefault(name, f"profile-{name.lower()}")
+    environ["PYTHONPATH"] = os.pathsep.join([LAMBDA_FOLDER, LAYER_FOLDER])
+    environ["PYTHONDONTWRITEBYTECODE"] = "1"
+    return environ
+
+
+def parse_importtime(output: str, handler: str) -> dict:
+    """
+    Cumulative import time in seconds of the modules imported directly by `handler`,
+    from the output of `python -X importtime`
+    """
+
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            cumulative = int(fields[1]) / 1e6
+        except ValueError:
+            continue
+        name = fields[2].rstrip()
+        # Modules are listed after their own imports and nested with two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == handler:
+                return modules
+            modules = {}
+        elif depth == 1:
+            modules[name.strip()] = cumulative
+    return modules
+
+
+def profile_handler(handler: str, runs: int) -> dict:
+    environ = get_environ(handler)
+    durations = []
+    modules = {}
+    for _ in range(runs):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT.format(handler=handler)],
+            env=environ,
+            cwd=ROOT,
+            capture_output=True,
+            text=True
+        )
+        if process.returncode != 0:
+            return {
+                "handler": handler,
+                "error": process.stderr.strip().splitlines()[-1]
+            }
+        durations.append(float(process.stdout.strip().splitlines()[-1]))
+        for name, duration in parse_importtime(process.stderr, handler).items():
+            modules.setdefault(name, []).append(duration)
+    return {
+        "handler": handler,
+        "init_ms": statistics.median(durations) * 1000,
+        "modules_ms": {name: statistics.median(values) * 1000 for name, values in modules.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the cold start init cost of the handlers")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--handler", action="append", help="Handler to profile, every handler by default")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    results = [profile_handler(handler, args.runs) for handler in get_handlers(args.handler)]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for result in sorted(results, key=lambda result: -result.get("init_ms", 0)):
+        if "error" in result:
+            print(f"{result['handler']:<34} error: {result['error']}")
+            continue
+        top = sorted(result["modules_ms"].items(), key=lambda item: -item[1])[:args.top]
+        print(f"{result['handler']:<34} {result['init_ms']:8.1f} ms  " + ", ".join(
+            f"{name} {duration:.1f}" for name, duration in top
+        ))
+    durations = [result["init_ms"] for result in results if "init_ms" in result]
+    if durations:
+        print(f"{'total':<34} {sum(durations):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()